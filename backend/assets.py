@@ -0,0 +1,173 @@
+"""
+Frontend Asset Pipeline
+Loads the frontend once, fingerprints it and keeps precompressed variants in
+memory. In dev mode files are reloaded when they change on disk.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Minimum seconds between mtime checks in dev mode
+DEV_CHECK_INTERVAL = 0.5
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+class Asset:
+    """One file with its fingerprint and encoded variants"""
+
+    def __init__(self, url: str, content: bytes, media_type: str):
+        self.url = url
+        self.media_type = media_type
+        self.digest = hashlib.sha256(content).hexdigest()[:16]
+        self.variants: Dict[str, bytes] = {"identity": content}
+
+        if len(content) >= MIN_COMPRESS_SIZE and media_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(content, quality=11)
+                if len(compressed) < len(content):
+                    self.variants["br"] = compressed
+
+    @property
+    def hashed_url(self) -> str:
+        """URL with the content hash before the extension (/assets/app.<hash>.js)"""
+        path = Path(self.url)
+        return str(path.with_name(f"{path.stem}.{self.digest}{path.suffix}"))
+
+    def etag(self, encoding: str) -> str:
+        """Strong ETag, distinct per encoding"""
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """Best available encoding accepted by the client (br > gzip > identity)"""
+        accepted = {
+            part.split(';')[0].strip().lower()
+            for part in (accept_encoding or "").split(',')
+            if not part.strip().endswith(';q=0')
+        }
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return encoding
+        return "identity"
+
+
+class AssetStore:
+    """
+    In-memory frontend assets keyed by URL.
+
+    Every file under frontend/assets is served at /assets/<name> and at its
+    hashed URL; `index.html` is served at / with references to those files
+    rewritten to the hashed URLs. The favicon keeps its plain URL. Hashed
+    URLs are cached forever by browsers, everything else is revalidated with
+    its ETag.
+    """
+
+    def __init__(self, frontend_dir: Path, dev_mode: bool = False):
+        self.frontend_dir = frontend_dir
+        self.dev_mode = dev_mode
+        self._assets: Dict[str, Asset] = {}
+        self._hashed: Dict[str, Asset] = {}
+        self._mtimes: Dict[Path, float] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def _sources(self) -> Dict[str, Path]:
+        """URL -> file for every asset"""
+        sources = {}
+        assets_dir = self.frontend_dir / "assets"
+        if assets_dir.is_dir():
+            for path in sorted(assets_dir.rglob("*")):
+                if path.is_file():
+                    sources["/assets/" + path.relative_to(assets_dir).as_posix()] = path
+        for name in ("favicon.svg", "index.html"):
+            path = self.frontend_dir / name
+            if path.is_file():
+                sources["/" + name] = path
+        return sources
+
+    def load(self):
+        """Read, fingerprint and compress every frontend file"""
+        sources = self._sources()
+        assets = {}
+        mtimes = {}
+        for url, path in sources.items():
+            mtimes[path] = path.stat().st_mtime
+            if url == "/index.html":
+                continue
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            assets[url] = Asset(url, path.read_bytes(), media_type)
+
+        # index.html is rewritten to reference the fingerprinted asset URLs
+        index_path = sources.get("/index.html")
+        if index_path:
+            html = index_path.read_text()
+            for url, asset in assets.items():
+                if not url.startswith("/assets/"):
+                    continue
+                html = re.sub(
+                    r'(["\'])' + re.escape(url) + r'(\?[^"\']*)?\1',
+                    lambda m, asset=asset: f"{m.group(1)}{asset.hashed_url}{m.group(1)}",
+                    html
+                )
+            assets["/"] = Asset("/", html.encode(), "text/html")
+
+        with self._lock:
+            self._assets = assets
+            self._hashed = {asset.hashed_url: asset for url, asset in assets.items() if url.startswith("/assets/")}
+            self._mtimes = mtimes
+
+    def _reload_if_changed(self):
+        """Dev mode: reload when a file was added, removed or modified"""
+        now = time.monotonic()
+        if now - self._checked_at < DEV_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            current = {path: path.stat().st_mtime for path in self._sources().values()}
+        except OSError:
+            return
+        if current != self._mtimes:
+            self.load()
+
+    def lookup(self, url: str) -> Tuple[Optional[Asset], bool]:
+        """
+        Find the asset for a URL
+        Returns: (asset or None, whether the URL is a hashed one)
+        """
+        if self.dev_mode:
+            self._reload_if_changed()
+        with self._lock:
+            if url in self._hashed:
+                return self._hashed[url], True
+            return self._assets.get(url), False
+
+    def stats(self) -> Dict:
+        """Sizes of every asset and its encoded variants"""
+        with self._lock:
+            return {
+                url: {
+                    "hashed_url": asset.hashed_url if url.startswith("/assets/") else None,
+                    "etag": asset.etag("identity"),
+                    "sizes": {encoding: len(body) for encoding, body in asset.variants.items()}
+                }
+                for url, asset in self._assets.items()
+            }
@@ -0,0 +1,372 @@
+"""
+Cancellation
+Cancel tokens for manager work done on behalf of a request or job. A token
+is cancelled when its client disconnects, its deadline passes or it is
+cancelled explicitly; the aws / kubectl / ssh children it adopted are killed
+right away, the thread doing the work gets Cancelled at its next wait, and
+half-finished starts are rolled back on the way out
+"""
+
+import heapq
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from .selfmon import self_monitor
+
+REASONS = ("disconnected", "deadline", "requested")
+# Poll interval of cancellable waits on something other than the token
+WAIT_INTERVAL = 0.05
+
+
+class Cancelled(BaseException):
+    """
+    Raised in the thread doing cancelled work. A BaseException, like
+    asyncio.CancelledError, so the `except Exception` handlers that turn
+    errors into failed results let it through
+    """
+
+    def __init__(self, reason: str, operation: Optional[str] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.operation = operation
+
+    def __str__(self) -> str:
+        if self.reason == "deadline":
+            return f"{self.operation or 'Operation'} did not finish before its deadline"
+        if self.reason == "disconnected":
+            return "Client disconnected"
+        return "Cancelled"
+
+
+class _Stats:
+    """Cancellations per operation and reason, rollbacks and killed children"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict] = {}
+
+    def _entry(self, operation: str) -> Dict:
+        return self._operations.setdefault(operation, {
+            "started": 0,
+            "cancelled": {reason: 0 for reason in REASONS},
+            "rolled_back": 0,
+            "children_killed": 0
+        })
+
+    def add(self, operation: Optional[str], field: str, reason: Optional[str] = None, count: int = 1):
+        if not operation:
+            return
+        with self._lock:
+            entry = self._entry(operation)
+            if reason:
+                entry[field][reason] += count
+            else:
+                entry[field] += count
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                operation: dict(entry, cancelled=dict(entry["cancelled"]))
+                for operation, entry in sorted(self._operations.items())
+            }
+
+
+stats = _Stats()
+
+
+class CancelToken:
+    """
+    Cancellation state of one operation. `deadline` is in seconds from now
+    (None = none). Tokens without an operation name (internal ones) are not
+    counted in the stats
+    """
+
+    def __init__(self, operation: Optional[str] = None, deadline: Optional[float] = None):
+        self.operation = operation
+        self.reason: Optional[str] = None
+        self.deadline = time.monotonic() + deadline if deadline is not None else None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: Dict[int, subprocess.Popen] = {}
+        self._callbacks: List[Callable[[], None]] = []
+        self._finished = False
+        stats.add(operation, "started")
+        if self.deadline is not None:
+            _deadlines.add(self)
+
+    def expire_in(self, seconds: float):
+        """Set the deadline to `seconds` from now"""
+        self.deadline = time.monotonic() + seconds
+        _deadlines.add(self)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "requested") -> bool:
+        """Cancel the operation and kill its adopted children; False if it was already over"""
+        with self._lock:
+            if self._finished or self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            processes = list(self._processes.values())
+            self._processes.clear()
+            callbacks = list(self._callbacks)
+        stats.add(self.operation, "cancelled", reason)
+        for process in processes:
+            _kill(process)
+        stats.add(self.operation, "children_killed", count=len(processes))
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in cancel callback of {self.operation}: {e}")
+        return True
+
+    def finish(self):
+        """The operation is over: later deadlines or disconnects no longer count"""
+        with self._lock:
+            self._finished = True
+            self._callbacks.clear()
+
+    def check(self):
+        """Raise Cancelled if the operation was cancelled"""
+        if self._event.is_set():
+            raise Cancelled(self.reason, self.operation)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline (None without one)"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def sleep(self, seconds: float):
+        """Sleep, raising Cancelled as soon as the operation is cancelled"""
+        if self._event.wait(seconds):
+            self.check()
+
+    def adopt(self, process: subprocess.Popen):
+        """Kill `process` (and its process group) if the operation is cancelled before release()"""
+        with self._lock:
+            if not self._event.is_set():
+                self._processes[process.pid] = process
+                return
+        _kill(process)
+        stats.add(self.operation, "children_killed")
+
+    def release(self, process: subprocess.Popen):
+        with self._lock:
+            self._processes.pop(process.pid, None)
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """Call `callback` (from the cancelling thread) when the operation is cancelled"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def __enter__(self) -> "CancelToken":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.finish()
+
+
+def _kill(process: subprocess.Popen):
+    """SIGKILL a child (its whole group if it leads one) and have the self-monitor reap it"""
+    try:
+        if os.getpgid(process.pid) == process.pid:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+    self_monitor.track(process)
+
+
+class _Deadlines:
+    """One thread cancelling tokens whose deadline passed"""
+
+    def __init__(self):
+        self._heap: List = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._sequence = 0
+
+    def add(self, token: CancelToken):
+        with self._condition:
+            self._sequence += 1
+            heapq.heappush(self._heap, (token.deadline, self._sequence, token))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cancel-deadlines", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, token = heapq.heappop(self._heap)
+            token.cancel("deadline")
+
+
+_deadlines = _Deadlines()
+
+
+# ----------------------------------------------------------------------
+# The token of the current thread
+# ----------------------------------------------------------------------
+
+_local = threading.local()
+
+
+def current() -> Optional[CancelToken]:
+    """Token of the operation this thread works for (None outside one)"""
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def scope(token: Optional[CancelToken]):
+    """Make `token` the current thread's token"""
+    previous = current()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def run(token: Optional[CancelToken], fn: Callable, *args, **kwargs):
+    """Call fn under `token` (for run_in_threadpool / executors)"""
+    with scope(token):
+        if token:
+            token.check()
+        return fn(*args, **kwargs)
+
+
+def bind(fn: Callable) -> Callable:
+    """fn wrapped to run under the calling thread's token, for thread pool fan-outs"""
+    token = current()
+
+    def bound(*args, **kwargs):
+        return run(token, fn, *args, **kwargs)
+
+    return bound
+
+
+def check():
+    """Raise Cancelled if the current operation was cancelled"""
+    token = current()
+    if token:
+        token.check()
+
+
+def sleep(seconds: float):
+    """time.sleep that the current operation's cancellation interrupts"""
+    token = current()
+    if token:
+        token.sleep(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def wait(event: threading.Event, timeout: Optional[float] = None) -> bool:
+    """event.wait that the current operation's cancellation interrupts"""
+    token = current()
+    if not token:
+        return event.wait(timeout)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not event.wait(WAIT_INTERVAL):
+        token.check()
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+    return True
+
+
+@contextmanager
+def adopted(process: subprocess.Popen):
+    """Kill `process` if the current operation is cancelled inside the block"""
+    token = current()
+    if not token:
+        yield process
+        return
+    token.adopt(process)
+    try:
+        yield process
+    finally:
+        token.release(process)
+
+
+def run_command(command: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    that the current operation's cancellation kills (raising Cancelled)
+    """
+    token = current()
+    if not token:
+        return subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+
+    token.check()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    with adopted(process):
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            token.check()
+            raise
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+    # Killed by the cancellation rather than finished
+    token.check()
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+class Rollback:
+    """Undo steps of a start in progress, run if it is cancelled before commit()"""
+
+    def __init__(self):
+        self._steps: List[Callable[[], None]] = []
+
+    def add(self, step: Callable[[], None]):
+        self._steps.append(step)
+
+    def commit(self):
+        self._steps.clear()
+
+
+@contextmanager
+def rollback():
+    """
+    with rollback() as undo: ... undo.add(step) ... undo.commit()
+    Cancelled raised before commit() runs the steps in reverse order, then propagates
+    """
+    undo = Rollback()
+    try:
+        yield undo
+    except Cancelled as e:
+        steps = list(reversed(undo._steps))
+        # Outside the cancelled token, so the undo's own commands are not cancelled too
+        with scope(None):
+            for step in steps:
+                try:
+                    step()
+                except Exception as error:
+                    print(f"Error rolling back cancelled {e.operation or 'operation'}: {error}")
+        if steps:
+            stats.add(e.operation, "rolled_back")
+        raise
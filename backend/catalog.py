@@ -0,0 +1,472 @@
+"""
+Tunnel and K8s Catalog
+Loads the SSM tunnel and Kubernetes definitions from an external TOML, YAML or
+JSON file (falling back to the built-in TUNNEL_CONFIGS / K8S_CONFIGS), validates
+them once into immutable structures with lookup indexes, and reloads the file
+when it changes
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from .config import TUNNEL_CONFIGS, CATALOG_FILE, CATALOG_RELOAD_SECONDS
+from .k8s_config import K8S_CONFIGS
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:  # optional: TOML / JSON only
+    yaml = None
+
+
+class CatalogError(ValueError):
+    """The config file is missing fields or has invalid values"""
+
+
+@dataclass(frozen=True)
+class Service:
+    """One service reachable through an SSM tunnel"""
+    env: str
+    key: str
+    name: str
+    host: str
+    remote_port: str
+    local_port: str
+    # Keep a second session ready behind a front relay for instant failover
+    standby: bool = False
+    # Transaction-mode PostgreSQL pooler on local_port (see pgpool.py)
+    pool: bool = False
+
+
+@dataclass(frozen=True)
+class TunnelEnv:
+    """An AWS environment: the bastion instance and its services"""
+    name: str
+    profile: str
+    region: str
+    instance_tag: str
+    services: Mapping[str, Service]
+    # "ssm": one SSM session per service; "ssh": one SSH-over-SSM session for the whole env
+    transport: str = "ssm"
+    ssh_user: str = "ec2-user"
+    ssh_key: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class K8sResource:
+    """A pod prefix or service that can be port-forwarded"""
+    env: str
+    key: str
+    type: str
+    namespace: str
+    name: str
+    default_port: str
+    suggested_local_port: str
+    prefix: Optional[str] = None
+    service_name: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class K8sEnv:
+    """A Kubernetes cluster context and its resources"""
+    name: str
+    context: str
+    account: str
+    region: str
+    resources: Mapping[str, K8sResource]
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """
+    Validated definitions plus indexes built once per load:
+        services        (env, service) -> Service
+        by_local_port   local port -> Services using it (one per env at most)
+        by_host         remote host -> Services reaching it
+    """
+    tunnels: Mapping[str, TunnelEnv]
+    k8s: Mapping[str, K8sEnv]
+    services: Mapping[Tuple[str, str], Service]
+    by_local_port: Mapping[str, Tuple[Service, ...]]
+    by_host: Mapping[str, Tuple[Service, ...]]
+    profiles: frozenset
+    contexts: frozenset
+    source: str
+    digest: str
+    loaded_at: str
+
+    def tunnel_env(self, env: str) -> Optional[TunnelEnv]:
+        return self.tunnels.get(env)
+
+    def service(self, env: str, service: str) -> Optional[Service]:
+        return self.services.get((env, service))
+
+    def k8s_env(self, env: str) -> Optional[K8sEnv]:
+        return self.k8s.get(env)
+
+    def resource(self, env: str, pod_type: str) -> Optional[K8sResource]:
+        k8s_env = self.k8s.get(env)
+        return k8s_env.resources.get(pod_type) if k8s_env else None
+
+    @property
+    def envs(self) -> Tuple[str, ...]:
+        """Every environment name in the tunnels and k8s sections, in file order"""
+        return tuple(dict.fromkeys([*self.tunnels, *self.k8s]))
+
+
+# ----------------------------------------------------------------------
+# Validation
+# ----------------------------------------------------------------------
+
+def _text(section: Dict, field: str, where: str, required: bool = True) -> Optional[str]:
+    value = section.get(field)
+    if value is None or value == "":
+        if required:
+            raise CatalogError(f"{where}: missing '{field}'")
+        return None
+    if not isinstance(value, (str, int)) or isinstance(value, bool):
+        raise CatalogError(f"{where}: '{field}' must be a string")
+    return str(value)
+
+
+def _port(section: Dict, field: str, where: str) -> str:
+    value = _text(section, field, where)
+    if not value.isdigit() or not 0 < int(value) < 65536:
+        raise CatalogError(f"{where}: '{field}' is not a valid port: {value}")
+    return value
+
+
+def _flag(section: Dict, field: str, where: str) -> bool:
+    value = section.get(field, False)
+    if not isinstance(value, bool):
+        raise CatalogError(f"{where}: '{field}' must be true or false")
+    return value
+
+
+def _table(section: Dict, field: str, where: str) -> Dict:
+    value = section.get(field, {})
+    if not isinstance(value, dict):
+        raise CatalogError(f"{where}: '{field}' must be a table")
+    return value
+
+
+def _build_tunnel_env(env: str, raw: Dict) -> TunnelEnv:
+    where = f"tunnels.{env}"
+    services = {}
+    ports = {}
+    for key, raw_service in _table(raw, "services", where).items():
+        service_where = f"{where}.services.{key}"
+        service = Service(
+            env=env,
+            key=key,
+            name=_text(raw_service, "name", service_where, required=False) or key,
+            host=_text(raw_service, "host", service_where),
+            remote_port=_port(raw_service, "remote_port", service_where),
+            local_port=_port(raw_service, "local_port", service_where),
+            standby=_flag(raw_service, "standby", service_where),
+            pool=_flag(raw_service, "pool", service_where)
+        )
+        if service.local_port in ports:
+            raise CatalogError(
+                f"{service_where}: local_port {service.local_port} is already used by {ports[service.local_port]}"
+            )
+        ports[service.local_port] = key
+        services[key] = service
+
+    transport = _text(raw, "transport", where, required=False) or "ssm"
+    if transport not in ("ssm", "ssh"):
+        raise CatalogError(f"{where}: transport must be 'ssm' or 'ssh', not {transport}")
+
+    return TunnelEnv(
+        name=env,
+        profile=_text(raw, "profile", where),
+        region=_text(raw, "region", where),
+        instance_tag=_text(raw, "instance_tag", where),
+        services=MappingProxyType(services),
+        transport=transport,
+        ssh_user=_text(raw, "ssh_user", where, required=False) or "ec2-user",
+        ssh_key=_text(raw, "ssh_key", where, required=False)
+    )
+
+
+def _build_k8s_env(env: str, raw: Dict) -> K8sEnv:
+    where = f"k8s.{env}"
+    resources = {}
+    for key, raw_resource in _table(raw, "resources", where).items():
+        resource_where = f"{where}.resources.{key}"
+        kind = _text(raw_resource, "type", resource_where)
+        if kind not in ("pod", "service"):
+            raise CatalogError(f"{resource_where}: type must be 'pod' or 'service', not {kind}")
+        resources[key] = K8sResource(
+            env=env,
+            key=key,
+            type=kind,
+            namespace=_text(raw_resource, "namespace", resource_where),
+            name=_text(raw_resource, "name", resource_where, required=False) or key,
+            default_port=_port(raw_resource, "default_port", resource_where),
+            suggested_local_port=_port(raw_resource, "suggested_local_port", resource_where),
+            prefix=_text(raw_resource, "prefix", resource_where, required=kind == "pod"),
+            service_name=_text(raw_resource, "service_name", resource_where, required=kind == "service")
+        )
+
+    return K8sEnv(
+        name=env,
+        context=_text(raw, "context", where),
+        account=_text(raw, "account", where, required=False) or "",
+        region=_text(raw, "region", where, required=False) or "",
+        resources=MappingProxyType(resources)
+    )
+
+
+def build_catalog(tunnels: Dict, k8s: Dict, source: str = "built-in") -> Catalog:
+    """Validate raw definitions (shaped like TUNNEL_CONFIGS / K8S_CONFIGS) and index them"""
+    tunnel_envs = {env: _build_tunnel_env(env, raw) for env, raw in tunnels.items()}
+    k8s_envs = {env: _build_k8s_env(env, raw) for env, raw in k8s.items()}
+
+    services = {}
+    by_local_port: Dict[str, List[Service]] = {}
+    by_host: Dict[str, List[Service]] = {}
+    for tunnel_env in tunnel_envs.values():
+        for service in tunnel_env.services.values():
+            services[(service.env, service.key)] = service
+            by_local_port.setdefault(service.local_port, []).append(service)
+            by_host.setdefault(service.host, []).append(service)
+
+    digest = hashlib.sha256(
+        json.dumps({"tunnels": tunnels, "k8s": k8s}, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+    return Catalog(
+        tunnels=MappingProxyType(tunnel_envs),
+        k8s=MappingProxyType(k8s_envs),
+        services=MappingProxyType(services),
+        by_local_port=MappingProxyType({port: tuple(found) for port, found in by_local_port.items()}),
+        by_host=MappingProxyType({host: tuple(found) for host, found in by_host.items()}),
+        profiles=frozenset(tunnel_env.profile for tunnel_env in tunnel_envs.values()),
+        contexts=frozenset(k8s_env.context for k8s_env in k8s_envs.values()),
+        source=source,
+        digest=digest,
+        loaded_at=datetime.now().isoformat()
+    )
+
+
+def read_file(path: Path) -> Dict:
+    """Parse a TOML, YAML or JSON config file (by extension)"""
+    suffix = path.suffix.lower()
+    if suffix == ".toml":
+        if tomllib is None:
+            raise CatalogError("Reading TOML needs Python 3.11+ or the tomli package")
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    elif suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise CatalogError("Reading YAML needs the PyYAML package (pip install pyyaml)")
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+    elif suffix == ".json":
+        with open(path) as f:
+            data = json.load(f)
+    else:
+        raise CatalogError(f"Unsupported config file type: {path.name} (use .toml, .yaml or .json)")
+
+    if not isinstance(data, dict):
+        raise CatalogError(f"{path.name}: expected a table with 'tunnels' and/or 'k8s'")
+    return data
+
+
+def load_catalog(path: Path) -> Catalog:
+    """Catalog from `path`; sections missing from the file keep the built-in definitions"""
+    if not path.exists():
+        return build_catalog(TUNNEL_CONFIGS, K8S_CONFIGS)
+    try:
+        data = read_file(path)
+    except CatalogError:
+        raise
+    except Exception as e:  # OSError and each parser's own error type
+        raise CatalogError(f"Could not parse {path}: {e}")
+    return build_catalog(
+        _table(data, "tunnels", path.name) if "tunnels" in data else TUNNEL_CONFIGS,
+        _table(data, "k8s", path.name) if "k8s" in data else K8S_CONFIGS,
+        source=str(path)
+    )
+
+
+# ----------------------------------------------------------------------
+# Changes between two catalogs
+# ----------------------------------------------------------------------
+
+def _tunnel_definition(catalog: Catalog, service: Service) -> Tuple:
+    """Everything that requires restarting a running tunnel when it changes (not the display name)"""
+    tunnel_env = catalog.tunnels[service.env]
+    return (tunnel_env.profile, tunnel_env.region, tunnel_env.instance_tag,
+            tunnel_env.transport, tunnel_env.ssh_user, tunnel_env.ssh_key,
+            service.host, service.remote_port, service.local_port, service.standby, service.pool)
+
+
+def _forward_definition(catalog: Catalog, resource: K8sResource) -> Tuple:
+    """Everything that requires restarting a running port-forward when it changes"""
+    return (catalog.k8s[resource.env].context, resource.type, resource.namespace,
+            resource.prefix, resource.service_name)
+
+
+def diff_catalogs(old: Catalog, new: Catalog) -> Dict:
+    """
+    Definitions that changed or disappeared between two catalogs:
+        {"tunnels": {"changed": [(env, service)], "removed": [...]},
+         "k8s": {"changed": [(env, pod_type)], "removed": [...]}}
+    """
+    def compare(old_items: Dict, new_items: Dict, definition: Callable) -> Dict:
+        changed, removed = [], []
+        for key, old_item in old_items.items():
+            new_item = new_items.get(key)
+            if new_item is None:
+                removed.append(key)
+            elif definition(old, old_item) != definition(new, new_item):
+                changed.append(key)
+        return {"changed": sorted(changed), "removed": sorted(removed)}
+
+    old_resources = {(env, key): resource for env, k8s_env in old.k8s.items()
+                     for key, resource in k8s_env.resources.items()}
+    new_resources = {(env, key): resource for env, k8s_env in new.k8s.items()
+                     for key, resource in k8s_env.resources.items()}
+
+    return {
+        "tunnels": compare(dict(old.services), dict(new.services), _tunnel_definition),
+        "k8s": compare(old_resources, new_resources, _forward_definition)
+    }
+
+
+# ----------------------------------------------------------------------
+# Store with hot reload
+# ----------------------------------------------------------------------
+
+class CatalogStore:
+    """
+    Holds the current catalog. A reload builds a complete new catalog and
+    swaps the reference, so readers see either the old or the new one, never
+    a mix. Read `catalog_store.current` once per operation.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._catalog: Optional[Catalog] = None
+        self._mtime: Optional[float] = None
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        # One reload at a time (the watcher thread and POST /api/config/reload)
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def current(self) -> Catalog:
+        if self._catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    self._mtime = self._file_mtime()
+                    try:
+                        self._catalog = load_catalog(self.path)
+                    except CatalogError as e:
+                        # Serve the built-in definitions rather than not starting at all
+                        print(f"Error loading {self.path}: {e}")
+                        self.last_error = str(e)
+                        self._catalog = build_catalog(TUNNEL_CONFIGS, K8S_CONFIGS)
+        return self._catalog
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """Call `listener(changes)` (see diff_catalogs) after every reload that changed definitions"""
+        self._listeners.append(listener)
+
+    def install(self, catalog: Catalog) -> Dict:
+        """Swap in a new catalog and notify listeners about changed definitions"""
+        old = self.current
+        with self._lock:
+            self._catalog = catalog
+        changes = diff_catalogs(old, catalog)
+        if any(changes[kind][change] for kind in changes for change in changes[kind]):
+            for listener in self._listeners:
+                try:
+                    listener(changes)
+                except Exception as e:
+                    print(f"Error applying config changes: {e}")
+        return changes
+
+    def reload(self, force: bool = False) -> Optional[Dict]:
+        """
+        Re-read the file if it changed (or always with force)
+        Returns the changes, or None if nothing was reloaded; a file that does
+        not validate keeps the current catalog and sets last_error
+        """
+        self.current
+        with self._reload_lock:
+            mtime = self._file_mtime()
+            if not force and mtime == self._mtime:
+                return None
+            self._mtime = mtime
+
+            try:
+                catalog = load_catalog(self.path)
+            except CatalogError as e:
+                print(f"Error reloading {self.path}, keeping the previous config: {e}")
+                self.last_error = str(e)
+                return None
+
+            self.last_error = None
+            if catalog.digest == self._catalog.digest:
+                return None
+            return self.install(catalog)
+
+    def status(self) -> Dict:
+        catalog = self.current
+        return {
+            "path": str(self.path),
+            "source": catalog.source,
+            "digest": catalog.digest,
+            "loaded_at": catalog.loaded_at,
+            "error": self.last_error,
+            "tunnel_services": len(catalog.services),
+            "k8s_resources": sum(len(k8s_env.resources) for k8s_env in catalog.k8s.values())
+        }
+
+    def start(self):
+        """Watch the config file in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="config-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching the config file"""
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(CATALOG_RELOAD_SECONDS):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Error watching {self.path}: {e}")
+
+
+catalog_store = CatalogStore(Path(CATALOG_FILE))
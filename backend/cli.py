@@ -0,0 +1,240 @@
+"""
+tm - command-line client for Tunnel Manager Web
+
+Talks to the running server over its Unix socket and starts the server in the
+background if it is not running. Imports only the standard library (and the
+plain config module) so a command answers in tens of milliseconds.
+
+Usage:
+    tm ls                      tunnels and K8s port-forwards
+    tm start <env> <service>   start an SSM tunnel
+    tm start-env <env>         start every tunnel of an env
+    tm stop <env> <service>    stop an SSM tunnel
+    tm stop-all                stop every tunnel (and orphaned sessions)
+    tm health                  server health and start-up status
+
+Options:
+    --json       print the raw API response
+    --no-spawn   fail instead of starting the server when it is not running
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+
+from .config import SERVER_HOST, SERVER_PORT, UNIX_SOCKET_PATH
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPAWN_TIMEOUT = 20
+REQUEST_TIMEOUT = 120
+
+
+def _dechunk(body: bytes) -> bytes:
+    """Decode a chunked transfer-encoded body"""
+    decoded = b""
+    while body:
+        size_line, _, body = body.partition(b"\r\n")
+        size = int(size_line.split(b";")[0], 16)
+        if size == 0:
+            break
+        decoded += body[:size]
+        body = body[size + 2:]
+    return decoded
+
+
+def request(method: str, path: str, body=None):
+    """
+    Send one API request over the Unix socket; raises OSError if the server is
+    not listening. A hand-written HTTP/1.1 exchange, because importing
+    http.client alone takes longer than the whole request.
+    """
+    payload = json.dumps(body).encode() if body is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: localhost\r\n"
+        f"Connection: close\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n"
+    ).encode()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(REQUEST_TIMEOUT)
+        sock.connect(UNIX_SOCKET_PATH)
+        sock.sendall(head + payload)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    header, _, content = b"".join(chunks).partition(b"\r\n\r\n")
+    status = int(header.split(None, 2)[1])
+    if b"transfer-encoding: chunked" in header.lower():
+        content = _dechunk(content)
+
+    data = json.loads(content or b"null")
+    if status >= 400:
+        detail = data.get("detail") if isinstance(data, dict) else data
+        raise SystemExit(f"Error: {detail}")
+    return data
+
+
+def server_running() -> bool:
+    try:
+        request("GET", "/health")
+        return True
+    except OSError:
+        return False
+
+
+def spawn_server():
+    """Start the server in the background and wait for its socket"""
+    import subprocess
+
+    venv_python = os.path.join(PROJECT_ROOT, "venv", "bin", "python")
+    python = venv_python if os.path.exists(venv_python) else sys.executable
+    os.makedirs(os.path.join(PROJECT_ROOT, "logs"), exist_ok=True)
+
+    print("Starting Tunnel Manager Web...", file=sys.stderr)
+    with open(os.path.join(PROJECT_ROOT, "logs", "backend.log"), "a") as log:
+        subprocess.Popen(
+            [python, "-m", "backend.server", "--host", SERVER_HOST, "--port", str(SERVER_PORT)],
+            cwd=PROJECT_ROOT,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while time.monotonic() < deadline:
+        if server_running():
+            return
+        time.sleep(0.05)
+    raise SystemExit(f"Server did not start within {SPAWN_TIMEOUT}s, see logs/backend.log")
+
+
+def format_uptime(seconds) -> str:
+    if seconds is None:
+        return "-"
+    hours, rest = divmod(int(seconds), 3600)
+    minutes = rest // 60
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
+
+def print_table(rows):
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)).rstrip())
+
+
+def cmd_ls(args, as_json: bool):
+    tunnels = request("GET", "/api/tunnels")
+    forwards = request("GET", "/api/k8s/port-forwards")
+    if as_json:
+        print(json.dumps({"tunnels": tunnels, "k8s": forwards}, indent=2))
+        return
+
+    rows = [("TUNNEL", "PORT", "PID", "UPTIME", "CLIENTS")]
+    for tunnel in tunnels["tracked"]:
+        rows.append((
+            tunnel["id"], tunnel["local_port"], tunnel["pid"],
+            format_uptime(tunnel.get("uptime_seconds")),
+            "-" if tunnel.get("connections") is None else tunnel["connections"]
+        ))
+    for env_forwards in forwards["forwards"].values():
+        for forward in env_forwards:
+            rows.append((
+                f"k8s:{forward['env']}_{forward['pod_type']}", forward["local_port"], forward["pid"],
+                format_uptime(forward.get("uptime_seconds")),
+                "-" if forward.get("connections") is None else forward["connections"]
+            ))
+
+    if len(rows) == 1:
+        print("No tunnels running")
+    else:
+        print_table(rows)
+    if tunnels["orphaned"]:
+        print(f"\n{len(tunnels['orphaned'])} orphaned session(s), `tm stop-all` stops them")
+
+
+def cmd_start(args, as_json: bool):
+    if len(args) != 2:
+        raise SystemExit("Usage: tm start <env> <service>")
+    data = request("POST", "/api/tunnels/start", {"env": args[0], "service": args[1]})
+    print(json.dumps(data, indent=2) if as_json else data["message"])
+    return 0 if data["success"] else 1
+
+
+def cmd_start_env(args, as_json: bool):
+    if len(args) < 1:
+        raise SystemExit("Usage: tm start-env <env> [service...]")
+    data = request("POST", "/api/tunnels/start-env", {"env": args[0], "services": args[1:] or None})
+    if as_json:
+        print(json.dumps(data, indent=2))
+    else:
+        print(data["message"])
+        for result in data["results"]:
+            if not result["success"]:
+                print(f"  {result['service']}: {result['message']}")
+    return 0 if data["success"] else 1
+
+
+def cmd_stop(args, as_json: bool):
+    if len(args) != 2:
+        raise SystemExit("Usage: tm stop <env> <service>")
+    data = request("POST", "/api/tunnels/stop", {"env": args[0], "service": args[1]})
+    print(json.dumps(data, indent=2) if as_json else data["message"])
+    return 0 if data["success"] else 1
+
+
+def cmd_stop_all(args, as_json: bool):
+    data = request("POST", "/api/tunnels/stop-all")
+    print(json.dumps(data, indent=2) if as_json else data["message"])
+
+
+def cmd_health(args, as_json: bool):
+    data = request("GET", "/api/ready")
+    if as_json:
+        print(json.dumps(data, indent=2))
+    else:
+        print(f"Server up (started in {data['startup_ms']} ms), prewarm {data['prewarm']}")
+
+
+COMMANDS = {
+    "ls": cmd_ls,
+    "start": cmd_start,
+    "start-env": cmd_start_env,
+    "stop": cmd_stop,
+    "stop-all": cmd_stop_all,
+    "health": cmd_health
+}
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    as_json = "--json" in argv
+    spawn = "--no-spawn" not in argv
+    args = [arg for arg in argv if arg not in ("--json", "--no-spawn")]
+
+    if not args or args[0] not in COMMANDS:
+        print("Usage:" + __doc__.split("Usage:", 1)[1].rstrip(), file=sys.stderr)
+        return 2
+    if not UNIX_SOCKET_PATH:
+        print("The Unix socket is disabled (TUNNEL_MANAGER_SOCKET is empty)", file=sys.stderr)
+        return 2
+
+    if not server_running():
+        if not spawn:
+            print("Tunnel Manager Web is not running", file=sys.stderr)
+            return 1
+        spawn_server()
+
+    return COMMANDS[args[0]](args[1:], as_json) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
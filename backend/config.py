@@ -2,17 +2,199 @@
 Configuration for Tunnel Manager Web
 """
 
+import os
 from pathlib import Path
 
 # Server configuration
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 5678
 
+# The API is also served on this Unix socket for the `tm` CLI ("" disables it)
+UNIX_SOCKET_PATH = os.environ.get(
+    "TUNNEL_MANAGER_SOCKET", str(Path.home() / ".tunnel-manager" / "tm.sock")
+)
+
+# Start-up: the server answers immediately and warms caches (EC2 instance IDs,
+# AWS credentials, kube contexts) in the background
+PREWARM_ON_STARTUP = True
+# Seconds the looked-up EC2 instance IDs are reused for new tunnels
+INSTANCE_CACHE_SECONDS = 300
+
+# Instance selection: sessions are spread over every running instance with the
+# env's instance_tag, by measured session set-up latency and tunnels per instance
+# Weight of the newest set-up time in the per-instance latency average
+INSTANCE_LATENCY_ALPHA = 0.3
+# Assumed set-up time while no instance of an env has been measured
+INSTANCE_DEFAULT_LATENCY_MS = 1000
+# Instances tried per start before giving up
+INSTANCE_FAILOVER_ATTEMPTS = 3
+# An instance where a start failed is tried last for this long (doubling per
+# consecutive failure, up to the maximum)
+INSTANCE_BENCH_SECONDS = 60
+INSTANCE_BENCH_MAX_SECONDS = 900
+# Seconds to wait for a new session to listen on its local port
+SSM_ESTABLISH_TIMEOUT = 3
+
+# Hot standby: services with "standby": true keep a second session open on a
+# private port; a relay on the service port switches to it when the primary
+# session dies, and a new standby is built in the background.
+# Seconds between attempts when building a standby fails
+STANDBY_RETRY_SECONDS = 30
+# Failovers remembered per tunnel (for the failover time statistics)
+STANDBY_FAILOVER_HISTORY = 20
+
+# PostgreSQL pooling: services with "pool": true get a transaction-mode pooler
+# (like pgbouncer's pool_mode = transaction) on their local port. Server
+# connections through the tunnel stay open per user/database and are lent to a
+# client for one transaction at a time.
+# Warm server connections kept open per user/database
+PG_POOL_MIN_SIZE = 2
+# Server connections per user/database; clients beyond this wait for one
+PG_POOL_MAX_SIZE = 20
+# Seconds a client waits for a server connection before getting an error
+PG_POOL_WAIT_TIMEOUT_SECONDS = 30
+# Server connections unused this long are closed (down to PG_POOL_MIN_SIZE, or
+# all of them once the user/database has not been used for this long)
+PG_POOL_IDLE_SECONDS = 600
+# TLS between the pooler and the database: "prefer", "require" or "disable"
+PG_POOL_SERVER_SSL = "prefer"
+
+# Multiplexed envs ("transport": "ssh"): one SSH ControlMaster per env, connected
+# through an AWS-StartSSHSession SSM session, carries every service's forward.
+# The env's ssh_user (default ec2-user) and ssh_key must be authorized on the
+# bastion instances.
+SSH_CONTROL_DIR = Path.home() / ".tunnel-manager" / "ssh"
+# Seconds to wait for the SSH session to come up
+SSH_CONNECT_TIMEOUT = 15
+
+# Shutdown: seconds stopped processes get to exit after SIGTERM before SIGKILL
+TEARDOWN_GRACE_SECONDS = 5
+# What happens to running tunnels and port-forwards when the server stops:
+# "keep" leaves them running (they are picked up again on the next start),
+# "stop" tears them all down. Balanced port-forwards are always stopped since
+# their listener lives in the server process.
+SHUTDOWN_POLICY = os.environ.get("TUNNEL_MANAGER_SHUTDOWN_POLICY", "keep")
+
+# Tunnel and K8s definitions: a TOML, YAML or JSON file with `tunnels` and `k8s`
+# tables shaped like TUNNEL_CONFIGS below and K8S_CONFIGS in k8s_config.py
+# (which are used when the file does not exist). The file is re-read when it
+# changes; running tunnels whose definition changed are restarted.
+CATALOG_FILE = os.environ.get(
+    "TUNNEL_MANAGER_CONFIG", str(Path.home() / ".tunnel-manager" / "tunnels.toml")
+)
+CATALOG_RELOAD_SECONDS = 2
+
+# Development mode: reload frontend files from disk when they change
+DEV_MODE = os.environ.get("TUNNEL_MANAGER_DEV", "0") == "1"
+
+# Gateway mode: this server owns one tunnel per service for the whole team and
+# relays each service port on GATEWAY_HOST. The SSM session itself listens on a
+# private localhost port behind the relay.
+GATEWAY_MODE = os.environ.get("TUNNEL_MANAGER_GATEWAY", "0") == "1"
+GATEWAY_HOST = os.environ.get("TUNNEL_MANAGER_GATEWAY_HOST", "0.0.0.0")
+# Maximum concurrent relayed connections per service (None = unlimited)
+GATEWAY_MAX_CONNECTIONS = 100
+GATEWAY_SERVICE_LIMITS = {
+    "db": 200,
+    "mongo": 100,
+    "redis": 200,
+    "rabbitmq": 50
+}
+
+# Relay QoS: services listed here are relayed like gateway services and
+# shaped, keyed by "<env>_<service>" or service name:
+#   rate         bytes per second through the service, per direction
+#   client_rate  bytes per second per client address, per direction
+# e.g. {"pro_mongo": {"rate": 40 * 1024 * 1024, "client_rate": 20 * 1024 * 1024}}
+# An empty entry only measures. Set rate a little below what the session
+# itself carries, so the relay (which lets interactive traffic go first) is
+# the bottleneck.
+QOS_LIMITS = {}
+# A connection that moved more than QOS_BULK_BYTES within about the last
+# QOS_BULK_WINDOW_SECONDS is bulk: it waits while interactive traffic waits,
+# and leaves QOS_INTERACTIVE_RESERVE of the service rate to interactive traffic
+QOS_BULK_BYTES = 1024 * 1024
+QOS_BULK_WINDOW_SECONDS = 5
+QOS_INTERACTIVE_RESERVE = 0.25
+
+# Background jobs (async start/stop)
+JOB_MAX_WORKERS = 8
+JOB_HISTORY_LIMIT = 200
+# Concurrent jobs per AWS profile / kube context, to stay clear of API throttling
+JOB_CONCURRENCY_PER_PROFILE = 2
+JOB_CONCURRENCY_PER_CONTEXT = 2
+# Per-profile or per-context overrides, keyed by profile name or context
+JOB_CONCURRENCY_OVERRIDES = {}
+
+# Connection accounting: how often client connections are counted per tunnel
+CONNECTION_POLL_SECONDS = 15
+# Stop tunnels with no client connections for this many minutes (None = never).
+# Only the services listed here are stopped; keys are "<env>_<service>" or a
+# service name, e.g. {"pro_db": 60, "redis": 120}
+IDLE_TIMEOUT_DEFAULT_MINUTES = None
+IDLE_TIMEOUT_MINUTES = {"pro_db": 240, "pro_mongo": 240, "pro_rabbitmq": 240}
+
+# Credential checks per AWS profile / kube context
+# Re-validate credentials that report no expiry (and failed ones) this often
+CREDENTIAL_CHECK_SECONDS = 300
+# Background refresh loop interval, and how long before expiry credentials are renewed
+CREDENTIAL_REFRESH_SECONDS = 60
+CREDENTIAL_REFRESH_AHEAD_SECONDS = 600
+
+# History: lifecycle events, start latency and health probes (SQLite)
+HISTORY_DB_FILE = Path.home() / ".tunnel-manager" / "history.db"
+# How often every running tunnel / forward port is probed
+HISTORY_PROBE_SECONDS = 60
+# Raw probe samples are kept this long, then rolled up into hourly aggregates
+HISTORY_RAW_RETENTION_DAYS = 2
+HISTORY_ROLLUP_RETENTION_DAYS = 90
+HISTORY_EVENT_RETENTION_DAYS = 365
+
+# Cancellation: deadline in seconds per operation (API endpoint or job kind; None =
+# no deadline). Operations listed here are also cancelled when their client
+# disconnects: aws / kubectl children still running are killed and half-finished
+# starts are rolled back. Stops are never cancelled. Counts: /api/cancellations
+OPERATION_DEADLINES = {
+    "tunnels_list": 30,
+    "k8s_pods": 30,
+    "state": 60,
+    "tunnel_start": 120,
+    "env_start": 300,
+    "k8s_start": 90
+}
+# How often a request waiting for manager work checks whether its client disconnected
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Self-monitor: the server's own fds, zombie children, threads and RSS (see /api/self)
+SELF_MONITOR_SECONDS = 10
+# Samples kept (one hour at the default interval)
+SELF_MONITOR_SAMPLES = 360
+
+# Zero-downtime upgrades: a server started with `python -m backend.server --handoff`
+# asks the running one over this Unix socket for its listening sockets, relayed
+# connections, tunnel process handles and in-memory state, and takes over
+# ("" disables it)
+HANDOFF_SOCKET_PATH = os.environ.get(
+    "TUNNEL_MANAGER_HANDOFF_SOCKET", str(Path.home() / ".tunnel-manager" / "handoff.sock")
+)
+# Seconds the running server waits for in-flight starts, stops and jobs before
+# handing over (the upgrade is refused if they take longer)
+HANDOFF_DRAIN_SECONDS = 30
+# Seconds relays may take to finish the chunk in hand before they are frozen
+HANDOFF_FREEZE_SECONDS = 5
+# Seconds the new server may take to adopt everything; the running server
+# carries on if it does not
+HANDOFF_ADOPT_SECONDS = 60
+# Pooled db sessions carry protocol state and cannot move: the old server keeps
+# serving the open ones for up to this long while the new one takes new clients
+HANDOFF_POOL_DRAIN_SECONDS = 600
+
 # Paths
 STATE_FILE = Path.home() / ".ssm-tunnels-state.json"
 SCRIPTS_DIR = Path.home() / "Documents" / "Scripts"
 
-# Tunnel configurations - imported from existing tunnel manager
+# Built-in tunnel configurations - imported from existing tunnel manager
+# (used when CATALOG_FILE does not exist)
 TUNNEL_CONFIGS = {
     "dev": {
         "profile": "730335355057_AWSDevelopersSSMAccess",
@@ -85,13 +267,15 @@ TUNNEL_CONFIGS = {
                 "name": "PostgreSQL",
                 "remote_port": "5432",
                 "local_port": "8432",
-                "host": "aws-psql-off-inb-pro.c522iagi0n4g.eu-central-1.rds.amazonaws.com"
+                "host": "aws-psql-off-inb-pro.c522iagi0n4g.eu-central-1.rds.amazonaws.com",
+                "standby": True
             },
             "mongo": {
                 "name": "MongoDB",
                 "remote_port": "27017",
                 "local_port": "24017",
-                "host": "aws-docdb-clstr-off-inb-pro.cluster-c522iagi0n4g.eu-central-1.docdb.amazonaws.com"
+                "host": "aws-docdb-clstr-off-inb-pro.cluster-c522iagi0n4g.eu-central-1.docdb.amazonaws.com",
+                "standby": True
             },
             "rabbitmq": {
                 "name": "RabbitMQ",
@@ -0,0 +1,198 @@
+"""
+Connection Accounting
+Counts established client connections on every tracked local port and stops
+tunnels that stay idle longer than their policy allows
+"""
+
+import subprocess
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from .config import CONNECTION_POLL_SECONDS
+
+PROC_NET_TCP = [Path("/proc/net/tcp"), Path("/proc/net/tcp6")]
+TCP_ESTABLISHED = "01"
+
+
+def _count_from_proc(ports: Set[int]) -> Dict[int, int]:
+    """Count ESTABLISHED sockets whose local port is tracked, from /proc/net/tcp{,6}"""
+    counts = {port: 0 for port in ports}
+    for path in PROC_NET_TCP:
+        try:
+            with open(path) as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 4 or fields[3] != TCP_ESTABLISHED:
+                        continue
+                    local_port = int(fields[1].rsplit(':', 1)[1], 16)
+                    if local_port in counts:
+                        counts[local_port] += 1
+        except FileNotFoundError:
+            continue
+    return counts
+
+
+def _count_from_lsof(ports: Set[int]) -> Optional[Dict[int, int]]:
+    """Fallback for systems without /proc (macOS): one lsof call for all ports"""
+    try:
+        result = subprocess.run(
+            ["lsof", "-nP", "-iTCP", "-sTCP:ESTABLISHED", "-F", "n"],
+            capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    counts = {port: 0 for port in ports}
+    for line in result.stdout.splitlines():
+        # Lines look like: n127.0.0.1:8432->127.0.0.1:53122
+        if not line.startswith('n') or '->' not in line:
+            continue
+        local = line[1:].split('->', 1)[0]
+        try:
+            local_port = int(local.rsplit(':', 1)[1])
+        except (IndexError, ValueError):
+            continue
+        if local_port in counts:
+            counts[local_port] += 1
+    return counts
+
+
+def count_established(ports: Set[int]) -> Optional[Dict[int, int]]:
+    """
+    Count established connections accepted on each port
+    Returns None when connections cannot be inspected on this system
+    """
+    if not ports:
+        return {}
+    if PROC_NET_TCP[0].exists():
+        return _count_from_proc(ports)
+    return _count_from_lsof(ports)
+
+
+class ConnectionAccountant:
+    """
+    Background sampler of client connections per tunnel.
+
+    Sources are callables returning the targets to watch, each a dict with:
+        key                  unique ID ("tunnel:dev_db", "k8s:dev_grafana")
+        port                 local port clients connect to
+        started_at           ISO start time (idle time counts from here until the first client)
+        idle_timeout_minutes stop after this many idle minutes (None = never)
+        stop                 callable that stops the target
+    """
+
+    def __init__(self, interval: float = CONNECTION_POLL_SECONDS):
+        self.interval = interval
+        self._sources: List[Callable[[], List[Dict]]] = []
+        self._usage: Dict[str, Dict] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # When watching began: targets are not idle for longer than we have been looking
+        self._watching_since = time.time()
+        self.available = True
+
+    def add_source(self, source: Callable[[], List[Dict]]):
+        """Register a callable that lists targets to account"""
+        self._sources.append(source)
+
+    def start(self):
+        """Start sampling in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._watching_since = time.time()
+        self._thread = threading.Thread(target=self._run, name="connection-accountant", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread"""
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error accounting connections: {e}")
+
+    def sample(self):
+        """Take one sample of every target and stop those past their idle timeout"""
+        targets = [target for source in self._sources for target in source()]
+        counts = count_established({int(t["port"]) for t in targets})
+        self.available = counts is not None
+        if counts is None:
+            return
+
+        now = time.time()
+        usage = {}
+        for target in targets:
+            key = target["key"]
+            connections = counts.get(int(target["port"]), 0)
+            previous = self._usage.get(key)
+
+            if connections > 0:
+                last_seen = now
+            elif previous and previous.get("last_seen"):
+                last_seen = previous["last_seen"]
+            else:
+                # Tunnels restored after a server restart may be old, but were only unwatched
+                last_seen = max(self._parse_time(target.get("started_at")) or now, self._watching_since)
+
+            usage[key] = {"connections": connections, "last_seen": last_seen}
+
+        self._usage = usage
+
+        for target in targets:
+            timeout = target.get("idle_timeout_minutes")
+            idle = self.idle_seconds(target["key"])
+            if timeout is None or idle is None or idle < timeout * 60:
+                continue
+            print(f"Stopping idle {target['key']} (no clients for {int(idle // 60)} min)")
+            try:
+                target["stop"]()
+            except Exception as e:
+                print(f"Error stopping idle {target['key']}: {e}")
+            self._usage.pop(target["key"], None)
+
+    def idle_seconds(self, key: str) -> Optional[int]:
+        """Seconds since a client was last connected to the target"""
+        entry = self._usage.get(key)
+        if not entry:
+            return None
+        if entry["connections"] > 0:
+            return 0
+        return int(time.time() - entry["last_seen"])
+
+    def usage(self, key: str) -> Dict:
+        """Connection count, last time the target was in use and idle seconds"""
+        entry = self._usage.get(key)
+        if not entry:
+            return {"connections": None, "last_active_at": None, "idle_seconds": None}
+        return {
+            "connections": entry["connections"],
+            "last_active_at": datetime.fromtimestamp(entry["last_seen"]).isoformat(),
+            "idle_seconds": self.idle_seconds(key)
+        }
+
+    def export(self) -> Dict[str, Dict]:
+        """Last sample, so idle timers carry over to the next server after a handoff"""
+        return dict(self._usage)
+
+    def adopt(self, usage: Dict[str, Dict]):
+        self._usage = usage
+
+    @staticmethod
+    def _parse_time(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+
+
+connection_accountant = ConnectionAccountant()
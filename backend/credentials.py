@@ -0,0 +1,220 @@
+"""
+Credential Cache
+Tracks whether the AWS credentials of each profile and each kube context are
+usable, so starts fail fast with an actionable message instead of waiting for
+the AWS CLI or kubectl to time out
+"""
+
+import json
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .cancellation import run_command
+from .catalog import catalog_store
+from .config import (
+    CREDENTIAL_CHECK_SECONDS,
+    CREDENTIAL_REFRESH_SECONDS,
+    CREDENTIAL_REFRESH_AHEAD_SECONDS
+)
+
+CHECK_TIMEOUT = 20
+
+
+def _first_line(text: str) -> str:
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    return lines[0] if lines else "unknown error"
+
+
+class CredentialCache:
+    """
+    Cached validity per AWS profile and per kube context.
+
+    Each entry is a dict with:
+        valid       whether the last check succeeded
+        expires_at  credential expiry (epoch seconds), if the source reports one
+        checked_at  time of the last check (epoch seconds)
+        message     actionable error when not valid
+    """
+
+    def __init__(self):
+        self._profiles: Dict[str, Dict] = {}
+        self._contexts: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _fresh(entry: Optional[Dict]) -> bool:
+        """Whether a cached entry can be used without checking again"""
+        if not entry:
+            return False
+        now = time.time()
+        if entry["expires_at"] is not None and entry["expires_at"] <= now:
+            return False
+        return now - entry["checked_at"] < CREDENTIAL_CHECK_SECONDS
+
+    def check_profile(self, profile: str, refresh: bool = False) -> Dict:
+        """
+        Validate an AWS profile. `aws configure export-credentials` also reports
+        when the credentials expire; older CLIs fall back to sts get-caller-identity
+        """
+        cached = self._profiles.get(profile)
+        if not refresh and self._fresh(cached):
+            return cached
+
+        entry = {"valid": False, "expires_at": None, "checked_at": time.time(), "message": None}
+        try:
+            result = run_command(
+                ["aws", "configure", "export-credentials", "--profile", profile, "--format", "process"],
+                timeout=CHECK_TIMEOUT
+            )
+            if result.returncode == 0:
+                entry["valid"] = True
+                expiration = json.loads(result.stdout).get("Expiration")
+                if expiration:
+                    entry["expires_at"] = datetime.fromisoformat(expiration.replace("Z", "+00:00")).timestamp()
+            elif "export-credentials" in result.stderr or "Invalid choice" in result.stderr:
+                result = run_command(["aws", "sts", "get-caller-identity", "--profile", profile], timeout=CHECK_TIMEOUT)
+                entry["valid"] = result.returncode == 0
+
+            if not entry["valid"]:
+                error = result.stderr
+                if "sso" in error.lower() or "token has expired" in error.lower():
+                    entry["message"] = (
+                        f"AWS SSO session for profile {profile} has expired. "
+                        f"Run: aws sso login --profile {profile}"
+                    )
+                else:
+                    entry["message"] = (
+                        f"AWS credentials for profile {profile} are not usable ({_first_line(error)}). "
+                        f"Run: aws sso login --profile {profile}"
+                    )
+        except subprocess.TimeoutExpired:
+            entry["message"] = f"Checking AWS credentials for profile {profile} timed out"
+        except (OSError, ValueError) as e:
+            entry["message"] = f"Could not check AWS credentials for profile {profile}: {e}"
+
+        with self._lock:
+            self._profiles[profile] = entry
+        return entry
+
+    def check_context(self, context: str, refresh: bool = False) -> Dict:
+        """Validate a kube context by asking its API server for /readyz"""
+        cached = self._contexts.get(context)
+        if not refresh and self._fresh(cached):
+            return cached
+
+        entry = {"valid": False, "expires_at": None, "checked_at": time.time(), "message": None}
+        try:
+            result = run_command(["kubectl", "--context", context, "get", "--raw", "/readyz"], timeout=CHECK_TIMEOUT)
+            entry["valid"] = result.returncode == 0
+            if not entry["valid"]:
+                error = result.stderr
+                if "context" in error and "does not exist" in error:
+                    entry["message"] = (
+                        f"Kube context {context} is not configured. "
+                        f"Run: aws eks update-kubeconfig for this cluster"
+                    )
+                else:
+                    entry["message"] = (
+                        f"Cannot reach Kubernetes context {context} ({_first_line(error)}). "
+                        f"Check the AWS SSO session used by this cluster (aws sso login)"
+                    )
+        except subprocess.TimeoutExpired:
+            entry["message"] = f"Kubernetes context {context} did not answer within {CHECK_TIMEOUT}s"
+        except OSError as e:
+            entry["message"] = f"Could not run kubectl: {e}"
+
+        with self._lock:
+            self._contexts[context] = entry
+        return entry
+
+    def known_problem(self, profile: Optional[str] = None, context: Optional[str] = None) -> Optional[str]:
+        """
+        Error message if the profile / context is known to be unusable, without
+        running any command (unknown or stale entries are not a problem yet)
+        """
+        entry = self._profiles.get(profile) if profile else self._contexts.get(context)
+        if entry and not entry["valid"] and time.time() - entry["checked_at"] < CREDENTIAL_CHECK_SECONDS:
+            return entry["message"]
+        if entry and entry["valid"] and entry["expires_at"] is not None and entry["expires_at"] <= time.time():
+            name = f"profile {profile}" if profile else f"context {context}"
+            return f"Credentials for {name} expired at {datetime.fromtimestamp(entry['expires_at']).isoformat()}"
+        return None
+
+    def status(self) -> Dict:
+        """Every cached entry, with ISO timestamps"""
+        def describe(entry: Dict) -> Dict:
+            return {
+                "valid": entry["valid"],
+                "expires_at": datetime.fromtimestamp(entry["expires_at"]).isoformat() if entry["expires_at"] else None,
+                "checked_at": datetime.fromtimestamp(entry["checked_at"]).isoformat(),
+                "message": entry["message"]
+            }
+
+        with self._lock:
+            return {
+                "aws": {profile: describe(entry) for profile, entry in sorted(self._profiles.items())},
+                "kube": {context: describe(entry) for context, entry in sorted(self._contexts.items())}
+            }
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+
+    def configured(self) -> Dict[str, set]:
+        """Profiles and contexts referenced by the tunnel and K8s configs"""
+        catalog = catalog_store.current
+        return {"profiles": set(catalog.profiles), "contexts": set(catalog.contexts)}
+
+    def refresh_due(self):
+        """
+        Re-check entries that expire soon (the AWS CLI renews SSO role
+        credentials while the SSO token is valid), entries whose check is
+        stale and entries that failed (so they recover after `aws sso login`)
+        """
+        now = time.time()
+        targets = self.configured()
+
+        def due(entry: Optional[Dict]) -> bool:
+            if not entry or not entry["valid"]:
+                return True
+            if entry["expires_at"] is not None and entry["expires_at"] - now < CREDENTIAL_REFRESH_AHEAD_SECONDS:
+                return True
+            return now - entry["checked_at"] >= CREDENTIAL_CHECK_SECONDS
+
+        for profile in targets["profiles"]:
+            if due(self._profiles.get(profile)):
+                self.check_profile(profile, refresh=True)
+        for context in targets["contexts"]:
+            if due(self._contexts.get(context)):
+                self.check_context(context, refresh=True)
+
+    def start(self):
+        """Refresh credentials in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="credential-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the refresh thread"""
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(CREDENTIAL_REFRESH_SECONDS):
+            try:
+                self.refresh_due()
+            except Exception as e:
+                print(f"Error refreshing credentials: {e}")
+
+
+credential_cache = CredentialCache()
@@ -0,0 +1,502 @@
+"""
+Server Handoff
+Zero-downtime upgrades. A new server process connects to the running one over
+a Unix socket; the running server finishes the starts and stops in flight,
+freezes its relays between two chunks and sends its listening sockets (HTTP,
+Unix, relays), every relayed connection, pidfds of the tunnel processes and
+its in-memory state as SCM_RIGHTS file descriptors plus a JSON manifest. Once
+the new server has adopted everything it tells the old one, which exits
+without tearing anything down, and thaws the relays.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .config import (
+    HANDOFF_DRAIN_SECONDS,
+    HANDOFF_FREEZE_SECONDS,
+    HANDOFF_ADOPT_SECONDS
+)
+from .relay import relay_loop
+from .teardown import adopt_pidfd, has_exited
+from .unix_socket import claim_socket_path
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+# Frame header: payload bytes, descriptors attached, last frame of the message
+FRAME = struct.Struct("!III")
+# Descriptors per frame (the kernel takes at most 253 per message)
+MAX_FDS_PER_FRAME = 200
+# Methods that do not change anything; everything else waits for the handoff
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class HandoffError(Exception):
+    """The running server refused or failed the handoff"""
+
+
+# ----------------------------------------------------------------------
+# Wire format
+# ----------------------------------------------------------------------
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("handoff connection closed")
+        data += chunk
+    return data
+
+
+def _send(sock: socket.socket, message: Dict, fds: Optional[List[int]] = None):
+    """Send a JSON message, with its descriptors spread over as many frames as needed"""
+    fds = fds or []
+    payload = json.dumps(message).encode()
+    chunks = [fds[i:i + MAX_FDS_PER_FRAME] for i in range(0, len(fds), MAX_FDS_PER_FRAME)] or [[]]
+    for number, chunk in enumerate(chunks):
+        last = number == len(chunks) - 1
+        body = payload if last else b""
+        header = FRAME.pack(len(body), len(chunk), last)
+        if chunk:
+            sent = socket.send_fds(sock, [header], chunk)
+            sock.sendall(header[sent:])
+        else:
+            sock.sendall(header)
+        sock.sendall(body)
+
+
+def _receive(sock: socket.socket) -> Tuple[Dict, List[int]]:
+    """Receive one message and the descriptors sent with it"""
+    fds: List[int] = []
+    try:
+        while True:
+            header, received, flags, _ = socket.recv_fds(sock, FRAME.size, MAX_FDS_PER_FRAME)
+            fds.extend(received)
+            if flags & getattr(socket, "MSG_CTRUNC", 0):
+                raise HandoffError("descriptors were truncated (open file limit?)")
+            if not header:
+                raise ConnectionError("handoff connection closed")
+            header += _recv_exactly(sock, FRAME.size - len(header))
+            length, count, last = FRAME.unpack(header)
+            if len(received) != count:
+                raise HandoffError(f"expected {count} descriptors, got {len(received)}")
+            payload = _recv_exactly(sock, length)
+            if last:
+                return json.loads(payload), fds
+    except BaseException:
+        for fd in fds:
+            os.close(fd)
+        raise
+
+
+def listening_sockets(exclude_ports: Set[int]) -> List[socket.socket]:
+    """
+    This process' listening TCP sockets (duplicates), but those on
+    exclude_ports. Finds the ones uvicorn bound whichever way it was started
+    """
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            fds = [int(name) for name in os.listdir(fd_dir)]
+            break
+        except OSError:
+            continue
+    else:
+        return []
+
+    found = []
+    for fd in fds:
+        try:
+            sock = socket.socket(fileno=os.dup(fd))
+        except OSError:
+            continue
+        try:
+            listening = (sock.family in (socket.AF_INET, socket.AF_INET6)
+                         and sock.type == socket.SOCK_STREAM
+                         and sock.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN)
+                         and sock.getsockname()[1] not in exclude_ports)
+        except OSError:
+            listening = False
+        if listening:
+            found.append(sock)
+        else:
+            sock.close()
+    return found
+
+
+class Package:
+    """
+    What one server hands to the next: a manifest with a part per component
+    and the descriptors its entries refer to by index
+    """
+
+    def __init__(self, manifest: Optional[Dict] = None, fds: Optional[List[int]] = None):
+        self.manifest = manifest or {"version": PROTOCOL_VERSION, "pid": os.getpid(), "parts": {}, "pidfds": {}}
+        self.fds = fds or []
+        # Sending side: pidfds opened for the package, closed once it is sent
+        self._opened: List[int] = []
+        # Receiving side: descriptors wrapped into sockets
+        self._sockets: Dict[int, socket.socket] = {}
+
+    def add_socket(self, sock: socket.socket) -> int:
+        """Send a socket; returns its index"""
+        self.fds.append(sock.fileno())
+        return len(self.fds) - 1
+
+    def add_pid(self, pid: Optional[int]):
+        """Send a pidfd for a process the next server takes over (Linux only)"""
+        if not pid or not hasattr(os, "pidfd_open") or str(pid) in self.manifest["pidfds"]:
+            return
+        try:
+            pidfd = os.pidfd_open(pid)
+        except OSError:
+            return
+        self._opened.append(pidfd)
+        self.fds.append(pidfd)
+        self.manifest["pidfds"][str(pid)] = len(self.fds) - 1
+
+    def __getitem__(self, index: int) -> socket.socket:
+        """The socket sent under index (receiving side)"""
+        if index not in self._sockets:
+            self._sockets[index] = socket.socket(fileno=self.fds[index])
+        return self._sockets[index]
+
+    def part(self, name: str) -> Optional[Dict]:
+        return self.manifest["parts"].get(name)
+
+    def close_sent(self):
+        for pidfd in self._opened:
+            os.close(pidfd)
+        self._opened.clear()
+
+    def close(self):
+        """Close every received descriptor that was not taken over"""
+        taken = set(self._sockets)
+        taken.update(self.manifest["pidfds"].values())
+        for index, fd in enumerate(self.fds):
+            if index not in taken:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+
+class AdoptedProcess:
+    """Popen-like handle on a process inherited from the previous server (not our child)"""
+
+    def __init__(self, pid: int, args=None):
+        self.pid = pid
+        self.args = args
+        self.returncode: Optional[int] = None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None and has_exited(self.pid):
+            # The exit status went to the previous server's parent
+            self.returncode = -1
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(0.02)
+        return self.returncode
+
+    def send_signal(self, sig: int):
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+# ----------------------------------------------------------------------
+# Requests in flight
+# ----------------------------------------------------------------------
+
+class RequestGuard:
+    """Requests that change state, counted so a handoff can wait for them, and held back during one"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.holding = False
+
+    def hold(self):
+        self.holding = True
+
+    def release(self):
+        self.holding = False
+
+
+request_guard = RequestGuard()
+
+
+class RequestGuardMiddleware:
+    """ASGI middleware counting state-changing requests; 503 while a handoff holds them"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        if request_guard.holding:
+            body = json.dumps({"detail": "Server upgrade in progress, retry in a moment"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1"),
+                            (b"content-length", str(len(body)).encode())]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        request_guard.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_guard.in_flight -= 1
+
+
+# ----------------------------------------------------------------------
+# Running server: hand over to a successor
+# ----------------------------------------------------------------------
+
+class HandoffServer:
+    """
+    Listens on the handoff socket for a new server process and hands this
+    one over to it.
+
+    Components register parts: export(package) returns the JSON-able data of
+    the part (adding sockets and pids to the package) and must not change
+    anything, release() runs once the successor took over. prepare() brings
+    the server to a quiet point (raising if it cannot get there), resume()
+    undoes that when the handoff fails, finish() stops the server afterwards.
+    """
+
+    def __init__(self, path: Path, prepare: Callable[[], None], resume: Callable[[], None],
+                 finish: Callable[[], None]):
+        self.path = path
+        self._prepare = prepare
+        self._resume = resume
+        self._finish = finish
+        self._parts: List[Tuple[str, Callable[["Package"], Optional[Dict]], Optional[Callable[[], None]]]] = []
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.handed_off = False
+
+    def add_part(self, name: str, export: Callable[[Package], Optional[Dict]],
+                 release: Optional[Callable[[], None]] = None):
+        self._parts.append((name, export, release))
+
+    def start(self, sock: Optional[socket.socket] = None) -> bool:
+        """Listen (on an inherited socket when given) in a background thread"""
+        if sock is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not claim_socket_path(self.path):
+                logger.warning(f"{self.path} is served by another running instance, upgrades go to that one")
+                return False
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(str(self.path))
+            os.chmod(self.path, 0o600)
+            sock.listen(1)
+        sock.setblocking(True)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._run, name="handoff", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop listening; the socket file stays if a successor took it over"""
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        if self.handed_off:
+            # Shutting the socket down would stop the successor listening on it too
+            sock.close()
+            return
+        try:
+            # Wakes up accept() in the thread
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _run(self):
+        while self._sock is not None and not self.handed_off:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with conn, self._lock:
+                try:
+                    self._hand_over(conn)
+                except Exception as e:
+                    logger.error(f"Handoff failed, carrying on: {e}")
+
+    def _hand_over(self, conn: socket.socket):
+        conn.settimeout(HANDOFF_ADOPT_SECONDS)
+        hello, _ = _receive(conn)
+        successor = hello.get("pid")
+        if hello.get("version") != PROTOCOL_VERSION:
+            _send(conn, {"error": f"handoff protocol {hello.get('version')} is not {PROTOCOL_VERSION}"})
+            return
+        logger.info(f"Handing over to server process {successor}")
+        started = time.perf_counter()
+
+        try:
+            self._prepare()
+        except Exception as e:
+            _send(conn, {"error": str(e)})
+            raise
+        package = Package()
+        try:
+            try:
+                relay_loop.freeze(HANDOFF_FREEZE_SECONDS)
+                # Every other listening TCP socket is the HTTP server's
+                http = listening_sockets({listener.port for listener in relay_loop.listeners})
+                package.manifest["http"] = [package.add_socket(sock) for sock in http]
+                package.manifest["handoff"] = package.add_socket(self._sock)
+                for name, export, _ in self._parts:
+                    package.manifest["parts"][name] = export(package)
+                _send(conn, package.manifest, package.fds)
+                for sock in http:
+                    sock.close()
+                reply, _ = _receive(conn)
+                if not reply.get("ready"):
+                    raise HandoffError(reply.get("error") or "successor did not take over")
+            except BaseException:
+                if relay_loop.frozen:
+                    relay_loop.thaw()
+                self._resume()
+                raise
+        finally:
+            package.close_sent()
+
+        # The successor serves everything from here on
+        self.handed_off = True
+        for name, _, release in self._parts:
+            if release:
+                try:
+                    release()
+                except Exception as e:
+                    logger.error(f"Error releasing {name} after handoff: {e}")
+        _send(conn, {"go": True})
+        logger.info(f"Handed over to server process {successor} in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms, exiting")
+        self._finish()
+
+
+def wait_until_quiet(busy: Callable[[], int], timeout: float = HANDOFF_DRAIN_SECONDS):
+    """Hold state-changing requests and wait until nothing is busy; HandoffError if that takes too long"""
+    request_guard.hold()
+    deadline = time.monotonic() + timeout
+    while request_guard.in_flight or busy():
+        if time.monotonic() >= deadline:
+            request_guard.release()
+            raise HandoffError(f"server still busy after {timeout}s, try again later")
+        time.sleep(0.05)
+
+
+# ----------------------------------------------------------------------
+# New server: take over from the running one
+# ----------------------------------------------------------------------
+
+# Package received from the previous server (None when started fresh)
+inherited: Optional[Package] = None
+_predecessor: Optional[socket.socket] = None
+
+
+def receive(path: Path) -> Optional[Package]:
+    """
+    Ask the server running on the handoff socket to hand over. Returns the
+    package (relays stay frozen until commit()), or None if no server is
+    running. Raises HandoffError if the running server refuses
+    """
+    global inherited, _predecessor
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+
+    try:
+        # Covers the running server's drain, freeze and export
+        sock.settimeout(HANDOFF_DRAIN_SECONDS + HANDOFF_FREEZE_SECONDS + HANDOFF_ADOPT_SECONDS)
+        _send(sock, {"version": PROTOCOL_VERSION, "pid": os.getpid()})
+        manifest, fds = _receive(sock)
+    except BaseException:
+        sock.close()
+        raise
+    if "error" in manifest:
+        sock.close()
+        raise HandoffError(manifest["error"])
+
+    package = Package(manifest, fds)
+    for pid, index in manifest["pidfds"].items():
+        adopt_pidfd(int(pid), fds[index])
+    # Adopted relays move bytes only once the previous server let go of them
+    relay_loop.freeze(0)
+    inherited, _predecessor = package, sock
+    return package
+
+
+def take(name: str) -> Optional[Dict]:
+    """The inherited data of a part, once (None when there is none)"""
+    if inherited is None:
+        return None
+    return inherited.manifest["parts"].pop(name, None)
+
+
+def commit():
+    """Tell the previous server everything is adopted, wait until it let go and start relaying"""
+    global _predecessor
+    if _predecessor is None:
+        return
+    sock, _predecessor = _predecessor, None
+    with sock:
+        _send(sock, {"ready": True})
+        try:
+            _receive(sock)
+        except (ConnectionError, OSError):
+            # Gone already: nothing relays on its side any more either
+            pass
+    inherited.close()
+    relay_loop.thaw()
+    logger.info(f"Took over from server process {inherited.manifest['pid']}")
+
+
+def abort(error: str):
+    """Give up the takeover; the previous server carries on"""
+    global _predecessor
+    if _predecessor is None:
+        return
+    sock, _predecessor = _predecessor, None
+    with sock:
+        try:
+            _send(sock, {"error": error})
+        except OSError:
+            pass
@@ -0,0 +1,391 @@
+"""
+Tunnel History
+Append-only SQLite store of lifecycle events, start latency per phase and
+health-probe latency for SSM tunnels and K8s forwards. Raw probe samples are
+rolled up into hourly aggregates so the database stays small.
+"""
+
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config import (
+    HISTORY_DB_FILE,
+    HISTORY_PROBE_SECONDS,
+    HISTORY_RAW_RETENTION_DAYS,
+    HISTORY_ROLLUP_RETENTION_DAYS,
+    HISTORY_EVENT_RETENTION_DAYS
+)
+
+PROBE_TIMEOUT = 2
+# Roll up and expire old rows at most this often
+MAINTENANCE_INTERVAL = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    env TEXT NOT NULL,
+    name TEXT NOT NULL,
+    event TEXT NOT NULL,
+    restart INTEGER NOT NULL DEFAULT 0,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_target ON events (kind, env, name, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+
+CREATE TABLE IF NOT EXISTS start_phases (
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    env TEXT NOT NULL,
+    name TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS start_phases_target ON start_phases (kind, env, name, ts);
+
+CREATE TABLE IF NOT EXISTS probes (
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    env TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ms REAL
+);
+CREATE INDEX IF NOT EXISTS probes_target ON probes (kind, env, name, ts);
+
+CREATE TABLE IF NOT EXISTS probe_hours (
+    hour INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    env TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    sum_ms REAL,
+    min_ms REAL,
+    max_ms REAL,
+    PRIMARY KEY (kind, env, name, hour)
+);
+"""
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """min / mean / p50 / p90 / p99 / max of a list of latencies"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 1)
+
+    return {
+        "min": round(ordered[0], 1),
+        "mean": round(sum(ordered) / len(ordered), 1),
+        "p50": pick(50),
+        "p90": pick(90),
+        "p99": pick(99),
+        "max": round(ordered[-1], 1)
+    }
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+class PhaseTimer:
+    """Wall-clock duration of consecutive phases of a start, in ms"""
+
+    def __init__(self):
+        self._started = self._last = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str):
+        """End the current phase under this name"""
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 1)
+        self._last = now
+
+    def total_ms(self) -> float:
+        return round((self._last - self._started) * 1000, 1)
+
+
+class HistoryStore:
+    """
+    Lifecycle and latency history, plus a background prober.
+
+    Probe sources are callables returning targets, each a dict with:
+        kind   "tunnel" or "k8s"
+        env    environment
+        name   service or pod type
+        port   local port to probe
+        alive  callable returning whether the process is still running
+    """
+
+    def __init__(self, path: Path = HISTORY_DB_FILE, probe_interval: float = HISTORY_PROBE_SECONDS):
+        self.path = path
+        self.probe_interval = probe_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._sources: List[Callable[[], List[Dict]]] = []
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._maintained_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _write(self, statements: List[tuple]):
+        """Run INSERT/UPDATE statements in one transaction; history never breaks callers"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+        except sqlite3.Error as e:
+            print(f"Error writing history: {e}")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record_event(self, kind: str, env: str, name: str, event: str, detail: Optional[str] = None):
+        """Append a lifecycle event (start, start_failed, stop, death, failover, standby, standby_lost)"""
+        restart = 0
+        if event == "start":
+            # A start right after the target died counts as a restart
+            try:
+                last = self._query(
+                    "SELECT event FROM events WHERE kind = ? AND env = ? AND name = ? ORDER BY ts DESC LIMIT 1",
+                    (kind, env, name)
+                )
+                restart = int(bool(last) and last[0][0] == "death")
+            except sqlite3.Error:
+                pass
+        self._write([(
+            "INSERT INTO events (ts, kind, env, name, event, restart, detail) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), kind, env, name, event, restart, detail[:500] if detail else None)
+        )])
+
+    def record_start(self, kind: str, env: str, name: str, success: bool, message: str, timer: PhaseTimer):
+        """
+        Record the outcome of a start and, if it succeeded, its latency per phase
+        Starts rejected before any phase ran (validation errors) are not recorded
+        """
+        if not timer.phases:
+            return
+        if not success:
+            self.record_event(kind, env, name, "start_failed", message)
+            return
+
+        self.record_event(kind, env, name, "start")
+        now = time.time()
+        phases = dict(timer.phases, total=timer.total_ms())
+        self._write([
+            ("INSERT INTO start_phases (ts, kind, env, name, phase, ms) VALUES (?, ?, ?, ?, ?, ?)",
+             (now, kind, env, name, phase, ms))
+            for phase, ms in phases.items()
+        ])
+
+    def record_probe(self, kind: str, env: str, name: str, ms: Optional[float]):
+        """Append a probe sample; ms is None when the probe failed"""
+        self._write([(
+            "INSERT INTO probes (ts, kind, env, name, ms) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), kind, env, name, ms)
+        )])
+
+    # ------------------------------------------------------------------
+    # Probing and maintenance
+    # ------------------------------------------------------------------
+
+    def add_source(self, source: Callable[[], List[Dict]]):
+        """Register a callable that lists targets to probe"""
+        self._sources.append(source)
+
+    def start(self):
+        """Start probing in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="history-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the probing thread"""
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(self.probe_interval):
+            try:
+                self.probe_all()
+                if time.time() - self._maintained_at >= MAINTENANCE_INTERVAL:
+                    self.maintain()
+            except Exception as e:
+                print(f"Error probing tunnels: {e}")
+
+    def probe_all(self):
+        """Probe every running target once"""
+        for source in self._sources:
+            for target in source():
+                # alive() also records the death of a process that exited
+                if not target["alive"]():
+                    continue
+                self.record_probe(target["kind"], target["env"], target["name"], self.probe(int(target["port"])))
+
+    @staticmethod
+    def probe(port: int) -> Optional[float]:
+        """TCP connect latency to a local port in ms, or None if it is not accepting"""
+        started = time.perf_counter()
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=PROBE_TIMEOUT):
+                return round((time.perf_counter() - started) * 1000, 2)
+        except OSError:
+            return None
+
+    def maintain(self):
+        """Roll raw probes up into hourly rows and expire old data"""
+        now = time.time()
+        raw_cutoff = now - HISTORY_RAW_RETENTION_DAYS * 86400
+        self._write([
+            ("""
+            INSERT INTO probe_hours (hour, kind, env, name, count, failures, sum_ms, min_ms, max_ms)
+            SELECT CAST(ts / 3600 AS INTEGER) * 3600, kind, env, name,
+                   COUNT(*), SUM(ms IS NULL), SUM(ms), MIN(ms), MAX(ms)
+            FROM probes WHERE ts < ?
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (kind, env, name, hour) DO UPDATE SET
+                count = count + excluded.count,
+                failures = failures + excluded.failures,
+                sum_ms = COALESCE(sum_ms, 0) + COALESCE(excluded.sum_ms, 0),
+                min_ms = MIN(COALESCE(min_ms, excluded.min_ms), COALESCE(excluded.min_ms, min_ms)),
+                max_ms = MAX(COALESCE(max_ms, excluded.max_ms), COALESCE(excluded.max_ms, max_ms))
+            """, (raw_cutoff,)),
+            ("DELETE FROM probes WHERE ts < ?", (raw_cutoff,)),
+            ("DELETE FROM probe_hours WHERE hour < ?", (now - HISTORY_ROLLUP_RETENTION_DAYS * 86400,)),
+            ("DELETE FROM events WHERE ts < ?", (now - HISTORY_EVENT_RETENTION_DAYS * 86400,)),
+            ("DELETE FROM start_phases WHERE ts < ?", (now - HISTORY_EVENT_RETENTION_DAYS * 86400,))
+        ])
+        self._maintained_at = now
+
+    # ------------------------------------------------------------------
+    # Range queries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _where(since: float, until: float, kind: Optional[str], env: Optional[str], name: Optional[str],
+               ts_column: str = "ts") -> tuple:
+        clauses = [f"{ts_column} >= ?", f"{ts_column} < ?"]
+        params = [since, until]
+        for column, value in (("kind", kind), ("env", env), ("name", name)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return " AND ".join(clauses), tuple(params)
+
+    def events(self, since: float, until: float, kind: Optional[str] = None, env: Optional[str] = None,
+               name: Optional[str] = None, limit: int = 500) -> List[Dict]:
+        """Lifecycle events in a time range, newest first"""
+        where, params = self._where(since, until, kind, env, name)
+        rows = self._query(
+            f"SELECT ts, kind, env, name, event, restart, detail FROM events WHERE {where} ORDER BY ts DESC LIMIT ?",
+            params + (limit,)
+        )
+        return [
+            {"at": _iso(ts), "kind": kind, "env": env, "name": name, "event": event,
+             "restart": bool(restart), "detail": detail}
+            for ts, kind, env, name, event, restart, detail in rows
+        ]
+
+    def start_latency(self, since: float, until: float, kind: Optional[str] = None, env: Optional[str] = None,
+                      name: Optional[str] = None) -> Dict:
+        """Latency statistics of successful starts per phase, and the number of failed starts"""
+        where, params = self._where(since, until, kind, env, name)
+        phases: Dict[str, List[float]] = {}
+        for phase, ms in self._query(f"SELECT phase, ms FROM start_phases WHERE {where}", params):
+            phases.setdefault(phase, []).append(ms)
+        failures = self._query(f"SELECT COUNT(*) FROM events WHERE {where} AND event = 'start_failed'", params)[0][0]
+        return {
+            "starts": len(phases.get("total", [])),
+            "failures": failures,
+            "phases": {phase: percentiles(values) for phase, values in phases.items()}
+        }
+
+    def probes(self, since: float, until: float, kind: Optional[str] = None, env: Optional[str] = None,
+               name: Optional[str] = None, resolution: Optional[str] = None) -> Dict:
+        """
+        Probe latency series. resolution "raw" returns every sample still kept,
+        "hour" hourly aggregates; by default raw is used when the range is recent enough
+        """
+        if resolution is None:
+            resolution = "raw" if since >= time.time() - HISTORY_RAW_RETENTION_DAYS * 86400 else "hour"
+
+        if resolution == "raw":
+            where, params = self._where(since, until, kind, env, name)
+            rows = self._query(f"SELECT ts, kind, env, name, ms FROM probes WHERE {where} ORDER BY ts", params)
+            points = [
+                {"at": _iso(ts), "kind": kind, "env": env, "name": name, "ms": ms}
+                for ts, kind, env, name, ms in rows
+            ]
+            return {"resolution": "raw", "points": points}
+
+        # Hourly: rolled-up rows plus raw samples not rolled up yet
+        raw_where, raw_params = self._where(since, until, kind, env, name)
+        hour_where, hour_params = self._where(since - 3600, until, kind, env, name, ts_column="hour")
+        rows = self._query(f"""
+            SELECT hour, kind, env, name, SUM(count), SUM(failures), SUM(sum_ms), MIN(min_ms), MAX(max_ms)
+            FROM (
+                SELECT hour, kind, env, name, count, failures, sum_ms, min_ms, max_ms
+                FROM probe_hours WHERE {hour_where}
+                UNION ALL
+                SELECT CAST(ts / 3600 AS INTEGER) * 3600, kind, env, name, 1, ms IS NULL, ms, ms, ms
+                FROM probes WHERE {raw_where}
+            )
+            GROUP BY hour, kind, env, name
+            ORDER BY hour
+        """, hour_params + raw_params)
+        points = []
+        for hour, kind, env, name, count, failures, sum_ms, min_ms, max_ms in rows:
+            succeeded = count - failures
+            points.append({
+                "at": _iso(hour), "kind": kind, "env": env, "name": name,
+                "count": count, "failures": failures,
+                "mean_ms": round(sum_ms / succeeded, 2) if succeeded and sum_ms is not None else None,
+                "min_ms": min_ms, "max_ms": max_ms
+            })
+        return {"resolution": "hour", "points": points}
+
+    def restarts(self, since: float, until: float, kind: Optional[str] = None, env: Optional[str] = None,
+                 name: Optional[str] = None) -> List[Dict]:
+        """Starts, restarts (starts after a death), failed starts, stops and deaths per target"""
+        where, params = self._where(since, until, kind, env, name)
+        rows = self._query(f"""
+            SELECT kind, env, name,
+                   SUM(event = 'start'), SUM(event = 'start' AND restart = 1),
+                   SUM(event = 'start_failed'), SUM(event = 'stop'), SUM(event = 'death')
+            FROM events WHERE {where}
+            GROUP BY kind, env, name
+            ORDER BY kind, env, name
+        """, params)
+        return [
+            {"kind": kind, "env": env, "name": name, "starts": starts, "restarts": restarts,
+             "failed_starts": failed, "stops": stops, "deaths": deaths}
+            for kind, env, name, starts, restarts, failed, stops, deaths in rows
+        ]
+
+
+history = HistoryStore()
@@ -0,0 +1,131 @@
+"""
+Bastion Instance Selection
+Spreads SSM sessions over every running instance that matches an env's
+instance_tag: instances with fast session set-up and few tunnels are preferred,
+and instances where a start just failed are benched for a while
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .config import (
+    INSTANCE_LATENCY_ALPHA,
+    INSTANCE_DEFAULT_LATENCY_MS,
+    INSTANCE_BENCH_SECONDS,
+    INSTANCE_BENCH_MAX_SECONDS
+)
+
+
+class InstanceSelector:
+    """
+    Session set-up latency (EWMA) and failure history per instance.
+
+    rank() orders candidates by expected latency x (tunnels on the instance + 1),
+    so a fast instance takes more sessions until it is as loaded as it is fast.
+    Instances never measured borrow the best known latency, so they are tried.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict] = {}
+        # Starts in progress per instance, counted as load so parallel starts spread out
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, instance_id: str) -> Dict:
+        return self._stats.setdefault(instance_id, {
+            "latency_ms": None,
+            "samples": 0,
+            "failures": 0,
+            "benched_until": 0.0,
+            "last_error": None
+        })
+
+    def rank(self, instance_ids: List[str], tunnels: Dict[str, int]) -> List[str]:
+        """Candidates best first; benched instances go last (still usable if nothing else works)"""
+        now = time.monotonic()
+        with self._lock:
+            known = [
+                self._stats[instance_id]["latency_ms"] for instance_id in instance_ids
+                if self._stats.get(instance_id, {}).get("latency_ms") is not None
+            ]
+            default = min(known) if known else INSTANCE_DEFAULT_LATENCY_MS
+
+            def score(instance_id: str):
+                stats = self._stats.get(instance_id, {})
+                latency = stats.get("latency_ms") or default
+                load = tunnels.get(instance_id, 0) + self._pending.get(instance_id, 0)
+                return (stats.get("benched_until", 0.0) > now, latency * (load + 1), instance_id)
+
+            return sorted(instance_ids, key=score)
+
+    def begin(self, instance_id: str):
+        """A start against instance_id is in progress"""
+        with self._lock:
+            self._pending[instance_id] = self._pending.get(instance_id, 0) + 1
+
+    def end(self, instance_id: str):
+        with self._lock:
+            self._pending[instance_id] = max(0, self._pending.get(instance_id, 0) - 1)
+
+    def record_success(self, instance_id: str, setup_ms: float):
+        """Fold a session set-up time into the instance's latency and clear its failures"""
+        with self._lock:
+            stats = self._entry(instance_id)
+            if stats["latency_ms"] is None:
+                stats["latency_ms"] = setup_ms
+            else:
+                stats["latency_ms"] = (
+                    INSTANCE_LATENCY_ALPHA * setup_ms + (1 - INSTANCE_LATENCY_ALPHA) * stats["latency_ms"]
+                )
+            stats["samples"] += 1
+            stats["failures"] = 0
+            stats["benched_until"] = 0.0
+
+    def record_failure(self, instance_id: str, error: Optional[str] = None):
+        """Bench the instance, twice as long for each consecutive failure"""
+        with self._lock:
+            stats = self._entry(instance_id)
+            stats["failures"] += 1
+            bench = min(INSTANCE_BENCH_SECONDS * 2 ** (stats["failures"] - 1), INSTANCE_BENCH_MAX_SECONDS)
+            stats["benched_until"] = time.monotonic() + bench
+            stats["last_error"] = error
+
+    def stats(self, tunnels: Optional[Dict[str, int]] = None) -> Dict[str, Dict]:
+        """Per-instance latency, failures and tunnel count"""
+        now = time.monotonic()
+        tunnels = tunnels or {}
+        with self._lock:
+            for instance_id in tunnels:
+                self._entry(instance_id)
+            return {
+                instance_id: {
+                    "latency_ms": round(stats["latency_ms"], 1) if stats["latency_ms"] is not None else None,
+                    "samples": stats["samples"],
+                    "failures": stats["failures"],
+                    "benched_seconds": max(0, round(stats["benched_until"] - now)),
+                    "last_error": stats["last_error"],
+                    "tunnels": tunnels.get(instance_id, 0)
+                }
+                for instance_id, stats in sorted(self._stats.items())
+            }
+
+    def export(self) -> Dict[str, Dict]:
+        """Measurements for the next server after a handoff (bench times relative to now)"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                instance_id: dict(stats, benched_until=max(0.0, stats["benched_until"] - now))
+                for instance_id, stats in self._stats.items()
+            }
+
+    def adopt(self, exported: Dict[str, Dict]):
+        now = time.monotonic()
+        with self._lock:
+            for instance_id, stats in exported.items():
+                self._stats[instance_id] = dict(
+                    stats, benched_until=now + stats["benched_until"] if stats["benched_until"] else 0.0
+                )
+
+
+instance_selector = InstanceSelector()
@@ -0,0 +1,230 @@
+"""
+Job Scheduler
+Runs slow start/stop operations in the background with per-profile and
+per-context concurrency limits
+"""
+
+import json
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from . import cancellation
+from .cancellation import CancelToken, Cancelled
+from .config import JOB_MAX_WORKERS, JOB_HISTORY_LIMIT, OPERATION_DEADLINES
+
+# A job body receives a progress callback and returns (success, message, result)
+JobFunc = Callable[[Callable[[str], None]], Tuple[bool, str, Any]]
+
+
+class Job:
+    """A queued or finished start/stop operation"""
+
+    def __init__(self, kind: str, params: Dict, limit_key: str, target_key: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.limit_key = limit_key
+        self.target_key = target_key
+        self.status = "queued"
+        self.progress: List[Dict] = []
+        self.success: Optional[bool] = None
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        # Start jobs can be cancelled (and time out); stops always run to the end
+        self.token = CancelToken(kind) if kind in OPERATION_DEADLINES else None
+        self.cancelled: Optional[str] = None
+
+    @property
+    def dedupe_key(self) -> str:
+        return f"{self.kind}:{json.dumps(self.params, sort_keys=True)}"
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def report(self, message: str):
+        """Append a progress message"""
+        self.progress.append({"at": datetime.now().isoformat(), "message": message})
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": list(self.progress),
+            "success": self.success,
+            "message": self.message,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "cancelled": self.cancelled
+        }
+
+
+class JobScheduler:
+    """
+    Thread pool for jobs. Each job holds a slot of its limit key (an AWS
+    profile or kube context) while it runs, so bursts against one account are
+    smoothed out. Jobs on the same target (one tunnel or forward) never run
+    concurrently. Jobs wait in a queue, not in a pool thread, until their slot
+    and target are free, so a burst on one key never holds up the others.
+    Submitting a job identical to one still queued or running returns the
+    existing job.
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._inflight: Dict[str, Job] = {}
+        # Jobs waiting for a limit slot or their target, oldest first
+        self._pending: Deque[Tuple[Job, JobFunc]] = deque()
+        # Running jobs per limit key, and each key's limit
+        self._running: Dict[str, int] = {}
+        self._limits: Dict[str, int] = {}
+        # Targets with a running job
+        self._busy_targets: Set[str] = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: Dict, limit_key: str, limit: int, target_key: str, func: JobFunc) -> Tuple[Job, bool]:
+        """
+        Queue a job
+        Returns: (job, created) - created is False when an identical job was already in flight
+        """
+        job = Job(kind, params, limit_key, target_key)
+        with self._lock:
+            existing = self._inflight.get(job.dedupe_key)
+            if existing:
+                return existing, False
+
+            self._inflight[job.dedupe_key] = job
+            self._jobs[job.id] = job
+            self._prune()
+            self._limits[limit_key] = limit
+            self._pending.append((job, func))
+            self._dispatch()
+        return job, True
+
+    def _dispatch(self):
+        """Hand every queued job whose slot and target are free to the pool (called holding the lock)"""
+        if self._closed:
+            return
+        # A job waiting for its target keeps later jobs on that target behind it
+        passed_over: Set[str] = set()
+        for entry in list(self._pending):
+            job, func = entry
+            if (job.target_key in self._busy_targets or job.target_key in passed_over
+                    or self._running.get(job.limit_key, 0) >= self._limits[job.limit_key]):
+                passed_over.add(job.target_key)
+                continue
+            self._pending.remove(entry)
+            self._busy_targets.add(job.target_key)
+            self._running[job.limit_key] = self._running.get(job.limit_key, 0) + 1
+            self._executor.submit(self._run, job, func)
+
+    def _run(self, job: Job, func: JobFunc):
+        """Execute a job; its slot and target are reserved by _dispatch"""
+        try:
+            job.status = "running"
+            job.started_at = datetime.now().isoformat()
+            deadline = OPERATION_DEADLINES.get(job.kind)
+            if job.token and deadline is not None:
+                job.token.expire_in(deadline)
+            try:
+                success, message, result = cancellation.run(job.token, func, job.report)
+            except Cancelled as e:
+                job.cancelled = e.reason
+                success, message, result = False, str(e), None
+            except Exception as e:
+                success, message, result = False, f"Unexpected error: {e}", None
+            finally:
+                if job.token:
+                    job.token.finish()
+            self._finish(job, success, message, result)
+        finally:
+            with self._lock:
+                self._inflight.pop(job.dedupe_key, None)
+                self._busy_targets.discard(job.target_key)
+                self._running[job.limit_key] -= 1
+                self._dispatch()
+
+    @staticmethod
+    def _finish(job: Job, success: bool, message: str, result: Any):
+        job.success = success
+        job.message = message
+        job.result = result
+        job.status = "succeeded" if success else "failed"
+        job.finished_at = datetime.now().isoformat()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        excess = len(self._jobs) - JOB_HISTORY_LIMIT
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued or running job: its children are killed and a half-finished
+        start is rolled back. Returns the job (None if unknown)
+        Raises ValueError for jobs that cannot be cancelled
+        """
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        if not job.token:
+            raise ValueError(f"{job.kind} jobs cannot be cancelled")
+        if job.done:
+            raise ValueError(f"Job {job_id} already finished")
+        with self._lock:
+            queued = next((entry for entry in self._pending if entry[0] is job), None)
+            if queued:
+                # Never started: nothing to roll back
+                self._pending.remove(queued)
+                self._inflight.pop(job.dedupe_key, None)
+        job.token.cancel("requested")
+        if queued:
+            job.token.finish()
+            job.cancelled = job.token.reason
+            self._finish(job, False, str(Cancelled(job.token.reason, job.kind)), None)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID"""
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """All known jobs, newest first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def in_flight(self) -> int:
+        """Jobs queued or running"""
+        with self._lock:
+            return len(self._inflight)
+
+    def shutdown(self):
+        """Stop accepting jobs; running jobs finish in the background, queued ones fail"""
+        with self._lock:
+            self._closed = True
+            pending = [job for job, _ in self._pending]
+            self._pending.clear()
+            for job in pending:
+                self._inflight.pop(job.dedupe_key, None)
+        for job in pending:
+            if job.token:
+                job.token.finish()
+            self._finish(job, False, "Server shutting down", None)
+        self._executor.shutdown(wait=False)
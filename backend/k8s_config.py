@@ -6,10 +6,28 @@ Manages K8s contexts and namespaces for different environments
 from pathlib import Path
 
 # State file for K8s port-forwards
+# (the directory is created on first save, not at import)
 STATE_DIR = Path.home() / ".tunnel-manager"
-STATE_DIR.mkdir(exist_ok=True)
 K8S_STATE_FILE = STATE_DIR / "k8s_forwards.json"
 
+# Balanced forwards: how often the pod list is re-read to add/remove backends
+K8S_BALANCE_RESYNC_SECONDS = 10
+# Seconds to wait for a per-pod kubectl backend to start listening
+K8S_BACKEND_READY_TIMEOUT = 5
+
+# Grouped forwards: forwards to the same (context, namespace, pod/service) share
+# one kubectl process carrying every port pair on private ports, behind a relay
+# on each forward's local port. Adding a port starts a kubectl with the new set
+# of ports and switches the relays to it; the previous kubectl keeps serving the
+# connections already open on it (up to the drain timeout), then is stopped.
+K8S_GROUP_FORWARDS = True
+K8S_DRAIN_TIMEOUT_SECONDS = 300
+
+# Stop port-forwards with no client connections for this many minutes (None = never).
+# Only the forwards listed here are stopped; keys are "<env>_<pod_type>" or a pod_type
+K8S_IDLE_TIMEOUT_DEFAULT_MINUTES = None
+K8S_IDLE_TIMEOUT_MINUTES = {"pro_invoice-producer": 240}
+
 # Kubernetes configurations per environment
 K8S_CONFIGS = {
     'dev': {
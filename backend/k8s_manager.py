@@ -8,19 +8,48 @@ import json
 import os
 import signal
 import re
+import tempfile
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
-from .k8s_config import K8S_STATE_FILE, K8S_CONFIGS
+from .k8s_config import (
+    K8S_STATE_FILE,
+    K8S_BALANCE_RESYNC_SECONDS,
+    K8S_BACKEND_READY_TIMEOUT,
+    K8S_GROUP_FORWARDS,
+    K8S_DRAIN_TIMEOUT_SECONDS,
+    K8S_IDLE_TIMEOUT_DEFAULT_MINUTES,
+    K8S_IDLE_TIMEOUT_MINUTES
+)
+from . import cancellation
+from .cancellation import Cancelled
+from .catalog import catalog_store, K8sEnv
+from . import handoff
+from .handoff import AdoptedProcess
+from .config import TEARDOWN_GRACE_SECONDS
+from .connections import connection_accountant
+from .credentials import credential_cache
+from .history import history, PhaseTimer
+from .procstats import process_sampler, group_id, combine_usage
+from .selfmon import self_monitor
+from .relay import RelayListener, find_free_port, wait_for_port
+from .singleflight import single_flight
+from .teardown import teardown, wait_for_exit, reap
 
 
 class K8sForwardState:
     """Manages K8s port-forward state persistence"""
 
     def __init__(self):
+        # Guards state against concurrent updates from job and watcher threads
+        self._lock = threading.RLock()
         self.state = self.load_state()
+        # Set once a new server took over: the state file is its to write
+        self.detached = False
 
     def load_state(self) -> Dict:
         """Load port-forward state from file"""
@@ -35,35 +64,55 @@ class K8sForwardState:
     def save_state(self):
         """Save port-forward state to file"""
         K8S_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(K8S_STATE_FILE, 'w') as f:
-            json.dump(self.state, f, indent=2)
+        with self._lock:
+            if self.detached:
+                return
+            with open(K8S_STATE_FILE, 'w') as f:
+                json.dump(self.state, f, indent=2)
 
-    def add_forward(self, env: str, pod_type: str, pod_name: str, pid: int, local_port: str, remote_port: str):
+    def add_forward(self, env: str, pod_type: str, pod_name: str, pid: int, local_port: str, remote_port: str, **extra):
         """Add a port-forward to state"""
         key = f"{env}_{pod_type}"
-        self.state[key] = {
-            "env": env,
-            "pod_type": pod_type,
-            "pod_name": pod_name,
-            "pid": pid,
-            "local_port": local_port,
-            "remote_port": remote_port,
-            "started_at": datetime.now().isoformat()
-        }
-        self.save_state()
+        with self._lock:
+            self.state[key] = {
+                "env": env,
+                "pod_type": pod_type,
+                "pod_name": pod_name,
+                "pid": pid,
+                "local_port": local_port,
+                "remote_port": remote_port,
+                "started_at": datetime.now().isoformat(),
+                **extra
+            }
+            self.save_state()
+
+    def update_forward(self, env: str, pod_type: str, **fields):
+        """Update fields of an existing port-forward"""
+        key = f"{env}_{pod_type}"
+        with self._lock:
+            if key in self.state:
+                # A new dict, so entries handed out earlier (state deltas compare them) stay as they were
+                self.state[key] = {**self.state[key], **fields}
+                self.save_state()
 
     def remove_forward(self, env: str, pod_type: str):
         """Remove a port-forward from state"""
         key = f"{env}_{pod_type}"
-        if key in self.state:
-            del self.state[key]
-            self.save_state()
+        with self._lock:
+            if key in self.state:
+                del self.state[key]
+                self.save_state()
 
     def get_forward(self, env: str, pod_type: str) -> Optional[Dict]:
         """Get port-forward state"""
         key = f"{env}_{pod_type}"
         return self.state.get(key)
 
+    def get_all_forwards(self) -> Dict:
+        """Get all port-forwards (a snapshot, safe to iterate while others update state)"""
+        with self._lock:
+            return dict(self.state)
+
     def is_forward_active(self, env: str, pod_type: str) -> bool:
         """Check if port-forward is active"""
         forward = self.get_forward(env, pod_type)
@@ -74,6 +123,11 @@ class K8sForwardState:
         if not pid:
             return False
 
+        # Balanced forwards live inside the server process that created them
+        if forward.get('mode') == 'balanced' and pid != os.getpid():
+            self.remove_forward(env, pod_type)
+            return False
+
         # Check if process is still running
         try:
             os.kill(pid, 0)
@@ -81,18 +135,22 @@ class K8sForwardState:
         except OSError:
             # Process not found, remove from state
             self.remove_forward(env, pod_type)
+            history.record_event("k8s", env, pod_type, "death", f"PID {pid} exited")
             return False
 
     def cleanup_orphaned(self):
         """Remove port-forwards with dead processes"""
         to_remove = []
-        for key, forward in self.state.items():
+        for key, forward in self.get_all_forwards().items():
             pid = forward.get('pid')
-            if pid:
+            if forward.get('mode') == 'balanced' and pid != os.getpid():
+                to_remove.append(key)
+            elif pid:
                 try:
                     os.kill(pid, 0)
                 except OSError:
                     to_remove.append(key)
+                    history.record_event("k8s", forward.get('env'), forward.get('pod_type'), "death", f"PID {pid} exited")
 
         for key in to_remove:
             env, pod_type = key.split('_', 1)
@@ -104,21 +162,81 @@ class K8sPortForwardManager:
 
     def __init__(self):
         self.state = K8sForwardState()
+        # Balanced forwards owned by this process: key -> {"listener", "stop_event", "processes"}
+        self._balanced: Dict[str, Dict] = {}
+        self._balanced_lock = threading.Lock()
+        # Grouped forwards: "<context>/<namespace>/<kind>/<name>" -> group (see _new_group)
+        self._groups: Dict[str, Dict] = {}
+        self._groups_lock = threading.Lock()
+        inherited = handoff.take("k8s") or {}
+        self._adopt_balanced(inherited.get("balanced", {}))
+        self._reap_stale_balanced()
+        self._restore_groups(inherited.get("groups", {}))
+
+    def _get_pods(self, context: str, namespace: str, prefix: str) -> List[Dict]:
+        """List pods in a namespace whose name starts with prefix"""
+        # Don't wait for kubectl to time out against a context known to be unusable
+        if credential_cache.known_problem(context=context):
+            return []
 
+        cmd = [
+            'kubectl',
+            '--context', context,
+            'get', 'pods',
+            '-n', namespace,
+            '--no-headers',
+            '-o', 'custom-columns=NAME:.metadata.name,STATUS:.status.phase,AGE:.metadata.creationTimestamp'
+        ]
+
+        pods = []
+        try:
+            result = cancellation.run_command(cmd, timeout=10)
+            if result.returncode != 0:
+                return pods
+
+            for line in result.stdout.strip().split('\n'):
+                if not line.strip():
+                    continue
+                parts = line.split()
+                if len(parts) < 2 or not parts[0].startswith(prefix):
+                    continue
+
+                # Calculate age
+                age = "Unknown"
+                if len(parts) >= 3:
+                    try:
+                        created_at = datetime.fromisoformat(parts[2].replace('Z', '+00:00'))
+                        age_seconds = (datetime.now().astimezone() - created_at).total_seconds()
+                        age = self._format_age(age_seconds)
+                    except:
+                        pass
+
+                pods.append({"name": parts[0], "status": parts[1], "age": age})
+        except subprocess.TimeoutExpired:
+            pass
+        except Exception:
+            pass
+
+        return pods
+
+    @single_flight
     def list_pods(self, env: str) -> List[Dict]:
-        """List all resources (pods and services) for an environment"""
-        env_config = K8S_CONFIGS.get(env)
+        """
+        List all resources (pods and services) for an environment
+        Concurrent callers for the same env share one kubectl run
+        """
+        env_config = catalog_store.current.k8s_env(env)
         if not env_config:
             return []
 
-        context = env_config['context']
-        resources_config = env_config['resources']
+        context = env_config.context
+        resources_config = env_config.resources
 
         all_resources = []
 
         for resource_type, resource_info in resources_config.items():
-            resource_kind = resource_info['type']
-            namespace = resource_info['namespace']
+            resource_kind = resource_info.type
+            namespace = resource_info.namespace
 
             # For services, we don't need to list pods - just return the config
             if resource_kind == 'service':
@@ -128,12 +246,12 @@ class K8sPortForwardManager:
 
                 resource_data = {
                     "pod_type": resource_type,  # Keep same key for compatibility
-                    "pod_name": resource_info['service_name'],  # Service name
-                    "display_name": resource_info['name'],
+                    "pod_name": resource_info.service_name,  # Service name
+                    "display_name": resource_info.name,
                     "status": "Available",  # Services are always available
                     "age": "N/A",
-                    "default_port": resource_info['default_port'],
-                    "suggested_local_port": resource_info['suggested_local_port'],
+                    "default_port": resource_info.default_port,
+                    "suggested_local_port": resource_info.suggested_local_port,
                     "is_forwarding": is_forwarding,
                     "forward_info": forward if is_forwarding else None,
                     "resource_kind": "service"
@@ -142,85 +260,73 @@ class K8sPortForwardManager:
                 continue
 
             # For pods, list them using kubectl
-            prefix = resource_info['prefix']
-
-            # Get pods matching prefix
-            cmd = [
-                'kubectl',
-                '--context', context,
-                'get', 'pods',
-                '-n', namespace,
-                '--no-headers',
-                '-o', 'custom-columns=NAME:.metadata.name,STATUS:.status.phase,AGE:.metadata.creationTimestamp'
-            ]
+            forward = self.state.get_forward(env, resource_type)
+            for pod in self._get_pods(context, namespace, resource_info.prefix):
+                pod_name = pod['name']
 
-            try:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    lines = result.stdout.strip().split('\n')
-                    for line in lines:
-                        if not line.strip():
-                            continue
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            pod_name = parts[0]
-                            if pod_name.startswith(prefix):
-                                status = parts[1]
-
-                                # Calculate age
-                                age = "Unknown"
-                                if len(parts) >= 3:
-                                    try:
-                                        created_at = datetime.fromisoformat(parts[2].replace('Z', '+00:00'))
-                                        age_seconds = (datetime.now().astimezone() - created_at).total_seconds()
-                                        age = self._format_age(age_seconds)
-                                    except:
-                                        pass
-
-                                # Check if port-forward is active
-                                forward = self.state.get_forward(env, resource_type)
-                                is_forwarding = forward is not None and forward.get('pod_name') == pod_name and self.state.is_forward_active(env, resource_type)
-
-                                pod_data = {
-                                    "pod_type": resource_type,
-                                    "pod_name": pod_name,
-                                    "display_name": resource_info['name'],
-                                    "status": status,
-                                    "age": age,
-                                    "default_port": resource_info['default_port'],
-                                    "suggested_local_port": resource_info['suggested_local_port'],
-                                    "is_forwarding": is_forwarding,
-                                    "forward_info": forward if is_forwarding else None,
-                                    "resource_kind": "pod"
-                                }
-                                all_resources.append(pod_data)
-            except subprocess.TimeoutExpired:
-                pass
-            except Exception as e:
-                pass
+                # Check if port-forward is active
+                if forward and forward.get('mode') == 'balanced':
+                    targets_pod = any(b.get('pod_name') == pod_name for b in forward.get('backends', []))
+                else:
+                    targets_pod = forward is not None and forward.get('pod_name') == pod_name
+                is_forwarding = targets_pod and self.state.is_forward_active(env, resource_type)
+
+                pod_data = {
+                    "pod_type": resource_type,
+                    "pod_name": pod_name,
+                    "display_name": resource_info.name,
+                    "status": pod['status'],
+                    "age": pod['age'],
+                    "default_port": resource_info.default_port,
+                    "suggested_local_port": resource_info.suggested_local_port,
+                    "is_forwarding": is_forwarding,
+                    "forward_info": forward if is_forwarding else None,
+                    "resource_kind": "pod"
+                }
+                all_resources.append(pod_data)
 
         return all_resources
 
-    def start_port_forward(self, env: str, pod_type: str, pod_name: str, local_port: str, remote_port: str) -> Tuple[bool, str, Optional[int]]:
+    def start_port_forward(self, env: str, pod_type: str, pod_name: str, local_port: str, remote_port: str,
+                           progress: Optional[Callable[[str], None]] = None) -> Tuple[bool, str, Optional[int]]:
         """Start a port-forward"""
+        timer = PhaseTimer()
+        try:
+            result = self._start_port_forward(
+                env, pod_type, pod_name, local_port, remote_port, progress or (lambda message: None), timer
+            )
+        except Cancelled as e:
+            history.record_start("k8s", env, pod_type, False, str(e), timer)
+            raise
+        history.record_start("k8s", env, pod_type, result[0], result[1], timer)
+        return result
+
+    def _start_port_forward(self, env: str, pod_type: str, pod_name: str, local_port: str, remote_port: str,
+                            report: Callable[[str], None], timer: PhaseTimer) -> Tuple[bool, str, Optional[int]]:
+        """Start a port-forward, marking the end of each phase on timer"""
+
         # Check if already forwarding
         if self.state.is_forward_active(env, pod_type):
             return False, f"Port-forward already active for {env.upper()} {pod_type}", None
 
         # Get configuration
-        env_config = K8S_CONFIGS.get(env)
+        env_config = catalog_store.current.k8s_env(env)
         if not env_config:
             return False, f"Invalid environment: {env}", None
 
-        context = env_config['context']
+        context = env_config.context
 
         # Get resource configuration
-        resource_config = env_config['resources'].get(pod_type)
+        resource_config = env_config.resources.get(pod_type)
         if not resource_config:
             return False, f"Invalid resource type: {pod_type}", None
 
-        namespace = resource_config['namespace']
-        resource_kind = resource_config['type']
+        problem = credential_cache.known_problem(context=context)
+        if problem:
+            return False, problem, None
+
+        namespace = resource_config.namespace
+        resource_kind = resource_config.type
 
         # Build kubectl command based on resource type
         if resource_kind == 'service':
@@ -228,6 +334,11 @@ class K8sPortForwardManager:
         else:
             resource_target = f'pod/{pod_name}'
 
+        if K8S_GROUP_FORWARDS:
+            return self._start_grouped_forward(
+                env, pod_type, pod_name, context, namespace, resource_target, local_port, remote_port, report, timer
+            )
+
         cmd = [
             'kubectl',
             '--context', context,
@@ -238,21 +349,33 @@ class K8sPortForwardManager:
         ]
 
         try:
-            # Start port-forward process in background
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                start_new_session=True
-            )
+            # Start port-forward process in background. Its stdout is not read, so it
+            # goes nowhere: a pipe would fill up and block kubectl, and leak our end
+            report(f"Starting kubectl port-forward to {resource_target}")
+            with tempfile.TemporaryFile(mode='w+') as err_file:
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=err_file,
+                    start_new_session=True
+                )
+                timer.mark("spawn")
+
+                # Wait a bit to check if it started successfully (a cancelled start kills it)
+                with cancellation.adopted(process):
+                    cancellation.sleep(1)
+                timer.mark("establish")
 
-            # Wait a bit to check if it started successfully
-            time.sleep(1)
+                # Check if process is still running
+                if process.poll() is not None:
+                    err_file.seek(0)
+                    stderr = err_file.read()
+                    credentials = credential_cache.check_context(context, refresh=True)
+                    if not credentials["valid"]:
+                        return False, credentials["message"], None
+                    return False, f"Failed to start port-forward: {stderr}", None
 
-            # Check if process is still running
-            if process.poll() is not None:
-                stderr = process.stderr.read().decode('utf-8') if process.stderr else ""
-                return False, f"Failed to start port-forward: {stderr}", None
+            self_monitor.track(process)
 
             # Add to state
             self.state.add_forward(env, pod_type, pod_name, process.pid, local_port, remote_port)
@@ -262,77 +385,713 @@ class K8sPortForwardManager:
         except Exception as e:
             return False, f"Error starting port-forward: {str(e)}", None
 
-    def stop_port_forward(self, env: str, pod_type: str) -> Tuple[bool, str]:
-        """Stop a port-forward"""
-        forward = self.state.get_forward(env, pod_type)
-        if not forward:
-            return False, "Port-forward not found"
+    # ------------------------------------------------------------------
+    # Grouped forwards: one kubectl per (context, namespace, target) for every port
+    # ------------------------------------------------------------------
 
-        pid = forward.get('pid')
-        if not pid:
-            self.state.remove_forward(env, pod_type)
-            return False, "No PID found for port-forward"
+    def _spawn_group(self, context: str, namespace: str, target: str,
+                     pairs: Dict[str, str]) -> Tuple[Optional[subprocess.Popen], Dict[str, int], str]:
+        """
+        Start one kubectl port-forward carrying every (local_port -> remote_port)
+        pair, each on a private port, and wait until all of them listen
+        Returns: (process, {local_port: private_port}, error)
+        """
+        private = {local_port: find_free_port() for local_port in pairs}
+        cmd = [
+            'kubectl',
+            '--context', context,
+            'port-forward',
+            '-n', namespace,
+            '--address', '127.0.0.1',
+            target,
+            *[f'{private[local_port]}:{remote_port}' for local_port, remote_port in pairs.items()]
+        ]
+
+        with tempfile.TemporaryFile(mode='w+') as err_file:
+            try:
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=err_file,
+                    start_new_session=True
+                )
+            except Exception as e:
+                return None, {}, str(e)
+
+            deadline = time.monotonic() + K8S_BACKEND_READY_TIMEOUT
+            waiting = set(private.values())
+            with cancellation.adopted(process):
+                while waiting and process.poll() is None and time.monotonic() < deadline:
+                    waiting = {port for port in waiting if not wait_for_port(port, 0)}
+                    if waiting:
+                        cancellation.sleep(0.05)
+
+            if not waiting and process.poll() is None:
+                return process, private, ""
+            if process.poll() is None:
+                self._terminate_process(process)
+                return None, {}, f"kubectl did not listen within {K8S_BACKEND_READY_TIMEOUT}s"
+            err_file.seek(0)
+            return None, {}, err_file.read().strip() or f"kubectl exited with code {process.returncode}"
+
+    @staticmethod
+    def _new_group(group_key: str) -> Dict:
+        """
+        In-memory state of a group:
+            ports     local_port -> remote_port carried by the current kubectl
+            private   local_port -> private port of the current kubectl
+            members   local_port -> (env, pod_type)
+            fronts    local_port -> relay listener on the local port
+            draining  pid -> replaced kubectl still serving open connections
+        """
+        context, namespace, kind, name = group_key.rsplit('/', 3)
+        return {
+            "key": group_key,
+            "context": context,
+            "namespace": namespace,
+            "target": f"{kind}/{name}",
+            "pid": None,
+            "ports": {},
+            "private": {},
+            "members": {},
+            "fronts": {},
+            "draining": {},
+            "lock": threading.Lock(),
+            "stop": threading.Event(),
+            "closed": False
+        }
+
+    def _start_grouped_forward(self, env: str, pod_type: str, pod_name: str, context: str, namespace: str,
+                               target: str, local_port: str, remote_port: str, report: Callable[[str], None],
+                               timer: PhaseTimer) -> Tuple[bool, str, Optional[int]]:
+        """Add a port to the kubectl of its target, regrouping the ports already forwarded there"""
+        key = f"{env}_{pod_type}"
+        group_key = f"{context}/{namespace}/{target}"
+
+        while True:
+            with self._groups_lock:
+                group = self._groups.get(group_key)
+                if group is None:
+                    group = self._groups[group_key] = self._new_group(group_key)
+            with group["lock"]:
+                # The group's last port was stopped (or its kubectl died) while we waited
+                if group["closed"]:
+                    continue
+
+                if local_port in group["members"]:
+                    return False, f"localhost:{local_port} is already forwarded to {target}", None
+                pairs = dict(group["ports"])
+                pairs[local_port] = remote_port
+                report(f"Starting kubectl port-forward to {target}" +
+                       (f" ({len(pairs)} ports)" if len(pairs) > 1 else ""))
+                with cancellation.rollback() as undo:
+                    undo.add(lambda: self._discard_empty_group(group))
+                    process, private, error = self._spawn_group(context, namespace, target, pairs)
+                timer.mark("establish")
+                if not process:
+                    self._discard_empty_group(group)
+                    credentials = credential_cache.check_context(context, refresh=True)
+                    if not credentials["valid"]:
+                        return False, credentials["message"], None
+                    return False, f"Failed to start port-forward: {error}", None
+
+                front = RelayListener(key, int(local_port))
+                try:
+                    front.start()
+                except Exception as e:
+                    self._terminate_process(process)
+                    self._discard_empty_group(group)
+                    return False, f"Error binding localhost:{local_port}: {e}", None
+                timer.mark("front")
+
+                # New connections on every port go to the new kubectl; the old one drains
+                backend_name = f"kubectl-{process.pid}"
+                front.set_backends([(backend_name, '127.0.0.1', private[local_port])])
+                replaced = []
+                for port, listener in group["fronts"].items():
+                    old = listener.backend(f"kubectl-{group['pid']}")
+                    if old:
+                        replaced.append(old)
+                    listener.set_backends([(backend_name, '127.0.0.1', private[port])])
+
+                old_pid = group["pid"]
+                group.update(pid=process.pid, ports=pairs, private=private)
+                group["fronts"][local_port] = front
+                group["members"][local_port] = (env, pod_type)
+
+                for port, (member_env, member_type) in group["members"].items():
+                    if port != local_port:
+                        self.state.update_forward(member_env, member_type, pid=process.pid, private_port=private[port])
+                self.state.add_forward(
+                    env, pod_type, pod_name, process.pid, local_port, remote_port,
+                    mode='grouped', group=group_key, private_port=private[local_port]
+                )
+                self._watch_group(group, process.pid)
+                if old_pid:
+                    self._drain(group, old_pid, replaced)
+            break
+
+        message = f"Port-forward started on localhost:{local_port}"
+        if len(pairs) > 1:
+            message += f" (one kubectl for {len(pairs)} ports of {target})"
+        return True, message, process.pid
+
+    def _discard_empty_group(self, group: Dict):
+        """Forget a group that never got a port (called with the group lock held)"""
+        if not group["members"]:
+            group["closed"] = True
+            with self._groups_lock:
+                if self._groups.get(group["key"]) is group:
+                    del self._groups[group["key"]]
+
+    def _watch_group(self, group: Dict, pid: int):
+        """Close the group's ports as soon as its current kubectl exits"""
+        def watch():
+            if not wait_for_exit(pid, group["stop"]):
+                return
+            try:
+                self._group_exited(group, pid)
+            except Exception as e:
+                print(f"Error handling exit of kubectl {pid} for {group['target']}: {e}")
+            finally:
+                reap(pid)
+
+        threading.Thread(target=watch, name=f"group-watch-{pid}", daemon=True).start()
+
+    def _group_exited(self, group: Dict, pid: int):
+        with group["lock"]:
+            group["draining"].pop(pid, None)
+            # A replaced kubectl finishing its drain is not a death
+            if group["closed"] or group["pid"] != pid:
+                return
+            group["closed"] = True
+            group["stop"].set()
+            with self._groups_lock:
+                if self._groups.get(group["key"]) is group:
+                    del self._groups[group["key"]]
+            for front in group["fronts"].values():
+                try:
+                    front.stop()
+                except Exception as e:
+                    print(f"Error closing listener for {group['target']}: {e}")
+            for env, pod_type in group["members"].values():
+                forward = self.state.get_forward(env, pod_type)
+                if forward and forward.get('pid') == pid:
+                    self.state.remove_forward(env, pod_type)
+                    history.record_event("k8s", env, pod_type, "death", f"PID {pid} exited")
+
+    def _drain(self, group: Dict, pid: int, backends: List):
+        """Stop a replaced kubectl once the connections still open on it are closed"""
+        group["draining"][pid] = backends
+
+        def drain():
+            deadline = time.monotonic() + K8S_DRAIN_TIMEOUT_SECONDS
+            while (pid in group["draining"] and any(backend.active for backend in backends)
+                   and time.monotonic() < deadline):
+                time.sleep(0.5)
+            # Stopping the group may have taken over the teardown
+            if group["draining"].pop(pid, None) is not None:
+                teardown([{"key": f"{group['key']}/drain", "pid": pid}])
+
+        threading.Thread(target=drain, name=f"group-drain-{pid}", daemon=True).start()
+
+    def _release_grouped_forward(self, env: str, pod_type: str, forward: Dict) -> List[Dict]:
+        """
+        Close one port of a group and return what to tear down: nothing while
+        other ports remain (the kubectl keeps an unused private port until the
+        next regroup), the kubectl and any draining one with the last port
+        """
+        self.state.remove_forward(env, pod_type)
+        group_key = forward.get('group')
+        group = self._groups.get(group_key)
+        if not group:
+            shared = any(
+                other.get('group') == group_key and other.get('pid') == forward.get('pid')
+                for other in self.state.get_all_forwards().values()
+            )
+            return [] if shared else [{"key": group_key, "pid": forward.get('pid')}]
+
+        with group["lock"]:
+            port = forward['local_port']
+            front = group["fronts"].pop(port, None)
+            if front:
+                try:
+                    front.stop()
+                except Exception as e:
+                    print(f"Error closing listener for {env}_{pod_type}: {e}")
+            group["members"].pop(port, None)
+            group["ports"].pop(port, None)
+            if group["members"]:
+                return []
+
+            group["closed"] = True
+            group["stop"].set()
+            with self._groups_lock:
+                if self._groups.get(group_key) is group:
+                    del self._groups[group_key]
+            targets = [{"key": group_key, "pid": group["pid"]}]
+            targets.extend({"key": f"{group_key}/drain", "pid": pid} for pid in group["draining"])
+            group["draining"].clear()
+            return targets
+
+    def _restore_groups(self, inherited: Dict[str, Dict]):
+        """
+        Re-create the relays of grouped forwards whose kubectl outlived a previous
+        server process. After a handoff the relays are taken over with their open
+        connections, and replaced kubectls keep draining
+        """
+        for forward in list(self.state.get_all_forwards().values()):
+            if forward.get('mode') != 'grouped':
+                continue
+            env, pod_type = forward['env'], forward['pod_type']
+            if not self.state.is_forward_active(env, pod_type):
+                continue
+            group = self._groups.get(forward['group'])
+            if group is None:
+                group = self._groups[forward['group']] = self._new_group(forward['group'])
+                group["pid"] = forward['pid']
+                self._watch_group(group, forward['pid'])
+            if group["pid"] != forward['pid']:
+                continue
+
+            port = forward['local_port']
+            relay = inherited.get(forward['group'], {}).get("fronts", {}).get(port)
+            try:
+                front = RelayListener(f"{env}_{pod_type}", int(port))
+                front.set_backends([(f"kubectl-{group['pid']}", '127.0.0.1', int(forward['private_port']))])
+                if relay is not None:
+                    front.adopt(relay, handoff.inherited)
+                else:
+                    front.start()
+            except Exception as e:
+                print(f"Error restoring relay for {env}/{pod_type}: {e}")
+                continue
+            group["ports"][port] = forward['remote_port']
+            group["private"][port] = int(forward['private_port'])
+            group["fronts"][port] = front
+            group["members"][port] = (env, pod_type)
+
+        for group_key, data in inherited.items():
+            group = self._groups.get(group_key)
+            if group is None or group["pid"] != data["pid"]:
+                continue
+            for pid in data["draining"]:
+                name = f"kubectl-{pid}"
+                backends = [front.open_backend(name) for front in group["fronts"].values()]
+                self._drain(group, int(pid), [backend for backend in backends if backend])
 
+    # ------------------------------------------------------------------
+    # Balanced forwards: one local listener spread across every running pod
+    # ------------------------------------------------------------------
+
+    def start_balanced_forward(self, env: str, pod_type: str, local_port: str, remote_port: str,
+                               progress: Optional[Callable[[str], None]] = None) -> Tuple[bool, str, Optional[int]]:
+        """
+        Start a load-balanced port-forward across all running pods matching the resource prefix
+        Returns: (success, message, pid)
+        """
+        timer = PhaseTimer()
         try:
-            # Kill the process group
+            result = self._start_balanced_forward(
+                env, pod_type, local_port, remote_port, progress or (lambda message: None), timer
+            )
+        except Cancelled as e:
+            history.record_start("k8s", env, pod_type, False, str(e), timer)
+            raise
+        history.record_start("k8s", env, pod_type, result[0], result[1], timer)
+        return result
+
+    def _start_balanced_forward(self, env: str, pod_type: str, local_port: str, remote_port: str,
+                                report: Callable[[str], None], timer: PhaseTimer) -> Tuple[bool, str, Optional[int]]:
+        """Start a balanced port-forward, marking the end of each phase on timer"""
+
+        if self.state.is_forward_active(env, pod_type):
+            return False, f"Port-forward already active for {env.upper()} {pod_type}", None
+
+        env_config = catalog_store.current.k8s_env(env)
+        if not env_config:
+            return False, f"Invalid environment: {env}", None
+
+        resource_config = env_config.resources.get(pod_type)
+        if not resource_config:
+            return False, f"Invalid resource type: {pod_type}", None
+
+        if resource_config.type != 'pod':
+            return False, f"Balanced port-forward is only supported for pod resources ({pod_type} is a {resource_config.type})", None
+
+        problem = credential_cache.known_problem(context=env_config.context)
+        if problem:
+            return False, problem, None
+
+        key = f"{env}_{pod_type}"
+        listener = RelayListener(key, int(local_port))
+        try:
+            listener.start()
+        except Exception as e:
+            return False, f"Error binding localhost:{local_port}: {e}", None
+        timer.mark("listener")
+
+        entry = {"listener": listener, "stop_event": threading.Event(), "lock": threading.Lock(), "processes": {}}
+        with self._balanced_lock:
+            self._balanced[key] = entry
+
+        self.state.add_forward(
+            env, pod_type, resource_config.prefix, os.getpid(), local_port, remote_port,
+            mode='balanced', backends=[]
+        )
+        report("Starting a kubectl backend per running pod")
+        with cancellation.rollback() as undo:
+            undo.add(lambda: self._stop_balanced_forward(env, pod_type))
+            self._sync_balanced_backends(env, pod_type)
+        timer.mark("backends")
+
+        backend_count = len(listener.backend_names())
+        if backend_count == 0:
+            self._stop_balanced_forward(env, pod_type)
+            credentials = credential_cache.check_context(env_config.context, refresh=True)
+            if not credentials["valid"]:
+                return False, credentials["message"], None
+            return False, f"No running {pod_type} pods found in {env.upper()}", None
+
+        watcher = threading.Thread(
+            target=self._watch_balanced_forward,
+            args=(env, pod_type, entry["stop_event"]),
+            name=f"balance-{key}",
+            daemon=True
+        )
+        watcher.start()
+
+        return True, f"Balanced port-forward started on localhost:{local_port} across {backend_count} pod(s)", os.getpid()
+
+    def _spawn_pod_backend(self, context: str, namespace: str, pod_name: str, remote_port: str) -> Tuple[Optional[subprocess.Popen], Optional[int]]:
+        """Start a kubectl port-forward to one pod on a private local port"""
+        port = find_free_port()
+        cmd = [
+            'kubectl',
+            '--context', context,
+            'port-forward',
+            '-n', namespace,
+            '--address', '127.0.0.1',
+            f'pod/{pod_name}',
+            f'{port}:{remote_port}'
+        ]
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+        except Exception as e:
+            print(f"Error starting backend for pod {pod_name}: {e}")
+            return None, None
+        return process, port
+
+    def _sync_balanced_backends(self, env: str, pod_type: str):
+        """Reconcile per-pod kubectl backends with the current list of running pods"""
+        key = f"{env}_{pod_type}"
+        entry = self._balanced.get(key)
+        if not entry:
+            return
+
+        with entry["lock"]:
+            # The forward may have been stopped while we waited for the lock
+            forward = self.state.get_forward(env, pod_type)
+            if entry["stop_event"].is_set() or not forward:
+                return
+            self._reconcile_backends(env, pod_type, entry, forward)
+
+    def _reconcile_backends(self, env: str, pod_type: str, entry: Dict, forward: Dict):
+        """Start and stop per-pod backends so they match the running pods"""
+        env_config = catalog_store.current.k8s_env(env)
+        resource_config = env_config.resources.get(pod_type) if env_config else None
+        if not resource_config:
+            # Removed from the config; the reload stops this forward
+            return
+        context = env_config.context
+        namespace = resource_config.namespace
+        listener = entry["listener"]
+        processes = entry["processes"]
+
+        running = set(
+            pod['name']
+            for pod in self._get_pods(context, namespace, resource_config.prefix)
+            if pod['status'] == 'Running'
+        )
+
+        # Drop backends whose pod is gone or whose kubectl died
+        for pod_name in list(processes):
+            process, _ = processes[pod_name]
+            if pod_name not in running or process.poll() is not None:
+                listener.remove_backend(pod_name)
+                self._terminate_process(process)
+                del processes[pod_name]
+
+        # Start backends for new pods, then wait for them together
+        started = {}
+        for pod_name in running - set(processes):
+            process, port = self._spawn_pod_backend(context, namespace, pod_name, forward['remote_port'])
+            if process:
+                started[pod_name] = (process, port)
+
+        for pod_name, (process, port) in started.items():
+            if wait_for_port(port, K8S_BACKEND_READY_TIMEOUT) and process.poll() is None:
+                processes[pod_name] = (process, port)
+                listener.add_backend(pod_name, '127.0.0.1', port)
+            else:
+                self._terminate_process(process)
+
+        self.state.update_forward(
+            env, pod_type,
+            backends=[
+                {"pod_name": pod_name, "pid": process.pid, "port": port}
+                for pod_name, (process, port) in sorted(processes.items())
+            ]
+        )
+
+    def _watch_balanced_forward(self, env: str, pod_type: str, stop_event: threading.Event):
+        """Periodically follow pod changes (rollouts, scaling) for a balanced forward"""
+        while not stop_event.wait(K8S_BALANCE_RESYNC_SECONDS):
             try:
-                os.killpg(os.getpgid(pid), signal.SIGTERM)
-            except ProcessLookupError:
-                # Process already dead
-                pass
+                self._sync_balanced_backends(env, pod_type)
+            except Exception as e:
+                print(f"Error resyncing balanced forward {env}/{pod_type}: {e}")
+
+    def _release_balanced_forward(self, env: str, pod_type: str) -> List[Dict]:
+        """Close the listener of a balanced forward and return its per-pod backends as teardown targets"""
+        key = f"{env}_{pod_type}"
+        with self._balanced_lock:
+            entry = self._balanced.pop(key, None)
+
+        targets = []
+        if entry:
+            entry["stop_event"].set()
+            with entry["lock"]:
+                try:
+                    entry["listener"].stop()
+                except Exception as e:
+                    print(f"Error closing listener for {key}: {e}")
+                for pod_name, (process, _) in entry["processes"].items():
+                    targets.append({"key": f"{key}/{pod_name}", "pid": process.pid})
+                entry["processes"].clear()
+
+        self.state.remove_forward(env, pod_type)
+        return targets
 
-            # Wait a bit and force kill if needed
-            time.sleep(0.5)
+    def _stop_balanced_forward(self, env: str, pod_type: str) -> List[Dict]:
+        """Close the listener and stop every per-pod backend of a balanced forward in parallel"""
+        return teardown(self._release_balanced_forward(env, pod_type))
+
+    def _adopt_balanced(self, inherited: Dict[str, Dict]):
+        """Take over the balanced forwards (listener, connections, kubectls) of the previous server"""
+        forwards = self.state.get_all_forwards()
+        for key, data in inherited.items():
+            forward = forwards.get(key)
+            if not forward or forward.get('mode') != 'balanced':
+                continue
+            env, pod_type = forward['env'], forward['pod_type']
+            processes = {
+                pod_name: (AdoptedProcess(pid), port) for pod_name, (pid, port) in data["processes"].items()
+            }
+            listener = RelayListener(key, int(forward['local_port']))
+            listener.set_backends([(pod_name, '127.0.0.1', port) for pod_name, (_, port) in processes.items()])
             try:
-                os.kill(pid, 0)  # Check if still alive
-                os.killpg(os.getpgid(pid), signal.SIGKILL)
+                listener.adopt(data["listener"], handoff.inherited)
+            except Exception as e:
+                # Left to _reap_stale_balanced
+                print(f"Error adopting balanced forward {env}/{pod_type}: {e}")
+                continue
+
+            entry = {"listener": listener, "stop_event": threading.Event(), "lock": threading.Lock(),
+                     "processes": processes}
+            with self._balanced_lock:
+                self._balanced[key] = entry
+            self.state.update_forward(env, pod_type, pid=os.getpid())
+            threading.Thread(
+                target=self._watch_balanced_forward,
+                args=(env, pod_type, entry["stop_event"]),
+                name=f"balance-{key}",
+                daemon=True
+            ).start()
+
+    def export_handoff(self, package: "handoff.Package") -> Dict:
+        """Relays and kubectls of grouped and balanced forwards for the next server"""
+        for forward in self.state.get_all_forwards().values():
+            if forward.get('mode') != 'balanced':
+                package.add_pid(forward.get('pid'))
+
+        groups = {}
+        for group_key, group in list(self._groups.items()):
+            with group["lock"]:
+                for pid in group["draining"]:
+                    package.add_pid(pid)
+                groups[group_key] = {
+                    "pid": group["pid"],
+                    "fronts": {port: front.export(package.add_socket) for port, front in group["fronts"].items()},
+                    "draining": list(group["draining"])
+                }
+
+        balanced = {}
+        for key, entry in list(self._balanced.items()):
+            with entry["lock"]:
+                for process, _ in entry["processes"].values():
+                    package.add_pid(process.pid)
+                balanced[key] = {
+                    "listener": entry["listener"].export(package.add_socket),
+                    "processes": {
+                        pod_name: [process.pid, port] for pod_name, (process, port) in entry["processes"].items()
+                    }
+                }
+        return {"groups": groups, "balanced": balanced}
+
+    def release_handoff(self):
+        """The next server took over: stop watching kubectls and relaying, and leave the state file alone"""
+        for group in list(self._groups.values()):
+            group["stop"].set()
+            # Draining kubectls are the next server's to stop
+            group["draining"].clear()
+            for front in group["fronts"].values():
+                try:
+                    front.release()
+                except Exception as e:
+                    print(f"Error releasing listener for {group['target']}: {e}")
+        for key, entry in list(self._balanced.items()):
+            entry["stop_event"].set()
+            try:
+                entry["listener"].release()
+            except Exception as e:
+                print(f"Error releasing listener for {key}: {e}")
+        self.state.detached = True
+
+    def _reap_stale_balanced(self):
+        """Kill backends left behind by balanced forwards of a previous server process"""
+        for forward in self.state.get_all_forwards().values():
+            if forward.get('mode') != 'balanced' or forward.get('pid') == os.getpid():
+                continue
+            for backend in forward.get('backends', []):
+                try:
+                    os.killpg(os.getpgid(backend['pid']), signal.SIGTERM)
+                except (OSError, KeyError):
+                    pass
+        self.state.cleanup_orphaned()
+
+    @staticmethod
+    def _terminate_process(process: subprocess.Popen):
+        """Terminate a backend process group and reap it"""
+        try:
+            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(os.getpgid(process.pid), signal.SIGKILL)
             except OSError:
-                pass  # Already dead
+                pass
+            process.wait()
 
-            # Remove from state
-            self.state.remove_forward(env, pod_type)
+    def _release_forward(self, env: str, pod_type: str, forward: Dict) -> List[Dict]:
+        """Forget a port-forward and return the processes to tear down"""
+        history.record_event("k8s", env, pod_type, "stop")
+        if forward.get('mode') == 'balanced':
+            return self._release_balanced_forward(env, pod_type)
+        if forward.get('mode') == 'grouped':
+            return self._release_grouped_forward(env, pod_type, forward)
 
-            return True, "Port-forward stopped"
+        self.state.remove_forward(env, pod_type)
+        pid = forward.get('pid')
+        return [{"key": f"{env}_{pod_type}", "pid": pid}] if pid else []
 
-        except Exception as e:
-            # Remove from state anyway
-            self.state.remove_forward(env, pod_type)
-            return True, f"Port-forward stopped (with warning: {str(e)})"
+    def stop_port_forward(self, env: str, pod_type: str) -> Tuple[bool, str]:
+        """Stop a port-forward and wait for its processes to exit"""
+        forward = self.state.get_forward(env, pod_type)
+        if not forward:
+            return False, "Port-forward not found"
 
-    def stop_all_forwards(self) -> Tuple[int, List[str]]:
-        """Stop all active port-forwards"""
+        targets = self._release_forward(env, pod_type, forward)
+        if forward.get('mode') == 'balanced':
+            teardown(targets)
+            return True, "Balanced port-forward stopped"
+        if forward.get('mode') == 'grouped' and not targets:
+            return True, "Port-forward stopped (its kubectl keeps serving the other ports of the target)"
+        if not targets:
+            return False, "No PID found for port-forward"
+
+        outcome = teardown(targets)[0]
+        if outcome["outcome"] == "killed":
+            return True, f"Port-forward killed after {TEARDOWN_GRACE_SECONDS}s grace period"
+        if outcome["outcome"] == "failed":
+            return True, f"Port-forward stopped (with warning: {outcome['error']})"
+        return True, "Port-forward stopped"
+
+    def stop_all_forwards(self) -> Tuple[int, List[str], List[Dict]]:
+        """
+        Stop all active port-forwards, every process at once
+        Returns: (stopped_count, errors, per-process teardown outcomes)
+        """
         stopped_count = 0
         errors = []
+        targets = []
 
-        # Get all forwards
-        forwards = list(self.state.state.items())
-
-        for key, forward in forwards:
+        for key, forward in list(self.state.get_all_forwards().items()):
             env = forward.get('env')
             pod_type = forward.get('pod_type')
 
             if env and pod_type:
-                success, message = self.stop_port_forward(env, pod_type)
-                if success:
+                released = self._release_forward(env, pod_type, forward)
+                if released or forward.get('mode') in ('balanced', 'grouped'):
                     stopped_count += 1
+                    targets.extend(released)
                 else:
-                    errors.append(message)
+                    errors.append(f"No PID found for port-forward {key}")
 
-        return stopped_count, errors
+        outcomes = teardown(targets)
+        for outcome in outcomes:
+            if outcome["outcome"] == "failed":
+                errors.append(f"Could not stop {outcome['key']} (PID {outcome['pid']}): {outcome['error']}")
 
+        return stopped_count, errors, outcomes
+
+    def stop_balanced_forwards(self) -> List[Dict]:
+        """
+        Stop the balanced forwards owned by this server process; their listener
+        dies with the server, so the kubectl backends would be left unreachable.
+        Replaced kubectls of grouped forwards that are still draining go too
+        (grouped forwards themselves get their relays back on the next start)
+        """
+        targets = []
+        for key, forward in list(self.state.get_all_forwards().items()):
+            if key in self._balanced:
+                targets.extend(self._release_forward(forward['env'], forward['pod_type'], forward))
+        for group in list(self._groups.values()):
+            with group["lock"]:
+                targets.extend({"key": f"{group['key']}/drain", "pid": pid} for pid in group["draining"])
+                group["draining"].clear()
+        return teardown(targets)
+
+    @single_flight
     def get_all_forwards(self) -> Dict[str, List[Dict]]:
-        """Get all active port-forwards grouped by environment"""
+        """Get all active port-forwards grouped by environment (coalesced across concurrent callers)"""
         self.state.cleanup_orphaned()
 
-        forwards_by_env = {
-            'dev': [],
-            'pre': [],
-            'pro': []
-        }
+        # Every configured env, even without forwards; forwards of an env since removed from the config are kept
+        forwards_by_env = {env: [] for env in catalog_store.current.envs}
 
-        for key, forward in self.state.state.items():
+        # Process groups per forward: the kubectl process, or every per-pod backend when balanced
+        forwards = self.state.get_all_forwards()
+        groups = {}
+        for key, forward in forwards.items():
+            if forward.get('mode') == 'balanced':
+                pids = [b.get('pid') for b in forward.get('backends', [])]
+            else:
+                pids = [forward.get('pid')]
+            groups[key] = [group_id(pid) for pid in pids]
+        usage = process_sampler.sample(pgid for pgids in groups.values() for pgid in pgids)
+
+        for key, forward in forwards.items():
             env = forward.get('env')
-            if env in forwards_by_env:
+            if env:
                 # Calculate uptime
                 started_at = forward.get('started_at')
                 uptime_seconds = None
@@ -345,12 +1104,107 @@ class K8sPortForwardManager:
 
                 forward_info = {
                     **forward,
-                    'uptime_seconds': uptime_seconds
+                    'uptime_seconds': uptime_seconds,
+                    'resources': combine_usage(usage.get(pgid) for pgid in groups[key]),
+                    **connection_accountant.usage(f"k8s:{key}")
                 }
-                forwards_by_env[env].append(forward_info)
+
+                balanced = self._balanced.get(key)
+                if balanced:
+                    forward_info['relay'] = balanced['listener'].stats()
+                group = self._groups.get(forward.get('group'))
+                if group and forward.get('local_port') in group["fronts"]:
+                    forward_info['relay'] = group["fronts"][forward['local_port']].stats()
+                    forward_info['group_ports'] = sorted(group["members"])
+                forwards_by_env.setdefault(env, []).append(forward_info)
 
         return forwards_by_env
 
+    @staticmethod
+    def total_resources(forwards_by_env: Dict[str, List[Dict]]) -> Dict:
+        """Aggregate resource usage of every forward in a get_all_forwards() result"""
+        # Grouped forwards of one target share a kubectl; count it once
+        usages = {}
+        for forwards in forwards_by_env.values():
+            for forward in forwards:
+                usages.setdefault(forward.get('group') or id(forward), forward.get('resources'))
+        return combine_usage(usages.values())
+
+    def connection_targets(self) -> List[Dict]:
+        """Tracked port-forwards in the form expected by the connection accountant"""
+        targets = []
+        for key, forward in self.state.get_all_forwards().items():
+            env, pod_type = forward.get('env'), forward.get('pod_type')
+            if not env or not pod_type:
+                continue
+            targets.append({
+                "key": f"k8s:{key}",
+                "kind": "k8s",
+                "env": env,
+                "name": pod_type,
+                "port": forward['local_port'],
+                "started_at": forward.get('started_at'),
+                "idle_timeout_minutes": K8S_IDLE_TIMEOUT_MINUTES.get(
+                    key, K8S_IDLE_TIMEOUT_MINUTES.get(pod_type, K8S_IDLE_TIMEOUT_DEFAULT_MINUTES)
+                ),
+                "stop": lambda env=env, pod_type=pod_type: self.stop_port_forward(env, pod_type),
+                "alive": lambda env=env, pod_type=pod_type: self.state.is_forward_active(env, pod_type)
+            })
+        return targets
+
+    def prewarm(self) -> Dict[str, str]:
+        """
+        Check every configured kube context once, in parallel, so exec
+        credential plugins have fresh tokens before the first listing
+        Returns: {env: "ok" or the reason the context is not usable}
+        """
+        def check(env_config: K8sEnv) -> str:
+            entry = credential_cache.check_context(env_config.context, refresh=True)
+            return "ok" if entry["valid"] else entry["message"]
+
+        k8s_envs = catalog_store.current.k8s
+        with ThreadPoolExecutor(max_workers=max(1, len(k8s_envs))) as pool:
+            results = pool.map(check, k8s_envs.values())
+            return dict(zip(k8s_envs.keys(), results))
+
+    def apply_catalog_changes(self, changes: Dict) -> List[Dict]:
+        """
+        Restart running port-forwards whose resource definition changed in the
+        config file (same pod, ports and mode) and stop those that were removed
+        Returns: [{"env", "pod_type", "action", "success", "message"}]
+        """
+        def apply(target: Tuple[str, str, str, Dict]) -> Dict:
+            env, pod_type, action, forward = target
+            success, message = self.stop_port_forward(env, pod_type)
+            if action == "restart":
+                resource = catalog_store.current.resource(env, pod_type)
+                if forward.get('mode') == 'balanced':
+                    success, message, _ = self.start_balanced_forward(
+                        env, pod_type, forward['local_port'], forward['remote_port']
+                    )
+                else:
+                    # A service forward follows a renamed service; a pod forward keeps its pod
+                    pod_name = resource.service_name if resource.type == 'service' else forward['pod_name']
+                    success, message, _ = self.start_port_forward(
+                        env, pod_type, pod_name, forward['local_port'], forward['remote_port']
+                    )
+            return {"env": env, "pod_type": pod_type, "action": action, "success": success, "message": message}
+
+        targets = []
+        for action, keys in (("restart", changes["k8s"]["changed"]), ("stop", changes["k8s"]["removed"])):
+            for env, pod_type in keys:
+                forward = self.state.get_forward(env, pod_type)
+                if forward and self.state.is_forward_active(env, pod_type):
+                    targets.append((env, pod_type, action, forward))
+        if not targets:
+            return []
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            results = list(pool.map(apply, targets))
+        for result in results:
+            print(f"Config reload: {result['action']} {result['env']}/{result['pod_type']}: {result['message']}")
+        return results
+
     @staticmethod
     def _format_age(seconds: float) -> str:
         """Format age in human readable format"""
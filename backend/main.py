@@ -2,23 +2,74 @@
 FastAPI application for Tunnel Manager Web
 """
 
-from fastapi import FastAPI, HTTPException, Response
-from fastapi.responses import HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import logging
+import os
+import signal
+import threading
 
 from .tunnel_manager import TunnelManager
 from .k8s_manager import K8sPortForwardManager
+from .jobs import JobScheduler
+from .catalog import catalog_store
+from .connections import connection_accountant
+from .instances import instance_selector
+from .state import STATE_SECTIONS, StateTracker, strip_volatile
+from .history import history
+from .credentials import credential_cache
+from . import cancellation
+from .cancellation import CancelToken, Cancelled
+from .selfmon import self_monitor
+from .teardown import summarize
+from .unix_socket import UnixSocketServer
+from . import handoff
+from .handoff import HandoffServer, RequestGuardMiddleware, request_guard
+from .relay import relay_loop
+from .assets import AssetStore, IMMUTABLE_CACHE, REVALIDATE_CACHE
 from .models import (
     TunnelListResponse,
     StartTunnelRequest,
     StartTunnelResponse,
+    StartEnvRequest,
+    StartEnvResponse,
     StopTunnelRequest,
     StopTunnelResponse,
-    StopAllResponse
+    StopAllResponse,
+    ShutdownRequest,
+    GatewayStatusResponse,
+    JobRequest,
+    JobInfo,
+    JobListResponse,
+    StateResponse
+)
+from .config import (
+    SERVER_HOST,
+    SERVER_PORT,
+    DEV_MODE,
+    PREWARM_ON_STARTUP,
+    UNIX_SOCKET_PATH,
+    HANDOFF_SOCKET_PATH,
+    HANDOFF_POOL_DRAIN_SECONDS,
+    SHUTDOWN_POLICY,
+    GATEWAY_MODE,
+    GATEWAY_HOST,
+    JOB_CONCURRENCY_PER_PROFILE,
+    JOB_CONCURRENCY_PER_CONTEXT,
+    JOB_CONCURRENCY_OVERRIDES,
+    OPERATION_DEADLINES,
+    DISCONNECT_POLL_SECONDS
 )
-from .config import SERVER_HOST, SERVER_PORT
 
 # Configure logging
 logging.basicConfig(
@@ -27,84 +78,324 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class LazyManager:
+    """
+    Builds a manager on first use, so the server can answer (health checks,
+    the frontend) before state files are loaded and stale processes reaped
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+# Start-up progress reported by /api/ready
+readiness = {"startup_ms": None, "managers": False, "prewarm": "pending", "prewarm_ms": None,
+             "instances": {}, "contexts": {}}
+
+
+def _prewarm():
+    """Load the managers, then warm EC2 instance IDs, AWS credentials and kube contexts"""
+    started = time.perf_counter()
+    readiness["prewarm"] = "running"
+    try:
+        tunnel_manager.get()
+        k8s_manager.get()
+        readiness["managers"] = True
+        readiness["instances"] = tunnel_manager.prewarm()
+        readiness["contexts"] = k8s_manager.prewarm()
+        readiness["prewarm"] = "done"
+    except Exception as e:
+        logger.error(f"Error prewarming: {e}")
+        readiness["prewarm"] = "failed"
+    readiness["prewarm_ms"] = round((time.perf_counter() - started) * 1000)
+    logger.info(f"Prewarm {readiness['prewarm']} in {readiness['prewarm_ms']} ms")
+
+
+async def _watch_disconnect(request: Request, token: CancelToken):
+    """Cancel token as soon as the client of request disconnects"""
+    while not token.cancelled:
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+        if await request.is_disconnected():
+            token.cancel("disconnected")
+
+
+@asynccontextmanager
+async def _cancel_scope(request: Request, operation: str):
+    """
+    Cancel token for the manager work of a request (run it with
+    cancellation.run), cancelled at the operation's deadline or when the client
+    disconnects. Cancelled work is answered with 504 or 499 (client closed request)
+    """
+    token = CancelToken(operation, OPERATION_DEADLINES.get(operation))
+    watcher = asyncio.create_task(_watch_disconnect(request, token))
+    try:
+        yield token
+    except Cancelled as e:
+        logger.warning(f"Cancelled {operation}: {e}")
+        raise HTTPException(status_code=504 if e.reason == "deadline" else 499, detail=str(e))
+    finally:
+        watcher.cancel()
+        token.finish()
+
+
+# Policy applied when the server stops ("keep" or "stop"); /api/shutdown can override it,
+# a handoff sets "handoff" (everything runs on in the new server)
+shutdown_state = {"policy": SHUTDOWN_POLICY}
+
+
+async def _shutdown_teardown(policy: str) -> List[Dict]:
+    """
+    Stop what must not outlive the server (balanced port-forwards) or, with
+    policy "stop", every tunnel and port-forward. Both managers tear down at
+    the same time, so the whole shutdown waits for one grace period at most.
+    """
+    if policy == "stop":
+        tunnels, forwards = await asyncio.gather(
+            run_in_threadpool(tunnel_manager.stop_all_tunnels),
+            run_in_threadpool(k8s_manager.stop_all_forwards)
+        )
+        outcomes = tunnels[2] + forwards[2]
+    elif k8s_manager.loaded:
+        outcomes = await run_in_threadpool(k8s_manager.stop_balanced_forwards)
+    else:
+        outcomes = []
+
+    if outcomes:
+        logger.info(f"Shutdown teardown ({policy}): {summarize(outcomes)}")
+    return outcomes
+
+
+async def _drain_pools():
+    """After a handoff: keep serving the pooled db sessions that could not move until they close"""
+    deadline = time.monotonic() + HANDOFF_POOL_DRAIN_SECONDS
+    active = relay_loop.active_connections()
+    if active:
+        logger.info(f"Draining {active} pooled connection(s) before exiting")
+    while active and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+        active = relay_loop.active_connections()
+    if active:
+        logger.warning(f"Exiting with {active} pooled connection(s) still open")
+
+
+def _take_over():
+    """Build the managers from what the previous server handed over (they adopt their parts)"""
+    accounting = handoff.take("accounting") or {}
+    connection_accountant.adopt(accounting.get("usage", {}))
+    instance_selector.adopt(accounting.get("instances", {}))
+    tunnel_manager.get()
+    k8s_manager.get()
+    readiness["managers"] = True
+
+
+def _handoff_prepare():
+    """Finish the requests and jobs in flight, and stop what changes state on its own"""
+    handoff.wait_until_quiet(job_scheduler.in_flight)
+    connection_accountant.stop()
+    catalog_store.stop()
+
+
+def _handoff_resume():
+    request_guard.release()
+    connection_accountant.start()
+    catalog_store.start()
+
+
+def _handoff_finish():
+    shutdown_state["policy"] = "handoff"
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def _handoff_server(unix_server: Optional[UnixSocketServer]) -> HandoffServer:
+    """Handoff server exporting the managers (when loaded), the Unix socket and the accounting state"""
+    server = HandoffServer(Path(HANDOFF_SOCKET_PATH), _handoff_prepare, _handoff_resume, _handoff_finish)
+    for name, manager in (("tunnels", tunnel_manager), ("k8s", k8s_manager)):
+        server.add_part(
+            name,
+            lambda package, manager=manager: manager.export_handoff(package) if manager.loaded else None,
+            lambda manager=manager: manager.release_handoff() if manager.loaded else None
+        )
+    if unix_server:
+        server.add_part(
+            "unix",
+            lambda package: {"socket": package.add_socket(unix_server.sock)},
+            lambda: setattr(unix_server, "handed_off", True)
+        )
+    server.add_part("accounting", lambda package: {
+        "usage": connection_accountant.export(),
+        "instances": instance_selector.export()
+    })
+    return server
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services with the server"""
+    # Sources are looked up on each sample so the managers stay lazy
+    connection_accountant.add_source(lambda: tunnel_manager.connection_targets())
+    connection_accountant.add_source(lambda: k8s_manager.connection_targets())
+    connection_accountant.start()
+    history.add_source(lambda: tunnel_manager.connection_targets())
+    history.add_source(lambda: k8s_manager.connection_targets())
+    history.start()
+    credential_cache.start()
+    self_monitor.start()
+    catalog_store.add_listener(lambda changes: tunnel_manager.apply_catalog_changes(changes))
+    catalog_store.add_listener(lambda changes: k8s_manager.apply_catalog_changes(changes))
+    catalog_store.start()
+    inherited = handoff.inherited
+    if inherited:
+        # Started by `python -m backend.server --handoff`: the running server waits for us
+        try:
+            await run_in_threadpool(_take_over)
+        except Exception as e:
+            logger.error(f"Error taking over from server process {inherited.manifest['pid']}: {e}")
+            handoff.abort(str(e))
+            raise
+    if PREWARM_ON_STARTUP:
+        threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+    unix_server = UnixSocketServer(app, Path(UNIX_SOCKET_PATH)) if UNIX_SOCKET_PATH else None
+    if unix_server:
+        unix_part = handoff.take("unix")
+        try:
+            await unix_server.start(inherited[unix_part["socket"]] if unix_part else None)
+        except OSError as e:
+            logger.error(f"Error listening on {UNIX_SOCKET_PATH}: {e}")
+            unix_server = None
+    handoff_server = _handoff_server(unix_server) if HANDOFF_SOCKET_PATH else None
+    if handoff_server:
+        try:
+            handoff_server.start(inherited[inherited.manifest["handoff"]] if inherited else None)
+        except OSError as e:
+            logger.error(f"Error listening on {HANDOFF_SOCKET_PATH}: {e}")
+            handoff_server = None
+    if inherited:
+        await run_in_threadpool(handoff.commit)
+    readiness["startup_ms"] = round((time.perf_counter() - _import_started) * 1000)
+    logger.info(f"Started in {readiness['startup_ms']} ms (from app import)")
+    yield
+    if handoff_server:
+        handoff_server.stop()
+    if unix_server:
+        await unix_server.stop()
+    if shutdown_state["policy"] == "handoff":
+        await _drain_pools()
+    else:
+        try:
+            await _shutdown_teardown(shutdown_state["policy"])
+        except Exception as e:
+            logger.error(f"Error tearing down on shutdown: {e}")
+    catalog_store.stop()
+    self_monitor.stop()
+    credential_cache.stop()
+    history.stop()
+    connection_accountant.stop()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Tunnel Manager Web",
     description="Web interface for managing AWS SSM tunnels",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
+# Counts state-changing requests, and holds them back (503) while handing over to a new server
+app.add_middleware(RequestGuardMiddleware)
 
 # Get project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 
-# Initialize managers
-tunnel_manager = TunnelManager()
-k8s_manager = K8sPortForwardManager()
+# Initialize managers (constructed on first use)
+tunnel_manager = LazyManager(TunnelManager)
+k8s_manager = LazyManager(K8sPortForwardManager)
+job_scheduler = JobScheduler()
+# One tracker (and version) per /api/state section, so each dashboard tab polls only its own
+state_trackers = {section: StateTracker() for section in STATE_SECTIONS}
+asset_store = AssetStore(PROJECT_ROOT / "frontend", dev_mode=DEV_MODE)
 
 
-@app.get("/assets/app.js")
-async def serve_app_js():
-    """Serve app.js with no-cache headers"""
-    js_path = PROJECT_ROOT / "frontend" / "assets" / "app.js"
-    if not js_path.exists():
-        raise HTTPException(status_code=404, detail="app.js not found")
+def _asset_response(request: Request, url: str) -> Response:
+    """Serve an in-memory asset, honouring Accept-Encoding and If-None-Match"""
+    asset, hashed = asset_store.lookup(url)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=f"{url} not found")
 
-    with open(js_path, 'r') as f:
-        content = f.read()
+    encoding = asset.negotiate(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": IMMUTABLE_CACHE if hashed else REVALIDATE_CACHE,
+        "Vary": "Accept-Encoding"
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
 
-    return Response(
-        content=content,
-        media_type="application/javascript",
-        headers={
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0"
-        }
-    )
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=asset.variants[encoding], media_type=asset.media_type, headers=headers)
+
+
+@app.get("/assets/{path:path}")
+async def serve_asset(path: str, request: Request):
+    """Serve frontend assets (plain or content-hashed URLs)"""
+    return _asset_response(request, f"/assets/{path}")
 
 
 @app.get("/favicon.svg")
-async def serve_favicon():
+async def serve_favicon(request: Request):
     """Serve the favicon"""
-    favicon_path = PROJECT_ROOT / "frontend" / "favicon.svg"
-    if not favicon_path.exists():
-        raise HTTPException(status_code=404, detail="Favicon not found")
-    return FileResponse(favicon_path, media_type="image/svg+xml")
+    return _asset_response(request, "/favicon.svg")
 
 
 @app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the frontend HTML"""
-    html_path = PROJECT_ROOT / "frontend" / "index.html"
-    if not html_path.exists():
-        raise HTTPException(status_code=404, detail="Frontend not found")
-
-    with open(html_path, 'r') as f:
-        return HTMLResponse(content=f.read())
-
-
-# Mount static files (after specific routes)
-app.mount("/assets", StaticFiles(directory=PROJECT_ROOT / "frontend" / "assets"), name="assets")
+    return _asset_response(request, "/")
 
 
 @app.get("/api/tunnels", response_model=TunnelListResponse)
-async def list_tunnels():
+async def list_tunnels(request: Request):
     """Get all tunnels (tracked + orphaned)"""
     try:
-        tunnels_data = tunnel_manager.get_all_tunnels()
+        # Run off the event loop so concurrent pollers can share one scan
+        async with _cancel_scope(request, "tunnels_list") as token:
+            tunnels_data = await run_in_threadpool(cancellation.run, token, tunnel_manager.get_all_tunnels)
         logger.info(f"Listed tunnels: {len(tunnels_data['tracked'])} tracked, {len(tunnels_data['orphaned'])} orphaned")
         return TunnelListResponse(**tunnels_data)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing tunnels: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/tunnels/start", response_model=StartTunnelResponse)
-async def start_tunnel(request: StartTunnelRequest):
+async def start_tunnel(request: StartTunnelRequest, http_request: Request):
     """Start a tunnel"""
     try:
         logger.info(f"Starting tunnel: {request.env}/{request.service}")
-        success, message, pid = tunnel_manager.start_tunnel(request.env, request.service)
+        async with _cancel_scope(http_request, "tunnel_start") as token:
+            success, message, pid = await run_in_threadpool(
+                cancellation.run, token, tunnel_manager.start_tunnel, request.env, request.service
+            )
 
         if success:
             tunnel_id = f"{request.env}_{request.service}"
@@ -121,17 +412,40 @@ async def start_tunnel(request: StartTunnelRequest):
                 success=False,
                 message=message
             )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error starting tunnel: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/tunnels/start-env", response_model=StartEnvResponse)
+async def start_env(request: StartEnvRequest, http_request: Request):
+    """Start every service of an environment (or the listed ones) in parallel"""
+    try:
+        logger.info(f"Starting environment: {request.env}")
+        async with _cancel_scope(http_request, "env_start") as token:
+            success, message, results = await run_in_threadpool(
+                cancellation.run, token, tunnel_manager.start_env, request.env, request.services
+            )
+        if success:
+            logger.info(message)
+        else:
+            logger.warning(f"Failed to start environment {request.env}: {message}")
+        return StartEnvResponse(success=success, message=message, results=results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting environment: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/tunnels/stop", response_model=StopTunnelResponse)
 async def stop_tunnel(request: StopTunnelRequest):
     """Stop a tunnel"""
     try:
         logger.info(f"Stopping tunnel: {request.env}/{request.service}")
-        success, message = tunnel_manager.stop_tunnel(request.env, request.service)
+        success, message = await run_in_threadpool(tunnel_manager.stop_tunnel, request.env, request.service)
 
         if success:
             logger.info(f"Tunnel stopped successfully: {request.env}/{request.service}")
@@ -152,33 +466,135 @@ async def stop_all_tunnels():
     """Stop all tunnels"""
     try:
         logger.info("Stopping all tunnels")
-        stopped_count, message = tunnel_manager.stop_all_tunnels()
+        stopped_count, message, outcomes = await run_in_threadpool(tunnel_manager.stop_all_tunnels)
 
         logger.info(f"Stopped {stopped_count} tunnel(s)")
 
         return StopAllResponse(
             success=True,
             stopped_count=stopped_count,
-            message=message or f"Stopped {stopped_count} tunnel(s)"
+            message=message or f"Stopped {stopped_count} tunnel(s)",
+            outcomes=outcomes
         )
     except Exception as e:
         logger.error(f"Error stopping all tunnels: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/gateway", response_model=GatewayStatusResponse)
+async def gateway_status():
+    """Get gateway relay status (connections per service and per client)"""
+    return GatewayStatusResponse(
+        enabled=GATEWAY_MODE,
+        host=GATEWAY_HOST,
+        services=tunnel_manager.get_gateway_stats()
+    )
+
+
+@app.get("/api/standby")
+async def standby_status():
+    """Standby sessions and failover times of the tunnels that keep a hot standby"""
+    return tunnel_manager.get_standby_stats()
+
+
+@app.get("/api/pools")
+async def pool_status():
+    """Pool size, hit rate and wait times of the db tunnels with a PostgreSQL pool"""
+    return tunnel_manager.get_pool_stats()
+
+
+@app.get("/api/qos")
+async def qos_status():
+    """Rate limits, and connections, throughput and latency per priority class of the shaped tunnels"""
+    return tunnel_manager.get_qos_stats()
+
+
+@app.get("/api/instances")
+async def instance_status():
+    """Session set-up latency, failures and tunnel count per bastion instance"""
+    return tunnel_manager.get_instance_stats()
+
+
+@app.get("/api/cancellations")
+async def cancellation_status():
+    """Deadlines, and started / cancelled (per reason) / rolled-back operations and killed children"""
+    return {"deadlines": OPERATION_DEADLINES, "operations": cancellation.stats.snapshot()}
+
+
+@app.get("/api/self")
+async def self_status():
+    """The server's own open fds, zombie children, threads and RSS: current, peak and growth per hour"""
+    return await run_in_threadpool(self_monitor.status)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "tunnel-manager-web"}
 
 
+@app.get("/api/ready")
+async def ready():
+    """Start-up progress: managers loaded and background prewarm status"""
+    return {
+        **readiness,
+        "managers": tunnel_manager.loaded and k8s_manager.loaded
+    }
+
+
+@app.get("/api/credentials")
+async def credential_status():
+    """Cached credential validity per AWS profile and kube context"""
+    return credential_cache.status()
+
+
+@app.post("/api/credentials/refresh")
+async def refresh_credentials():
+    """Re-check every configured AWS profile and kube context now"""
+    def refresh():
+        configured = credential_cache.configured()
+        for profile in configured["profiles"]:
+            credential_cache.check_profile(profile, refresh=True)
+        for context in configured["contexts"]:
+            credential_cache.check_context(context, refresh=True)
+
+    await run_in_threadpool(refresh)
+    return credential_cache.status()
+
+
+@app.get("/api/config")
+async def config_status():
+    """Where the tunnel and K8s definitions come from and whether the last reload worked"""
+    return catalog_store.status()
+
+
+@app.post("/api/config/reload")
+async def reload_config():
+    """Re-read the config file now; running tunnels whose definition changed are restarted"""
+    changes = await run_in_threadpool(catalog_store.reload, True)
+    if catalog_store.last_error:
+        raise HTTPException(status_code=400, detail=catalog_store.last_error)
+    return {**catalog_store.status(), "changes": changes}
+
+
 @app.post("/api/shutdown")
-async def shutdown():
-    """Shutdown the server gracefully"""
+async def shutdown(request: Optional[ShutdownRequest] = None):
+    """
+    Shutdown the server gracefully
+    With policy "stop" every tunnel and port-forward is torn down first and
+    the per-process outcomes are returned; "keep" leaves them running
+    """
     import os
     import signal
 
-    logger.info("Shutdown requested - stopping server")
+    policy = (request.policy if request else None) or shutdown_state["policy"]
+    logger.info(f"Shutdown requested - stopping server (policy: {policy})")
+
+    outcomes = []
+    if policy == "stop":
+        outcomes = await _shutdown_teardown(policy)
+        # Nothing is left for the lifespan hook to stop
+        shutdown_state["policy"] = "keep"
 
     # Schedule shutdown after response is sent
     def shutdown_server():
@@ -189,7 +605,7 @@ async def shutdown():
     import threading
     threading.Thread(target=shutdown_server, daemon=True).start()
 
-    return {"success": True, "message": "Server shutting down"}
+    return {"success": True, "message": "Server shutting down", "policy": policy, "outcomes": outcomes}
 
 
 # ============================================================================
@@ -197,22 +613,25 @@ async def shutdown():
 # ============================================================================
 
 @app.get("/api/k8s/pods")
-async def list_k8s_pods():
+async def list_k8s_pods(request: Request):
     """List all pods from configured environments"""
     try:
-        pods_by_env = {
-            'dev': k8s_manager.list_pods('dev'),
-            'pre': k8s_manager.list_pods('pre'),
-            'pro': k8s_manager.list_pods('pro')
-        }
+        envs = catalog_store.current.envs
+        async with _cancel_scope(request, "k8s_pods") as token:
+            results = await asyncio.gather(*[
+                run_in_threadpool(cancellation.run, token, k8s_manager.list_pods, env) for env in envs
+            ])
+        pods_by_env = dict(zip(envs, results))
         return {"pods": pods_by_env}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing K8s pods: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/k8s/port-forward/start")
-async def start_k8s_port_forward(request: dict):
+async def start_k8s_port_forward(request: dict, http_request: Request):
     """Start a Kubernetes port-forward"""
     try:
         env = request.get('env')
@@ -220,16 +639,29 @@ async def start_k8s_port_forward(request: dict):
         pod_name = request.get('pod_name')
         local_port = request.get('local_port')
         remote_port = request.get('remote_port')
+        mode = request.get('mode', 'single')
 
-        if not all([env, pod_type, pod_name, local_port, remote_port]):
-            raise HTTPException(status_code=400, detail="Missing required fields")
+        if mode == 'balanced':
+            # Balanced forwards target every running pod, so no pod_name is needed
+            if not all([env, pod_type, local_port, remote_port]):
+                raise HTTPException(status_code=400, detail="Missing required fields")
 
-        success, message, pid = k8s_manager.start_port_forward(
-            env, pod_type, pod_name, local_port, remote_port
-        )
+            async with _cancel_scope(http_request, "k8s_start") as token:
+                success, message, pid = await run_in_threadpool(
+                    cancellation.run, token, k8s_manager.start_balanced_forward, env, pod_type, local_port, remote_port
+                )
+        else:
+            if not all([env, pod_type, pod_name, local_port, remote_port]):
+                raise HTTPException(status_code=400, detail="Missing required fields")
+
+            async with _cancel_scope(http_request, "k8s_start") as token:
+                success, message, pid = await run_in_threadpool(
+                    cancellation.run, token, k8s_manager.start_port_forward,
+                    env, pod_type, pod_name, local_port, remote_port
+                )
 
         if success:
-            logger.info(f"Started K8s port-forward: {env}/{pod_type} on port {local_port}")
+            logger.info(f"Started K8s port-forward ({mode}): {env}/{pod_type} on port {local_port}")
             return {
                 "success": True,
                 "message": message,
@@ -256,7 +688,7 @@ async def stop_k8s_port_forward(request: dict):
         if not env or not pod_type:
             raise HTTPException(status_code=400, detail="Missing env or pod_type")
 
-        success, message = k8s_manager.stop_port_forward(env, pod_type)
+        success, message = await run_in_threadpool(k8s_manager.stop_port_forward, env, pod_type)
 
         if success:
             logger.info(f"Stopped K8s port-forward: {env}/{pod_type}")
@@ -275,14 +707,15 @@ async def stop_k8s_port_forward(request: dict):
 async def stop_all_k8s_port_forwards():
     """Stop all Kubernetes port-forwards"""
     try:
-        stopped_count, errors = k8s_manager.stop_all_forwards()
+        stopped_count, errors, outcomes = await run_in_threadpool(k8s_manager.stop_all_forwards)
 
         logger.info(f"Stopped {stopped_count} K8s port-forward(s)")
 
         return {
             "success": True,
             "stopped_count": stopped_count,
-            "errors": errors
+            "errors": errors,
+            "outcomes": outcomes
         }
 
     except Exception as e:
@@ -294,13 +727,268 @@ async def stop_all_k8s_port_forwards():
 async def list_k8s_port_forwards():
     """List all active K8s port-forwards"""
     try:
-        forwards = k8s_manager.get_all_forwards()
-        return {"forwards": forwards}
+        forwards = await run_in_threadpool(k8s_manager.get_all_forwards)
+        return {"forwards": forwards, "totals": k8s_manager.total_resources(forwards)}
     except Exception as e:
         logger.error(f"Error listing K8s port-forwards: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# Dashboard State
+# ============================================================================
+
+async def _collect_state(token: CancelToken, sections: List[str]) -> Dict[str, dict]:
+    """
+    Entries of the requested sections as {section: {key: entry}} without volatile
+    fields. Only the listings those sections need are run (pods cost kubectl calls)
+    """
+    envs = catalog_store.current.envs
+    listings = {}
+    if "tunnels" in sections or "orphaned" in sections:
+        listings["tunnels"] = run_in_threadpool(cancellation.run, token, tunnel_manager.get_all_tunnels)
+    if "forwards" in sections:
+        listings["forwards"] = run_in_threadpool(cancellation.run, token, k8s_manager.get_all_forwards)
+    if "pods" in sections:
+        for env in envs:
+            listings[f"pods/{env}"] = run_in_threadpool(cancellation.run, token, k8s_manager.list_pods, env)
+    results = dict(zip(listings, await asyncio.gather(*listings.values())))
+
+    snapshot = {section: {} for section in sections}
+    if "tunnels" in sections:
+        for tunnel in results["tunnels"]["tracked"]:
+            snapshot["tunnels"][f"tunnels/{tunnel['id']}"] = strip_volatile(tunnel)
+    if "orphaned" in sections:
+        for orphan in results["tunnels"]["orphaned"]:
+            snapshot["orphaned"][f"orphaned/{orphan['pid']}"] = orphan
+    if "pods" in sections:
+        for env in envs:
+            for pod in results[f"pods/{env}"]:
+                snapshot["pods"][f"pods/{env}/{pod['pod_type']}/{pod['pod_name']}"] = pod
+    if "forwards" in sections:
+        for env, env_forwards in results["forwards"].items():
+            for forward in env_forwards:
+                snapshot["forwards"][f"forwards/{env}/{forward['pod_type']}"] = strip_volatile(forward)
+    return snapshot
+
+
+def _state_query(sections: Optional[str], since: Optional[str]) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Parse ?sections=tunnels,orphaned (default: all) and ?since=tunnels:5,orphaned:3
+    Sections without a usable version in `since` are returned in full
+    """
+    requested = [part.strip() for part in sections.split(",") if part.strip()] if sections else list(STATE_SECTIONS)
+    unknown = [section for section in requested if section not in STATE_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown state section(s): {', '.join(unknown)} (known: {', '.join(STATE_SECTIONS)})"
+        )
+    versions = {}
+    for part in (since or "").split(","):
+        section, _, version = part.partition(":")
+        if section.strip() in requested and version.strip().isdigit():
+            versions[section.strip()] = int(version)
+    return list(dict.fromkeys(requested)), versions
+
+
+@app.get("/api/state", response_model=StateResponse)
+async def get_state(request: Request, sections: Optional[str] = None, since: Optional[str] = None):
+    """
+    Dashboard state, versioned per section (tunnels, orphaned, pods, forwards)
+    With ?since=<section>:<version>,... only entries changed or removed after
+    those versions are returned
+    """
+    requested, versions = _state_query(sections, since)
+    try:
+        async with _cancel_scope(request, "state") as token:
+            snapshot = await _collect_state(token, requested)
+        response = {"versions": {}, "full": [], "changed": {}, "removed": []}
+        for section in requested:
+            tracker = state_trackers[section]
+            tracker.update(snapshot[section])
+            delta = tracker.delta(versions.get(section))
+            response["versions"][section] = delta["version"]
+            if delta["full"]:
+                response["full"].append(section)
+            response["changed"].update(delta["changed"])
+            response["removed"].extend(delta["removed"])
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error collecting dashboard state: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ============================================================================
+# History
+# ============================================================================
+
+def _time_range(since: Optional[str], until: Optional[str]) -> Tuple[float, float]:
+    """Parse ISO 8601 since/until query parameters (default: the last 7 days)"""
+    try:
+        end = datetime.fromisoformat(until) if until else datetime.now()
+        start = datetime.fromisoformat(since) if since else end - timedelta(days=7)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {e}")
+    return start.timestamp(), end.timestamp()
+
+
+@app.get("/api/history/events")
+async def history_events(since: Optional[str] = None, until: Optional[str] = None, kind: Optional[str] = None,
+                         env: Optional[str] = None, name: Optional[str] = None, limit: int = 500):
+    """Start, failed start, stop and death events (newest first)"""
+    start, end = _time_range(since, until)
+    events = await run_in_threadpool(history.events, start, end, kind, env, name, limit)
+    return {"events": events}
+
+
+@app.get("/api/history/start-latency")
+async def history_start_latency(since: Optional[str] = None, until: Optional[str] = None, kind: Optional[str] = None,
+                                env: Optional[str] = None, name: Optional[str] = None):
+    """Start latency percentiles per phase, e.g. ?env=pro&name=db for PRO database tunnels"""
+    start, end = _time_range(since, until)
+    return await run_in_threadpool(history.start_latency, start, end, kind, env, name)
+
+
+@app.get("/api/history/probes")
+async def history_probes(since: Optional[str] = None, until: Optional[str] = None, kind: Optional[str] = None,
+                         env: Optional[str] = None, name: Optional[str] = None, resolution: Optional[str] = None):
+    """Health-probe latency series (raw samples or hourly aggregates)"""
+    if resolution not in (None, "raw", "hour"):
+        raise HTTPException(status_code=400, detail="resolution must be 'raw' or 'hour'")
+    start, end = _time_range(since, until)
+    return await run_in_threadpool(history.probes, start, end, kind, env, name, resolution)
+
+
+@app.get("/api/history/restarts")
+async def history_restarts(since: Optional[str] = None, until: Optional[str] = None, kind: Optional[str] = None,
+                           env: Optional[str] = None, name: Optional[str] = None):
+    """Start, restart, failure, stop and death counts per tunnel / forward"""
+    start, end = _time_range(since, until)
+    targets = await run_in_threadpool(history.restarts, start, end, kind, env, name)
+    return {"targets": targets}
+
+
+# ============================================================================
+# Background Jobs
+# ============================================================================
+
+def _build_job(request: JobRequest):
+    """
+    Resolve a job request into what the scheduler needs
+    Returns: (limit_key, limit, target_key, func)
+    Raises ValueError for invalid requests
+    """
+    env = request.env
+    catalog = catalog_store.current
+
+    if request.kind in ("tunnel_start", "tunnel_stop"):
+        env_config = catalog.tunnel_env(env)
+        if not env_config:
+            raise ValueError(f"Invalid environment: {env}")
+        service = request.service
+        if not service:
+            raise ValueError("Missing service")
+
+        profile = env_config.profile
+        limit = JOB_CONCURRENCY_OVERRIDES.get(profile, JOB_CONCURRENCY_PER_PROFILE)
+        target_key = f"tunnel:{env}_{service}"
+
+        if request.kind == "tunnel_start":
+            def func(progress):
+                success, message, pid = tunnel_manager.start_tunnel(env, service, progress=progress)
+                return success, message, {"tunnel_id": f"{env}_{service}", "pid": pid}
+        else:
+            def func(progress):
+                success, message = tunnel_manager.stop_tunnel(env, service)
+                return success, message, None
+
+        return f"profile:{profile}", limit, target_key, func
+
+    env_config = catalog.k8s_env(env)
+    if not env_config:
+        raise ValueError(f"Invalid environment: {env}")
+    pod_type = request.pod_type
+    if not pod_type:
+        raise ValueError("Missing pod_type")
+
+    context = env_config.context
+    limit = JOB_CONCURRENCY_OVERRIDES.get(context, JOB_CONCURRENCY_PER_CONTEXT)
+    target_key = f"k8s:{env}_{pod_type}"
+
+    if request.kind == "k8s_start":
+        if not request.local_port or not request.remote_port:
+            raise ValueError("Missing local_port or remote_port")
+        if request.mode != "balanced" and not request.pod_name:
+            raise ValueError("Missing pod_name")
+
+        def func(progress):
+            if request.mode == "balanced":
+                success, message, pid = k8s_manager.start_balanced_forward(
+                    env, pod_type, request.local_port, request.remote_port, progress=progress
+                )
+            else:
+                success, message, pid = k8s_manager.start_port_forward(
+                    env, pod_type, request.pod_name, request.local_port, request.remote_port, progress=progress
+                )
+            return success, message, {"pid": pid, "local_port": request.local_port}
+    else:
+        def func(progress):
+            success, message = k8s_manager.stop_port_forward(env, pod_type)
+            return success, message, None
+
+    return f"context:{context}", limit, target_key, func
+
+
+@app.post("/api/jobs", response_model=JobInfo, status_code=202)
+async def submit_job(request: JobRequest):
+    """Queue a start/stop job and return immediately with its ID"""
+    try:
+        limit_key, limit, target_key, func = _build_job(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    params = request.model_dump(exclude={"kind"}, exclude_defaults=True)
+    job, created = job_scheduler.submit(request.kind, params, limit_key, limit, target_key, func)
+
+    if created:
+        logger.info(f"Queued job {job.id}: {request.kind} {params}")
+    else:
+        logger.info(f"Reusing in-flight job {job.id}: {request.kind} {params}")
+
+    return JobInfo(**job.to_dict())
+
+
+@app.get("/api/jobs", response_model=JobListResponse)
+async def list_jobs():
+    """List recent jobs, newest first"""
+    return JobListResponse(jobs=[JobInfo(**job.to_dict()) for job in job_scheduler.list()])
+
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=JobInfo)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running start job; a half-finished start is rolled back"""
+    try:
+        job = job_scheduler.cancel(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    logger.info(f"Cancelling job {job.id}: {job.kind} {job.params}")
+    return JobInfo(**job.to_dict())
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    """Get the status and progress of a job"""
+    job = job_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return JobInfo(**job.to_dict())
+
+
 if __name__ == "__main__":
     import uvicorn
     logger.info(f"Starting Tunnel Manager Web on {SERVER_HOST}:{SERVER_PORT}")
@@ -2,7 +2,7 @@
 Pydantic models for API requests and responses
 """
 
-from typing import Optional, List, Literal
+from typing import Any, Dict, Optional, List, Literal
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -20,6 +20,12 @@ class TunnelInfo(BaseModel):
     host: str
     started_at: Optional[str] = None
     uptime_seconds: Optional[int] = None
+    gateway: Optional[Dict[str, Any]] = None
+    standby: Optional[Dict[str, Any]] = None
+    connections: Optional[int] = None
+    last_active_at: Optional[str] = None
+    idle_seconds: Optional[int] = None
+    resources: Optional[Dict[str, Any]] = None
 
 
 class OrphanedTunnelInfo(BaseModel):
@@ -28,12 +34,15 @@ class OrphanedTunnelInfo(BaseModel):
     port: Optional[str] = None
     env: Optional[str] = None
     host: Optional[str] = None
+    # Configured service matching the local port and host, when there is one
+    service: Optional[str] = None
 
 
 class TunnelListResponse(BaseModel):
     """Response for listing all tunnels"""
     tracked: List[TunnelInfo]
     orphaned: List[OrphanedTunnelInfo]
+    totals: Optional[Dict[str, Any]] = None
 
 
 class StartTunnelRequest(BaseModel):
@@ -50,6 +59,19 @@ class StartTunnelResponse(BaseModel):
     message: str
 
 
+class StartEnvRequest(BaseModel):
+    """Request to start every service of an environment (or the listed ones)"""
+    env: str
+    services: Optional[List[str]] = None
+
+
+class StartEnvResponse(BaseModel):
+    """Response for starting an environment"""
+    success: bool
+    message: str
+    results: List[Dict[str, Any]] = []
+
+
 class StopTunnelRequest(BaseModel):
     """Request to stop a tunnel"""
     env: str
@@ -62,8 +84,74 @@ class StopTunnelResponse(BaseModel):
     message: str
 
 
+class TeardownOutcome(BaseModel):
+    """How one process group ended when it was stopped"""
+    key: str
+    pid: Optional[int] = None
+    outcome: Literal["terminated", "killed", "already_exited", "failed"]
+    seconds: float
+    error: Optional[str] = None
+
+
 class StopAllResponse(BaseModel):
     """Response after stopping all tunnels"""
     success: bool
     stopped_count: int
     message: str
+    outcomes: List[TeardownOutcome] = []
+
+
+class ShutdownRequest(BaseModel):
+    """Request to stop the server; policy overrides SHUTDOWN_POLICY for this shutdown"""
+    policy: Optional[Literal["keep", "stop"]] = None
+
+
+class GatewayStatusResponse(BaseModel):
+    """Gateway relay status"""
+    enabled: bool
+    host: str
+    services: List[Dict[str, Any]]
+
+
+class JobRequest(BaseModel):
+    """Request to queue a start/stop job"""
+    kind: Literal["tunnel_start", "tunnel_stop", "k8s_start", "k8s_stop"]
+    env: str
+    service: Optional[str] = None
+    pod_type: Optional[str] = None
+    pod_name: Optional[str] = None
+    local_port: Optional[str] = None
+    remote_port: Optional[str] = None
+    mode: Literal["single", "balanced"] = "single"
+
+
+class JobInfo(BaseModel):
+    """Status of a queued, running or finished job"""
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    status: Literal["queued", "running", "succeeded", "failed"]
+    progress: List[Dict[str, Any]]
+    success: Optional[bool] = None
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    # Why the job was cancelled: "requested" or "deadline"
+    cancelled: Optional[str] = None
+
+
+class JobListResponse(BaseModel):
+    """Response for listing jobs"""
+    jobs: List[JobInfo]
+
+
+class StateResponse(BaseModel):
+    """Dashboard state of the requested sections, full or as a delta since a client's versions"""
+    # Current version of each requested section
+    versions: Dict[str, int]
+    # Sections returned in full (no usable version given): drop their old entries first
+    full: List[str]
+    changed: Dict[str, Dict[str, Any]]
+    removed: List[str]
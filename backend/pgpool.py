@@ -0,0 +1,667 @@
+"""
+PostgreSQL Connection Pool
+A transaction-mode pooler (like pgbouncer with pool_mode = transaction) in
+front of a db tunnel: server connections through the tunnel stay open and are
+lent to a client for one transaction at a time, so clients that connect often
+skip the connection set-up and authentication round trips through SSM
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+import secrets
+import socket
+import ssl
+import struct
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .config import (
+    PG_POOL_MIN_SIZE,
+    PG_POOL_MAX_SIZE,
+    PG_POOL_WAIT_TIMEOUT_SECONDS,
+    PG_POOL_IDLE_SECONDS,
+    PG_POOL_SERVER_SSL
+)
+from .history import percentiles
+from .qos import Flow
+from .relay import RelayBackend, RelayListener
+
+# Startup packet codes
+PROTOCOL_VERSION = 196608  # 3.0
+SSL_REQUEST = 80877103
+GSSENC_REQUEST = 80877104
+CANCEL_REQUEST = 80877102
+# Client messages of an extended-protocol batch, answered only after the next Sync
+EXTENDED_MESSAGES = (b"P", b"B", b"D", b"E", b"C")
+# Client messages answered with a ReadyForQuery
+SYNC_MESSAGES = (b"Q", b"S", b"F")
+# Seconds a new server connection may take to authenticate and become ready
+CONNECT_TIMEOUT = 15
+# Wait times kept per pool for the percentiles
+WAIT_SAMPLES = 1000
+APPLICATION_NAME = "tunnel-manager-pool"
+
+
+class PoolError(Exception):
+    """An error reported to the client as a PostgreSQL ErrorResponse"""
+
+    def __init__(self, message: str, code: str = "08006", fields: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.code = code
+        # ErrorResponse fields of a server error, relayed as they are
+        self.fields = fields
+
+
+def _message(kind: bytes, payload: bytes = b"") -> bytes:
+    return kind + struct.pack("!I", len(payload) + 4) + payload
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Tuple[bytes, bytes]:
+    """One typed protocol message: (type byte, payload)"""
+    header = await reader.readexactly(5)
+    length = struct.unpack("!I", header[1:])[0]
+    return header[:1], await reader.readexactly(length - 4)
+
+
+async def _read_startup(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """An untyped startup-phase packet: (request code, payload)"""
+    length = struct.unpack("!I", await reader.readexactly(4))[0]
+    if not 8 <= length <= 10000:
+        raise PoolError("invalid startup packet length", "08P01")
+    body = await reader.readexactly(length - 4)
+    return struct.unpack("!I", body[:4])[0], body[4:]
+
+
+def _error_fields(payload: bytes) -> Dict[str, str]:
+    """Fields of an ErrorResponse payload, keyed by field type (M = message, C = SQLSTATE)"""
+    return {
+        field[:1].decode(): field[1:].decode(errors="replace")
+        for field in payload.split(b"\0") if field
+    }
+
+
+def _server_error(payload: bytes) -> PoolError:
+    fields = _error_fields(payload)
+    return PoolError(fields.get("M", "server error"), fields.get("C", "08006"), fields)
+
+
+def _error_response(error: PoolError) -> bytes:
+    fields = error.fields or {"S": "FATAL", "V": "FATAL", "C": error.code, "M": str(error)}
+    return _message(b"E", b"".join(f"{k}{v}\0".encode() for k, v in fields.items()) + b"\0")
+
+
+class ServerConnection:
+    """One authenticated connection to the database through the tunnel"""
+
+    def __init__(self, backend: RelayBackend, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 key: bytes):
+        self.backend = backend
+        self.reader = reader
+        self.writer = writer
+        # BackendKeyData (process ID + secret), for cancel requests
+        self.key = key
+        # Watches the connection while it is idle in the pool
+        self.watcher: Optional[asyncio.Task] = None
+
+    def usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self):
+        if not self.writer.is_closing():
+            self.writer.write(_message(b"X"))
+            self.writer.close()
+
+
+class ConnectionPool:
+    """Server connections for one user / database / password through one listener"""
+
+    def __init__(self, listener: "PgPoolListener", user: str, database: str, password: bytes):
+        self.listener = listener
+        self.user = user
+        self.database = database
+        self.password = password
+        self.idle: Deque[ServerConnection] = deque()
+        # Open and opening connections, idle or lent
+        self.size = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # ParameterStatus reported by the server, replayed to new clients.
+        # Set once a connection authenticated, i.e. the password is verified
+        self.params: Dict[str, str] = {}
+        self.clients = 0
+        self.closed = False
+        self.last_used = time.monotonic()
+        self.acquisitions = 0
+        # Acquisitions that got a connection, and those served without opening one
+        self.served = 0
+        self.hits = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.transactions = 0
+        self.connects = 0
+        self.connect_failures = 0
+        self.connect_ms_total = 0.0
+        self.wait_ms_total = 0.0
+        self._wait_samples: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        # SCRAM salted passwords by (salt, iterations): PBKDF2 runs once, not per connection
+        self._salted: Dict[Tuple[bytes, int], bytes] = {}
+        self._fill_task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Lending
+    # ------------------------------------------------------------------
+
+    async def acquire(self) -> ServerConnection:
+        """
+        A server connection for one transaction: an idle one if any, a new one
+        while the pool is below PG_POOL_MAX_SIZE, otherwise the next one released
+        """
+        started = time.perf_counter()
+        deadline = time.monotonic() + PG_POOL_WAIT_TIMEOUT_SECONDS
+        self.acquisitions += 1
+        self.last_used = time.monotonic()
+        hit = True
+        waited = False
+        while True:
+            conn = await self._take_idle()
+            if conn:
+                break
+            if self.size < PG_POOL_MAX_SIZE:
+                hit = False
+                conn = await self._open()
+                break
+
+            if not waited:
+                waited = True
+                self.waits += 1
+            # release() hands a connection over directly; None means a slot freed up
+            future = asyncio.get_running_loop().create_future()
+            self.waiters.append(future)
+            try:
+                conn = await asyncio.wait_for(future, max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise PoolError(
+                    f"no server connection available within {PG_POOL_WAIT_TIMEOUT_SECONDS}s "
+                    f"({PG_POOL_MAX_SIZE} in use)", "53300"
+                )
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled() and future.result():
+                    self.release(future.result())
+                raise
+            finally:
+                if future in self.waiters:
+                    self.waiters.remove(future)
+            if conn:
+                break
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.served += 1
+        self.hits += hit
+        self.wait_ms_total += wait_ms
+        self._wait_samples.append(wait_ms)
+        self.fill()
+        return conn
+
+    async def _take_idle(self) -> Optional[ServerConnection]:
+        """The most recently used idle connection that is still open (the oldest ones age out)"""
+        while self.idle:
+            conn = self.idle.pop()
+            conn.watcher.cancel()
+            # The watcher's read must be gone before the connection is read again
+            await asyncio.gather(conn.watcher, return_exceptions=True)
+            if conn.usable():
+                return conn
+            self.discard(conn)
+        return None
+
+    def release(self, conn: ServerConnection):
+        """Take back a connection whose transaction ended"""
+        if self.closed:
+            self.discard(conn)
+            return
+        while self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                future.set_result(conn)
+                return
+        self.idle.append(conn)
+        conn.watcher = asyncio.get_running_loop().create_task(self._watch_idle(conn))
+
+    def discard(self, conn: ServerConnection):
+        """Close a connection that is broken or in an unknown state (its transaction is rolled back)"""
+        conn.close()
+        self.size -= 1
+        conn.backend.active -= 1
+        self._wake()
+
+    def _wake(self):
+        """Let the first waiter open a connection in the slot that freed up"""
+        while self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+
+    async def _watch_idle(self, conn: ServerConnection):
+        """
+        Drop an idle connection when the server closes it (or sends anything:
+        the connection is then out of step), or after PG_POOL_IDLE_SECONDS unused
+        """
+        while True:
+            try:
+                await asyncio.wait_for(conn.reader.read(1), PG_POOL_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                if self.size > PG_POOL_MIN_SIZE or time.monotonic() - self.last_used >= PG_POOL_IDLE_SECONDS:
+                    break
+                continue
+            except (ConnectionError, OSError):
+                pass
+            break
+        self.idle.remove(conn)
+        self.discard(conn)
+
+    def fill(self):
+        """Open connections in the background until PG_POOL_MIN_SIZE are open"""
+        if self.closed or self.size >= PG_POOL_MIN_SIZE or self._fill_task:
+            return
+        self._fill_task = asyncio.get_running_loop().create_task(self._fill())
+
+    async def _fill(self):
+        try:
+            while not self.closed and self.size < PG_POOL_MIN_SIZE:
+                try:
+                    conn = await self._open()
+                except PoolError:
+                    break
+                self.release(conn)
+        finally:
+            self._fill_task = None
+
+    def close(self):
+        """Close every idle connection; lent ones are closed when their clients go"""
+        self.closed = True
+        if self._fill_task:
+            self._fill_task.cancel()
+        while self.idle:
+            conn = self.idle.pop()
+            conn.watcher.cancel()
+            self.discard(conn)
+
+    # ------------------------------------------------------------------
+    # Server connections
+    # ------------------------------------------------------------------
+
+    async def _open(self) -> ServerConnection:
+        """Connect and authenticate a new server connection"""
+        self.size += 1
+        started = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(self._connect(), CONNECT_TIMEOUT)
+        except BaseException as e:
+            self.size -= 1
+            self.connect_failures += 1
+            self._wake()
+            if isinstance(e, asyncio.TimeoutError):
+                raise PoolError(f"the database did not answer within {CONNECT_TIMEOUT}s")
+            if isinstance(e, (ConnectionError, OSError, EOFError)):
+                raise PoolError(f"lost the connection to the database: {e or 'closed'}")
+            raise
+        self.connects += 1
+        self.connect_ms_total += (time.perf_counter() - started) * 1000
+        return conn
+
+    async def _connect(self) -> ServerConnection:
+        backend, sock = await self.listener._open_backend()
+        if backend is None:
+            raise PoolError("could not connect to the database through the tunnel")
+        reader, writer = await asyncio.open_connection(sock=sock)
+        backend.active += 1
+        backend.total += 1
+        try:
+            await self._negotiate_ssl(reader, writer)
+            startup = {"user": self.user, "database": self.database, "application_name": APPLICATION_NAME}
+            payload = struct.pack("!I", PROTOCOL_VERSION)
+            payload += b"".join(f"{name}\0{value}\0".encode() for name, value in startup.items()) + b"\0"
+            writer.write(struct.pack("!I", len(payload) + 4) + payload)
+            await self._authenticate(reader, writer)
+
+            params = {}
+            key = b""
+            while True:
+                kind, body = await _read_message(reader)
+                if kind == b"S":
+                    name, value = body.split(b"\0")[:2]
+                    params[name.decode()] = value.decode()
+                elif kind == b"K":
+                    key = body
+                elif kind == b"E":
+                    raise _server_error(body)
+                elif kind == b"Z":
+                    break
+            self.params = params
+            return ServerConnection(backend, reader, writer, key)
+        except BaseException:
+            backend.active -= 1
+            writer.close()
+            raise
+
+    async def _negotiate_ssl(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Upgrade to TLS when the server offers it (StreamWriter.start_tls needs
+        Python 3.11; older versions connect in plain text unless TLS is required)
+        """
+        can_tls = hasattr(writer, "start_tls")
+        if PG_POOL_SERVER_SSL == "disable" or (PG_POOL_SERVER_SSL == "prefer" and not can_tls):
+            return
+        writer.write(struct.pack("!II", 8, SSL_REQUEST))
+        answer = await reader.readexactly(1)
+        if answer == b"S":
+            if not can_tls:
+                raise PoolError("TLS to the database needs Python 3.11 or later")
+            # The server is reached through a localhost port, so its certificate
+            # name never matches: encrypt without verifying (sslmode=require)
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            await writer.start_tls(context)
+        elif PG_POOL_SERVER_SSL == "require":
+            raise PoolError("the database does not accept TLS connections")
+
+    async def _authenticate(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer the server's authentication requests (cleartext, MD5 or SCRAM-SHA-256)"""
+        while True:
+            kind, body = await _read_message(reader)
+            if kind == b"E":
+                raise _server_error(body)
+            if kind != b"R":
+                raise PoolError(f"unexpected message {kind!r} during authentication", "08P01")
+            code = struct.unpack("!I", body[:4])[0]
+            if code == 0:
+                return
+            if code == 3:
+                writer.write(_message(b"p", self.password + b"\0"))
+            elif code == 5:
+                inner = hashlib.md5(self.password + self.user.encode()).hexdigest()
+                digest = hashlib.md5(inner.encode() + body[4:8]).hexdigest()
+                writer.write(_message(b"p", f"md5{digest}\0".encode()))
+            elif code == 10:
+                if b"SCRAM-SHA-256" not in body[4:].split(b"\0"):
+                    raise PoolError("the database offers no supported SASL mechanism", "28000")
+                await self._scram(reader, writer)
+            else:
+                raise PoolError(f"unsupported authentication method (code {code})", "28000")
+
+    async def _scram(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """SCRAM-SHA-256 exchange (RFC 5802 / 7677), without channel binding"""
+        nonce = base64.b64encode(secrets.token_bytes(18)).decode()
+        client_first = f"n=,r={nonce}"
+        initial = f"n,,{client_first}".encode()
+        writer.write(_message(b"p", b"SCRAM-SHA-256\0" + struct.pack("!i", len(initial)) + initial))
+
+        server_first = (await self._sasl_reply(reader, 11)).decode()
+        attributes = dict(part.split("=", 1) for part in server_first.split(","))
+        if not attributes.get("r", "").startswith(nonce):
+            raise PoolError("SCRAM nonce mismatch", "28000")
+        salt, iterations = base64.b64decode(attributes["s"]), int(attributes["i"])
+        salted = self._salted.get((salt, iterations))
+        if salted is None:
+            salted = hashlib.pbkdf2_hmac("sha256", self.password, salt, iterations)
+            self._salted[(salt, iterations)] = salted
+
+        client_key = hmac.digest(salted, b"Client Key", "sha256")
+        client_final = f"c=biws,r={attributes['r']}"
+        auth_message = f"{client_first},{server_first},{client_final}".encode()
+        signature = hmac.digest(hashlib.sha256(client_key).digest(), auth_message, "sha256")
+        proof = base64.b64encode(bytes(a ^ b for a, b in zip(client_key, signature))).decode()
+        writer.write(_message(b"p", f"{client_final},p={proof}".encode()))
+
+        server_final = (await self._sasl_reply(reader, 12)).decode()
+        server_key = hmac.digest(salted, b"Server Key", "sha256")
+        expected = base64.b64encode(hmac.digest(server_key, auth_message, "sha256")).decode()
+        if not hmac.compare_digest(server_final.split(",")[0], f"v={expected}"):
+            raise PoolError("SCRAM server signature mismatch", "28000")
+
+    @staticmethod
+    async def _sasl_reply(reader: asyncio.StreamReader, code: int) -> bytes:
+        kind, body = await _read_message(reader)
+        if kind == b"E":
+            raise _server_error(body)
+        if kind != b"R" or struct.unpack("!I", body[:4])[0] != code:
+            raise PoolError("unexpected message during SCRAM authentication", "08P01")
+        return body[4:]
+
+    def stats(self) -> Dict:
+        """Pool size, hit rate and wait times"""
+        return {
+            "user": self.user,
+            "database": self.database,
+            "clients": self.clients,
+            "server_connections": self.size,
+            "idle": len(self.idle),
+            "waiting": len(self.waiters),
+            "acquisitions": self.acquisitions,
+            "served": self.served,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.served, 3) if self.served else None,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_ms_total / self.served, 3) if self.served else None,
+            # Over the last WAIT_SAMPLES acquisitions
+            "wait_ms": percentiles(list(self._wait_samples)),
+            "transactions": self.transactions,
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "avg_connect_ms": round(self.connect_ms_total / self.connects, 1) if self.connects else None
+        }
+
+
+class ClientSession:
+    """One client connection: its pool and the server connection it holds during a transaction"""
+
+    def __init__(self, listener: "PgPoolListener", reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.listener = listener
+        self.reader = reader
+        self.writer = writer
+        self.pool: Optional[ConnectionPool] = None
+        self.server: Optional[ServerConnection] = None
+        # BackendKeyData given to the client (not the server's)
+        self.key = b""
+        # Queries, Syncs and function calls not answered with ReadyForQuery yet
+        self.pending = 0
+        # Extended-protocol messages sent since the last Sync
+        self.unsynced = False
+        # Relays the held server connection's replies
+        self.relay: Optional[asyncio.Task] = None
+        # QoS flow when the listener shapes traffic
+        self.flow: Optional[Flow] = None
+
+    async def startup(self) -> bool:
+        """
+        Authenticate the client; False for a cancel request (no session follows).
+        The password is asked in clear text (the listener is local) and checked
+        by the server the first time it is seen
+        """
+        while True:
+            code, body = await _read_startup(self.reader)
+            if code in (SSL_REQUEST, GSSENC_REQUEST):
+                self.writer.write(b"N")
+                continue
+            if code == CANCEL_REQUEST:
+                await self.listener._cancel(body[:8])
+                return False
+            if code != PROTOCOL_VERSION:
+                raise PoolError(f"unsupported frontend protocol {code >> 16}.{code & 0xFFFF}", "0A000")
+            break
+
+        parts = [part.decode() for part in body.split(b"\0")]
+        params = dict(zip(parts[0::2], parts[1::2]))
+        user = params.get("user")
+        if not user:
+            raise PoolError("no PostgreSQL user name specified in startup packet", "28000")
+
+        self.writer.write(_message(b"R", struct.pack("!I", 3)))
+        await self.writer.drain()
+        kind, password = await _read_message(self.reader)
+        if kind != b"p":
+            raise PoolError("expected password response", "08P01")
+
+        self.pool = await self.listener._pool(user, params.get("database") or user, password.rstrip(b"\0"))
+        self.pool.clients += 1
+        self.key = self.listener._register(self)
+
+        reply = [_message(b"R", struct.pack("!I", 0))]
+        reply += [_message(b"S", f"{name}\0{value}\0".encode()) for name, value in self.pool.params.items()]
+        reply += [_message(b"K", self.key), _message(b"Z", b"I")]
+        self.writer.write(b"".join(reply))
+        await self.writer.drain()
+        return True
+
+    async def run(self):
+        """Relay client messages, borrowing a server connection for each transaction"""
+        while True:
+            kind, body = await _read_message(self.reader)
+            if kind == b"X":
+                return
+            if self.server is None:
+                self.server = await self.pool.acquire()
+                self.relay = asyncio.get_running_loop().create_task(self._relay_server(self.server))
+            if kind in SYNC_MESSAGES:
+                self.pending += 1
+            if kind in EXTENDED_MESSAGES:
+                self.unsynced = True
+            elif kind == b"S":
+                self.unsynced = False
+            server = self.server
+            if self.flow:
+                await self.listener.qos.transfer(self.flow, "up", len(body) + 5)
+            server.writer.write(_message(kind, body))
+            await server.writer.drain()
+
+    async def _relay_server(self, server: ServerConnection):
+        """Relay server messages to the client; give the connection back once the server is idle again"""
+        try:
+            while True:
+                kind, body = await _read_message(server.reader)
+                if self.flow:
+                    await self.listener.qos.transfer(self.flow, "down", len(body) + 5)
+                self.writer.write(_message(kind, body))
+                if kind == b"Z":
+                    self.pending = max(0, self.pending - 1)
+                    if body == b"I" and not self.pending and not self.unsynced:
+                        # Return at once: the connection may be lent again before a drain would finish
+                        self.server = None
+                        self.pool.transactions += 1
+                        self.pool.release(server)
+                        return
+                await self.writer.drain()
+        except (ConnectionError, OSError, EOFError):
+            if self.server is server:
+                # The transaction is lost with the server connection: end the client's session too
+                self.server = None
+                self.pool.discard(server)
+                self.writer.write(_error_response(PoolError("server connection lost")))
+                self.writer.close()
+
+    def close(self):
+        if self.relay:
+            self.relay.cancel()
+        if self.server is not None:
+            # Still inside a transaction (or mid-batch): the server rolls it back on close
+            server, self.server = self.server, None
+            self.pool.discard(server)
+        if self.key:
+            self.pool.clients -= 1
+            self.listener._sessions.pop(self.key, None)
+
+
+class PgPoolListener(RelayListener):
+    """
+    Relay listener speaking the PostgreSQL protocol. Clients log in to the
+    listener with the database user and password; a pool per user / database /
+    password lends a server connection from the first message of a
+    transaction until the server reports it idle again. Session state (SET,
+    prepared statements, LISTEN, advisory locks) does not carry over between
+    transactions, as with any transaction-mode pooler.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pools: Dict[Tuple[str, str, bytes], ConnectionPool] = {}
+        # Client sessions by the BackendKeyData they were given, for cancel requests
+        self._sessions: Dict[bytes, ClientSession] = {}
+        self._process_ids = itertools.count(1)
+
+    async def _stop(self):
+        await super()._stop()
+        for pool in self._pools.values():
+            pool.close()
+
+    async def _serve(self, client_sock: socket.socket, host: str, client: Dict[str, int]):
+        # The stream transport gets its own descriptor: it flushes and closes it itself
+        client_reader, client_writer = await asyncio.open_connection(sock=client_sock.dup())
+        session = ClientSession(self, client_reader, client_writer)
+        try:
+            if not await session.startup():
+                return
+            self.total_connections += 1
+            client["total"] += 1
+            if self.qos:
+                session.flow = self.qos.open(host)
+            await session.run()
+        except PoolError as e:
+            if not session.key:
+                self.rejected_connections += 1
+                client["rejected"] += 1
+            client_writer.write(_error_response(e))
+        except (ConnectionError, OSError, EOFError):
+            pass
+        finally:
+            session.close()
+            client_writer.close()
+            if session.flow:
+                self.qos.close(session.flow)
+
+    async def _pool(self, user: str, database: str, password: bytes) -> ConnectionPool:
+        """The pool for a client's credentials; a password not seen yet is checked by connecting with it"""
+        key = (user, database, hashlib.sha256(password).digest())
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = ConnectionPool(self, user, database, password)
+        if not pool.params:
+            try:
+                conn = await pool.acquire()
+            except BaseException:
+                if not pool.params and not pool.size and self._pools.get(key) is pool:
+                    del self._pools[key]
+                raise
+            pool.release(conn)
+        return pool
+
+    def _register(self, session: ClientSession) -> bytes:
+        key = struct.pack("!II", next(self._process_ids), secrets.randbits(32))
+        self._sessions[key] = session
+        return key
+
+    async def _cancel(self, key: bytes):
+        """Forward a client's cancel request to the server connection running its query"""
+        session = self._sessions.get(key)
+        server = session.server if session else None
+        if server is None or len(server.key) != 8:
+            return
+        try:
+            _, writer = await asyncio.open_connection(server.backend.host, server.backend.port)
+            writer.write(struct.pack("!II", 16, CANCEL_REQUEST) + server.key)
+            await writer.drain()
+            writer.close()
+        except OSError:
+            pass
+
+    async def _stats(self) -> Dict:
+        """Relay counters plus hit rate and wait times per pool"""
+        stats = await super()._stats()
+        stats["pools"] = [pool.stats() for pool in self._pools.values() if pool.params]
+        return stats
@@ -0,0 +1,160 @@
+"""
+Process Resource Accounting
+Aggregates RSS, CPU, threads and open fds per process group in one /proc pass
+"""
+
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+PROC = Path("/proc")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _empty_usage() -> Dict:
+    return {"processes": 0, "rss_bytes": 0, "cpu_seconds": 0.0, "threads": 0, "open_fds": 0}
+
+
+def _read_proc_groups(pgids: Set[int]) -> Dict[int, Dict]:
+    """Walk /proc once, summing usage of every process whose group is wanted"""
+    usage = {}
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(entry / "stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+
+        # Fields after the parenthesised command name; comm may contain spaces
+        fields = stat[stat.rfind(')') + 2:].split()
+        pgid = int(fields[2])
+        if pgid not in pgids:
+            continue
+
+        group = usage.setdefault(pgid, _empty_usage())
+        group["processes"] += 1
+        group["cpu_seconds"] += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        group["threads"] += int(fields[17])
+        group["rss_bytes"] += int(fields[21]) * PAGE_SIZE
+        try:
+            group["open_fds"] += len(os.listdir(entry / "fd"))
+        except OSError:
+            pass
+    return usage
+
+
+def _read_ps_groups(pgids: Set[int]) -> Dict[int, Dict]:
+    """Fallback without /proc (macOS): one ps call; threads and fds are not available"""
+    usage = {}
+    try:
+        result = subprocess.run(
+            ["ps", "-axo", "pgid=,rss=,time="],
+            capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return usage
+
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) != 3:
+            continue
+        try:
+            pgid = int(parts[0])
+        except ValueError:
+            continue
+        if pgid not in pgids:
+            continue
+
+        group = usage.setdefault(pgid, _empty_usage())
+        group["processes"] += 1
+        group["rss_bytes"] += int(parts[1]) * 1024
+        group["cpu_seconds"] += _parse_cpu_time(parts[2])
+        group["threads"] = None
+        group["open_fds"] = None
+    return usage
+
+
+def _parse_cpu_time(value: str) -> float:
+    """Parse ps cputime ([dd-]hh:mm:ss or mm:ss.ss)"""
+    days = 0
+    if '-' in value:
+        day_part, value = value.split('-', 1)
+        days = int(day_part)
+    seconds = 0.0
+    for part in value.split(':'):
+        seconds = seconds * 60 + float(part)
+    return days * 86400 + seconds
+
+
+class ProcessSampler:
+    """
+    Samples resource usage of process groups. CPU% is derived from the CPU
+    time consumed since the previous sample of the same group.
+    """
+
+    def __init__(self):
+        self._previous: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def sample(self, pgids: Iterable[int]) -> Dict[int, Dict]:
+        """Usage per process group, including cpu_percent since the last sample"""
+        wanted = set(pgid for pgid in pgids if pgid)
+        if not wanted:
+            return {}
+
+        reader = _read_proc_groups if PROC.exists() else _read_ps_groups
+        usage = reader(wanted)
+        now = time.monotonic()
+
+        with self._lock:
+            for pgid, group in usage.items():
+                previous = self._previous.get(pgid)
+                group["cpu_seconds"] = round(group["cpu_seconds"], 2)
+                group["cpu_percent"] = None
+                if previous:
+                    cpu_before, sampled_before = previous
+                    elapsed = now - sampled_before
+                    if elapsed > 0:
+                        group["cpu_percent"] = round(max(0.0, group["cpu_seconds"] - cpu_before) / elapsed * 100, 1)
+                self._previous[pgid] = (group["cpu_seconds"], now)
+
+            # Forget groups that no longer exist
+            for pgid in list(self._previous):
+                if pgid in wanted and pgid not in usage:
+                    del self._previous[pgid]
+
+        return usage
+
+
+def group_id(pid: Optional[int]) -> Optional[int]:
+    """Process group of a pid, or None if it is gone"""
+    if not pid:
+        return None
+    try:
+        return os.getpgid(pid)
+    except OSError:
+        return None
+
+
+def combine_usage(usages: Iterable[Optional[Dict]]) -> Dict:
+    """Sum several usage dicts (per tunnel) into one total; a field unknown for any tunnel is None"""
+    usages = [usage for usage in usages if usage]
+    total = {}
+    for field in ("processes", "rss_bytes", "cpu_seconds", "cpu_percent", "threads", "open_fds"):
+        values = [usage.get(field) for usage in usages]
+        if any(value is None for value in values):
+            total[field] = None
+        elif field in ("cpu_seconds", "cpu_percent"):
+            total[field] = round(sum(values), 2)
+        else:
+            total[field] = sum(values)
+    return total
+
+
+process_sampler = ProcessSampler()
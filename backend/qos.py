@@ -0,0 +1,204 @@
+"""
+Relay QoS
+Token-bucket rate limits per service and per client for relay listeners, and
+two priority classes: connections that have recently moved a lot of data are
+"bulk" and only get the bandwidth no "interactive" connection is waiting for
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .config import QOS_BULK_BYTES, QOS_BULK_WINDOW_SECONDS, QOS_INTERACTIVE_RESERVE
+from .history import percentiles
+
+CLASSES = ("interactive", "bulk")
+# "up" is client to backend, "down" backend to client
+DIRECTIONS = ("up", "down")
+# Turnaround times kept per class for the percentiles
+LATENCY_SAMPLES = 1000
+# Seconds of traffic behind the reported throughput
+THROUGHPUT_WINDOW = 10
+# Longest sleep while waiting for tokens, so a waiting bulk transfer notices
+# interactive traffic that arrived in the meantime
+MAX_WAIT = 0.05
+
+
+class TokenBucket:
+    """
+    `rate` bytes per second with a burst of one second. A transfer may take
+    the bucket below zero (a 64 KiB read is not split up); the debt delays the
+    transfers after it
+    """
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.tokens = float(rate)
+        self._updated = time.monotonic()
+
+    def wait_time(self, floor: float = 0.0) -> float:
+        """Seconds until the bucket holds at least `floor` tokens"""
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return 0.0 if self.tokens >= floor else (floor - self.tokens) / self.rate
+
+    def consume(self, size: int):
+        self.tokens -= size
+
+
+class _Meter:
+    """Total bytes, and bytes per second over the last THROUGHPUT_WINDOW seconds"""
+
+    def __init__(self):
+        self.total = 0
+        # [second, bytes] per second with traffic
+        self._seconds: Deque[List[int]] = deque()
+
+    def add(self, size: int):
+        self.total += size
+        second = int(time.monotonic())
+        if self._seconds and self._seconds[-1][0] == second:
+            self._seconds[-1][1] += size
+        else:
+            self._seconds.append([second, size])
+        while self._seconds[0][0] <= second - THROUGHPUT_WINDOW:
+            self._seconds.popleft()
+
+    def rate(self) -> float:
+        since = int(time.monotonic()) - THROUGHPUT_WINDOW
+        return sum(size for second, size in list(self._seconds) if second > since) / THROUGHPUT_WINDOW
+
+
+class Flow:
+    """One relayed connection, as seen by the shaper"""
+
+    def __init__(self, client: str):
+        self.client = client
+        # Bytes moved, decaying with a time constant of QOS_BULK_WINDOW_SECONDS
+        self._recent = 0.0
+        self._updated = time.monotonic()
+        # When data last went up with no reply yet (for the turnaround time)
+        self.request_at: Optional[float] = None
+
+    def _decayed(self, now: float) -> float:
+        return self._recent * math.exp(-(now - self._updated) / QOS_BULK_WINDOW_SECONDS)
+
+    def add(self, size: int, now: float):
+        self._recent = self._decayed(now) + size
+        self._updated = now
+
+    @property
+    def priority(self) -> str:
+        return "bulk" if self._decayed(time.monotonic()) > QOS_BULK_BYTES else "interactive"
+
+
+class _ClassStats:
+    def __init__(self):
+        self.meters = {direction: _Meter() for direction in DIRECTIONS}
+        self.latency_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.delayed = 0
+        self.wait_ms = 0.0
+
+
+class QosShaper:
+    """
+    QoS of one relay listener. Every transfer waits for the service bucket of
+    its direction (rate) and for its client's bucket (client_rate). Bulk
+    transfers also wait while an interactive transfer is waiting, and leave
+    QOS_INTERACTIVE_RESERVE of each bucket to interactive traffic, so a query
+    arriving during an export goes first instead of queueing behind it.
+    Without a rate the shaper only classifies and measures.
+    """
+
+    def __init__(self, rate: Optional[int] = None, client_rate: Optional[int] = None):
+        self.rate = rate
+        self.client_rate = client_rate
+        self._buckets = {direction: TokenBucket(rate) for direction in DIRECTIONS} if rate else {}
+        self._client_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._interactive_waiting = {direction: 0 for direction in DIRECTIONS}
+        self._flows = set()
+        self._classes = {name: _ClassStats() for name in CLASSES}
+
+    def open(self, client: str) -> Flow:
+        flow = Flow(client)
+        self._flows.add(flow)
+        return flow
+
+    def close(self, flow: Flow):
+        self._flows.discard(flow)
+
+    async def transfer(self, flow: Flow, direction: str, size: int):
+        """Wait until `size` bytes of `flow` may pass in `direction`, and count them"""
+        started = time.monotonic()
+        if direction == "up" and flow.request_at is None:
+            flow.request_at = started
+        flow.add(size, started)
+        priority = flow.priority
+
+        buckets = []
+        service = self._buckets.get(direction)
+        if service:
+            buckets.append(service)
+        if self.client_rate:
+            key = (flow.client, direction)
+            if key not in self._client_buckets:
+                self._client_buckets[key] = TokenBucket(self.client_rate)
+            buckets.append(self._client_buckets[key])
+
+        waited = 0.0
+        if buckets:
+            bulk = priority == "bulk"
+            if not bulk:
+                self._interactive_waiting[direction] += 1
+            try:
+                while True:
+                    if bulk and self._interactive_waiting[direction]:
+                        delay = MAX_WAIT
+                    else:
+                        delay = max(
+                            bucket.wait_time(bucket.rate * QOS_INTERACTIVE_RESERVE if bulk else 0.0)
+                            for bucket in buckets
+                        )
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(min(delay, MAX_WAIT))
+                    waited = time.monotonic() - started
+            finally:
+                if not bulk:
+                    self._interactive_waiting[direction] -= 1
+            for bucket in buckets:
+                bucket.consume(size)
+
+        stats = self._classes[priority]
+        stats.meters[direction].add(size)
+        if waited:
+            stats.delayed += 1
+            stats.wait_ms += waited * 1000
+        if direction == "down" and flow.request_at is not None:
+            stats.latency_ms.append((time.monotonic() - flow.request_at) * 1000)
+            flow.request_at = None
+
+    def stats(self) -> Dict:
+        """Limits, and connections, throughput and turnaround times per class"""
+        priorities = [flow.priority for flow in list(self._flows)]
+        return {
+            "rate": self.rate,
+            "client_rate": self.client_rate,
+            "classes": {
+                name: {
+                    "connections": priorities.count(name),
+                    "bytes_up": stats.meters["up"].total,
+                    "bytes_down": stats.meters["down"].total,
+                    "throughput_up": round(stats.meters["up"].rate()),
+                    "throughput_down": round(stats.meters["down"].rate()),
+                    # First reply byte after a request, over the last LATENCY_SAMPLES requests
+                    "latency_ms": percentiles(list(stats.latency_ms)),
+                    "delayed_transfers": stats.delayed,
+                    "shaping_wait_ms": round(stats.wait_ms, 1)
+                }
+                for name, stats in self._classes.items()
+            }
+        }
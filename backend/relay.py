@@ -0,0 +1,542 @@
+"""
+TCP Relay
+Asyncio listeners that accept local connections and pipe them to backends.
+Connections are plain non-blocking sockets (no stream buffers), so relays can
+be frozen between two chunks and handed to another server process as they are
+"""
+
+import asyncio
+import itertools
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .qos import Flow, QosShaper
+
+# Bytes read per chunk when piping between client and backend
+RELAY_BUFFER_SIZE = 64 * 1024
+# Poll interval while waiting for relays to finish the chunk in hand
+FREEZE_POLL = 0.005
+
+
+def find_free_port(host: str = '127.0.0.1') -> int:
+    """Ask the kernel for an unused local TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+async def _readable(sock: socket.socket):
+    """Wait until sock can be read (data, EOF, an error or a new connection) without reading it"""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    fd = sock.fileno()
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await ready
+    finally:
+        loop.remove_reader(fd)
+
+
+def wait_for_port(port: int, timeout: float, host: str = '127.0.0.1') -> bool:
+    """Poll until something is listening on host:port or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if sock.connect_ex((host, port)) == 0:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.1)
+
+
+class RelayLoop:
+    """
+    Background thread running the asyncio loop shared by all relay listeners.
+    freeze() stops every listener from accepting and every relayed connection
+    from reading once the chunk in hand is written, so their sockets can be
+    handed to another process without losing or reordering bytes
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # Set while relays run; created on the loop (see _open)
+        self._gate: Optional[asyncio.Event] = None
+        self._frozen = False
+        # Chunks read but not written yet
+        self.busy = 0
+        self.listeners = set()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the relay loop, starting its thread on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._loop.run_forever, name="relay-loop", daemon=True)
+                thread.start()
+            return self._loop
+
+    def run(self, coro, timeout: float = 10):
+        """Run a coroutine on the relay loop and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.get_loop())
+        return future.result(timeout)
+
+    def _open(self) -> asyncio.Event:
+        if self._gate is None:
+            self._gate = asyncio.Event()
+            if not self._frozen:
+                self._gate.set()
+        return self._gate
+
+    async def opened(self):
+        """Return at once while relays run, else when they are thawed (call on the loop)"""
+        gate = self._open()
+        if not gate.is_set():
+            await gate.wait()
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self, timeout: float):
+        """Stop all relays at a chunk boundary; TimeoutError (relays left running) if that takes too long"""
+        self.run(self._freeze(timeout), timeout + 1)
+
+    def thaw(self):
+        """Let frozen relays run again"""
+        self.run(self._thaw())
+
+    async def _freeze(self, timeout: float):
+        self._frozen = True
+        self._open().clear()
+        deadline = time.monotonic() + timeout
+        while self.busy:
+            if time.monotonic() >= deadline:
+                await self._thaw()
+                raise TimeoutError(f"relays still busy after {timeout}s")
+            await asyncio.sleep(FREEZE_POLL)
+
+    async def _thaw(self):
+        self._frozen = False
+        self._open().set()
+
+    def active_connections(self) -> int:
+        """Open connections over every listener"""
+        return sum(listener.stats()["active_connections"] for listener in list(self.listeners))
+
+
+relay_loop = RelayLoop()
+
+
+class RelayBackend:
+    """Upstream target of a relay listener"""
+
+    def __init__(self, name: str, host: str, port: int):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.active = 0
+        self.total = 0
+        self.failures = 0
+
+    def stats(self) -> Dict:
+        """Connection counters for this backend"""
+        return {
+            "name": self.name,
+            "host": self.host,
+            "port": self.port,
+            "active_connections": self.active,
+            "total_connections": self.total,
+            "failures": self.failures
+        }
+
+
+class _Relayed:
+    """One relayed connection: client and backend sockets, and the task piping them"""
+
+    def __init__(self, client_sock: socket.socket, host: str):
+        self.client_sock = client_sock
+        self.host = host
+        self.backend: Optional[RelayBackend] = None
+        self.backend_sock: Optional[socket.socket] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class RelayListener:
+    """
+    Local TCP listener relaying each accepted connection to one backend.
+    New connections go to the backend with the fewest active connections,
+    ties broken round-robin; a backend that refuses the connection is
+    skipped and the next one is tried. With ordered=True backends are tried
+    in the order they were set instead (primary first, then the standby).
+    When max_connections is set, clients beyond the limit are refused.
+    With a QosShaper, traffic is rate limited and prioritized (see qos.py).
+    """
+
+    def __init__(self, name: str, port: int, bind_host: str = '127.0.0.1', max_connections: Optional[int] = None,
+                 ordered: bool = False, qos: Optional[QosShaper] = None):
+        self.name = name
+        self.port = port
+        self.bind_host = bind_host
+        self.max_connections = max_connections
+        self.ordered = ordered
+        self.qos = qos
+        # Per-client (remote address) counters: host -> {"active": n, "total": n, "rejected": n}
+        self._clients: Dict[str, Dict[str, int]] = {}
+        self._active = 0
+        self._backends: Dict[str, RelayBackend] = {}
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+        self._sock: Optional[socket.socket] = None
+        self._accept_task: Optional[asyncio.Task] = None
+        # Relayed connections (a pooled listener's sessions are tasks only)
+        self._connections: Dict[asyncio.Task, Optional[_Relayed]] = {}
+        # Replaced backends still carrying open connections, by name
+        self._retired: Dict[str, RelayBackend] = {}
+        self.total_connections = 0
+        self.rejected_connections = 0
+
+    # ------------------------------------------------------------------
+    # Backend management (safe to call from any thread)
+    # ------------------------------------------------------------------
+
+    def set_backends(self, backends: List[Tuple[str, str, int]]):
+        """Replace the backend set, keeping counters of backends that remain"""
+        with self._lock:
+            updated = {}
+            for name, host, port in backends:
+                existing = self._backends.get(name)
+                if existing and existing.host == host and existing.port == port:
+                    updated[name] = existing
+                else:
+                    updated[name] = RelayBackend(name, host, port)
+            self._backends = updated
+
+    def add_backend(self, name: str, host: str, port: int):
+        """Add or replace a single backend"""
+        with self._lock:
+            backends = dict(self._backends)
+            backends[name] = RelayBackend(name, host, port)
+            self._backends = backends
+
+    def remove_backend(self, name: str):
+        """Stop sending new connections to a backend"""
+        with self._lock:
+            backends = dict(self._backends)
+            backends.pop(name, None)
+            self._backends = backends
+
+    def backend(self, name: str) -> Optional[RelayBackend]:
+        """A current backend (its counters keep updating after it is replaced)"""
+        return self._backends.get(name)
+
+    def open_backend(self, name: str) -> Optional[RelayBackend]:
+        """A backend by name, current or replaced but still carrying adopted connections"""
+        return self._backends.get(name) or self._retired.get(name)
+
+    def backend_names(self) -> List[str]:
+        """Names of the current backends"""
+        return list(self._backends)
+
+    def _candidates(self) -> List[RelayBackend]:
+        """Backends ordered by preference for the next connection"""
+        backends = list(self._backends.values())
+        if not backends or self.ordered:
+            return backends
+        offset = next(self._rotation) % len(backends)
+        rotated = backends[offset:] + backends[:offset]
+        return sorted(rotated, key=lambda b: b.active)
+
+    # ------------------------------------------------------------------
+    # Lifecycle (blocking wrappers around the relay loop)
+    # ------------------------------------------------------------------
+
+    def start(self, sock: Optional[socket.socket] = None):
+        """Bind the listener (or serve an already listening socket) on the relay loop"""
+        if sock is None:
+            family = socket.getaddrinfo(self.bind_host, self.port, type=socket.SOCK_STREAM,
+                                        flags=socket.AI_PASSIVE)[0][0]
+            sock = socket.create_server((self.bind_host, self.port), family=family)
+        sock.setblocking(False)
+        relay_loop.run(self._start(sock))
+
+    def stop(self):
+        """Close the listener and every relayed connection"""
+        relay_loop.run(self._stop())
+
+    async def _start(self, sock: socket.socket):
+        self._sock = sock
+        self._accept_task = asyncio.get_running_loop().create_task(self._accept())
+        relay_loop.listeners.add(self)
+
+    async def _stop(self):
+        relay_loop.listeners.discard(self)
+        sock, self._sock = self._sock, None
+        if self._accept_task:
+            self._accept_task.cancel()
+            self._accept_task = None
+        tasks = list(self._connections)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if sock:
+            sock.close()
+
+    async def _accept(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await _readable(self._sock)
+            await relay_loop.opened()
+            try:
+                client_sock, address = self._sock.accept()
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError as e:
+                print(f"Error accepting on {self.name}: {e}")
+                await asyncio.sleep(0.1)
+                continue
+            client_sock.setblocking(False)
+            host = address[0] if isinstance(address, tuple) else 'unknown'
+            loop.create_task(self._handle_client(client_sock, host))
+
+    # ------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    async def _connect(host: str, port: int) -> socket.socket:
+        loop = asyncio.get_running_loop()
+        error: Optional[OSError] = None
+        for family, kind, proto, _, address in await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+            sock = socket.socket(family, kind, proto)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, address)
+                return sock
+            except OSError as e:
+                sock.close()
+                error = e
+        raise error or OSError(f"cannot resolve {host}")
+
+    async def _open_backend(self) -> Tuple[Optional[RelayBackend], Optional[socket.socket]]:
+        """Connect to the first backend that accepts the connection"""
+        for backend in self._candidates():
+            try:
+                return backend, await self._connect(backend.host, backend.port)
+            except OSError:
+                backend.failures += 1
+        return None, None
+
+    def _client(self, host: str) -> Dict[str, int]:
+        return self._clients.setdefault(host, {"active": 0, "total": 0, "rejected": 0})
+
+    async def _handle_client(self, client_sock: socket.socket, host: str, relayed: Optional[_Relayed] = None):
+        """
+        Serve one client connection; with `relayed`, continue an adopted
+        connection whose backend socket is already open
+        """
+        client = self._client(host)
+
+        if relayed is None and self.max_connections is not None and self._active >= self.max_connections:
+            self.rejected_connections += 1
+            client["rejected"] += 1
+            client_sock.close()
+            return
+
+        task = asyncio.current_task()
+        self._connections[task] = relayed
+        self._active += 1
+        client["active"] += 1
+        try:
+            if relayed:
+                await self._relay(relayed, client)
+            else:
+                await self._serve(client_sock, host, client)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._active -= 1
+            client["active"] -= 1
+            # Only closes this process' descriptor: a connection handed off keeps running elsewhere
+            client_sock.close()
+            self._connections.pop(task, None)
+
+    async def _serve(self, client_sock: socket.socket, host: str, client: Dict[str, int]):
+        """Relay one accepted connection to a backend until either side closes"""
+        backend, backend_sock = await self._open_backend()
+        if backend is None:
+            self.rejected_connections += 1
+            client["rejected"] += 1
+            return
+
+        self.total_connections += 1
+        client["total"] += 1
+        backend.total += 1
+        relayed = _Relayed(client_sock, host)
+        relayed.backend, relayed.backend_sock = backend, backend_sock
+        self._connections[asyncio.current_task()] = relayed
+        await self._relay(relayed, client)
+
+    async def _relay(self, relayed: _Relayed, client: Dict[str, int]):
+        backend = relayed.backend
+        backend.active += 1
+        flow = self.qos.open(relayed.host) if self.qos else None
+        try:
+            await asyncio.gather(
+                self._pipe(relayed.client_sock, relayed.backend_sock, flow, "up"),
+                self._pipe(relayed.backend_sock, relayed.client_sock, flow, "down")
+            )
+        finally:
+            backend.active -= 1
+            if not backend.active and self._retired.get(backend.name) is backend:
+                del self._retired[backend.name]
+            relayed.backend_sock.close()
+            if flow:
+                self.qos.close(flow)
+
+    async def _pipe(self, source: socket.socket, destination: socket.socket,
+                    flow: Optional[Flow] = None, direction: str = "up"):
+        """
+        Copy bytes from source to destination until EOF, shaped when the flow
+        is given. Nothing is read while relays are frozen, and a chunk read is
+        always written before the relay stops for a freeze
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await _readable(source)
+                await relay_loop.opened()
+                try:
+                    data = source.recv(RELAY_BUFFER_SIZE)
+                except (BlockingIOError, InterruptedError):
+                    continue
+                if not data:
+                    break
+                relay_loop.busy += 1
+                try:
+                    if flow:
+                        await self.qos.transfer(flow, direction, len(data))
+                    await loop.sock_sendall(destination, data)
+                finally:
+                    relay_loop.busy -= 1
+        except (ConnectionError, OSError):
+            pass
+        # Not reached when cancelled: a handed-off connection must not be half-closed
+        try:
+            destination.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Handoff to another server process (relays frozen, see RelayLoop)
+    # ------------------------------------------------------------------
+
+    def export(self, add_socket) -> Dict:
+        """
+        Listening socket, relayed connections and counters, for adopt() in the
+        next server; add_socket(sock) returns the index a socket is sent under
+        """
+        return relay_loop.run(self._export(add_socket))
+
+    async def _export(self, add_socket) -> Dict:
+        return {
+            "listener": add_socket(self._sock),
+            "backends": [[b.name, b.host, b.port, b.total, b.failures] for b in self._backends.values()],
+            "connections": [
+                {
+                    "client": add_socket(relayed.client_sock),
+                    "host": relayed.host,
+                    "backend": add_socket(relayed.backend_sock),
+                    "backend_name": relayed.backend.name,
+                    "backend_host": relayed.backend.host,
+                    "backend_port": relayed.backend.port
+                }
+                for relayed in self._connections.values() if relayed and relayed.backend_sock
+            ],
+            "total_connections": self.total_connections,
+            "rejected_connections": self.rejected_connections,
+            "clients": {host: [c["total"], c["rejected"]] for host, c in self._clients.items()}
+        }
+
+    def release(self):
+        """
+        After a handoff: stop accepting and drop the exported connections (the
+        next server relays them now) without closing them. Sessions of a pooled
+        listener are left to finish here
+        """
+        relay_loop.run(self._release())
+
+    async def _release(self):
+        if self._accept_task:
+            self._accept_task.cancel()
+            self._accept_task = None
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        tasks = [task for task, relayed in self._connections.items() if relayed and relayed.backend_sock]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def adopt(self, data: Dict, sockets: List[socket.socket]):
+        """
+        Take over a listener exported by the previous server: serve its listening
+        socket and relay its open connections. Call after set_backends(); the
+        relays only move bytes once relay_loop is thawed
+        """
+        relay_loop.run(self._adopt(data, sockets))
+
+    async def _adopt(self, data: Dict, sockets: List[socket.socket]):
+        for name, host, port, total, failures in data["backends"]:
+            backend = self._backends.get(name)
+            if backend and backend.host == host and backend.port == port:
+                backend.total, backend.failures = total, failures
+        self.total_connections = data["total_connections"]
+        self.rejected_connections = data["rejected_connections"]
+        for host, (total, rejected) in data["clients"].items():
+            client = self._client(host)
+            client["total"], client["rejected"] = total, rejected
+
+        loop = asyncio.get_running_loop()
+        for connection in data["connections"]:
+            relayed = _Relayed(sockets[connection["client"]], connection["host"])
+            relayed.backend_sock = sockets[connection["backend"]]
+            relayed.client_sock.setblocking(False)
+            relayed.backend_sock.setblocking(False)
+            name, host, port = connection["backend_name"], connection["backend_host"], connection["backend_port"]
+            backend = self.open_backend(name)
+            if backend is None or (backend.host, backend.port) != (host, port):
+                backend = self._retired[name] = RelayBackend(name, host, port)
+            relayed.backend = backend
+            loop.create_task(self._handle_client(relayed.client_sock, relayed.host, relayed))
+
+        sock = sockets[data["listener"]]
+        sock.setblocking(False)
+        await self._start(sock)
+
+    def stats(self) -> Dict:
+        """Listener and per-backend connection counters (safe to call from any thread)"""
+        return relay_loop.run(self._stats())
+
+    async def _stats(self) -> Dict:
+        # Runs on the loop, so clients and counters cannot change while they are read
+        backends = [b.stats() for b in self._backends.values()]
+        return {
+            "name": self.name,
+            "bind_host": self.bind_host,
+            "port": self.port,
+            "max_connections": self.max_connections,
+            "active_connections": self._active,
+            "total_connections": self.total_connections,
+            "rejected_connections": self.rejected_connections,
+            "qos": self.qos.stats() if self.qos else None,
+            "backends": backends,
+            "clients": [
+                {"client": host, **counters}
+                for host, counters in sorted(self._clients.items())
+            ]
+        }
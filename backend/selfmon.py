@@ -0,0 +1,187 @@
+"""
+Server Self-Monitor
+Samples the server's own open fds, zombie children, threads and RSS, so
+leaks show up over a long-running session, and reaps the long-lived children
+(SSM sessions, SSH masters, kubectl port-forwards) that nobody else waits for
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+from .config import SELF_MONITOR_SECONDS, SELF_MONITOR_SAMPLES
+from .procstats import PROC, PAGE_SIZE
+
+COUNTERS = ("open_fds", "zombies", "threads", "rss_bytes", "children")
+# Growth per hour is only extrapolated from samples spanning at least this long
+TREND_MIN_SECONDS = 600
+
+
+def _open_fds() -> Optional[int]:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            # Minus the descriptor listdir itself holds open
+            return len(os.listdir(path)) - 1
+        except OSError:
+            continue
+    return None
+
+
+def _zombies() -> int:
+    """Exited children of this process that were not reaped"""
+    me = os.getpid()
+    if not PROC.is_dir():
+        try:
+            result = subprocess.run(["ps", "-axo", "ppid=,stat="], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            return 0
+        return sum(
+            1 for line in result.stdout.splitlines()
+            if len(line.split()) == 2 and line.split()[0] == str(me) and line.split()[1].startswith("Z")
+        )
+
+    count = 0
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(entry / "stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Fields after the parenthesised command name: state, ppid, ...
+        fields = stat[stat.rfind(')') + 2:].split()
+        if fields[0] == "Z" and int(fields[1]) == me:
+            count += 1
+    return count
+
+
+def _threads_and_rss() -> Dict[str, Optional[int]]:
+    try:
+        with open(PROC / "self" / "stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return {"threads": int(fields[17]), "rss_bytes": int(fields[21]) * PAGE_SIZE}
+    except (OSError, IndexError, ValueError):
+        # Without /proc: Python threads only, and the peak RSS (bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"threads": threading.active_count(), "rss_bytes": peak if sys.platform == "darwin" else peak * 1024}
+
+
+class SelfMonitor:
+    """
+    Periodic samples of the server's own resource counters, plus the child
+    processes it reaps.
+
+    Sessions of standby tunnels and grouped kubectl forwards are not tracked:
+    their watchers reap them once they handled the exit.
+    """
+
+    def __init__(self):
+        self._children: Dict[int, subprocess.Popen] = {}
+        self._reaped = 0
+        self._samples: Deque[Dict] = deque(maxlen=SELF_MONITOR_SAMPLES)
+        self._baseline: Optional[Dict] = None
+        self._peak: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, process: subprocess.Popen):
+        """Reap a long-lived child once it exits"""
+        with self._lock:
+            self._children[process.pid] = process
+
+    def reap(self) -> int:
+        """Collect every tracked child that exited; returns how many"""
+        with self._lock:
+            exited = [pid for pid, process in self._children.items() if process.poll() is not None]
+            for pid in exited:
+                del self._children[pid]
+            self._reaped += len(exited)
+        return len(exited)
+
+    def sample(self) -> Dict:
+        """Current counters (after reaping, so children are the live ones)"""
+        self.reap()
+        with self._lock:
+            children = len(self._children)
+        current = {
+            "at": datetime.now().isoformat(),
+            "open_fds": _open_fds(),
+            "zombies": _zombies(),
+            **_threads_and_rss(),
+            "children": children
+        }
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = current
+            for counter in COUNTERS:
+                if current[counter] is not None:
+                    self._peak[counter] = max(self._peak.get(counter, current[counter]), current[counter])
+        return current
+
+    @staticmethod
+    def _trend(samples, counter: str) -> Optional[float]:
+        """Least-squares growth per hour of a counter over the kept samples"""
+        points = [
+            (datetime.fromisoformat(sample["at"]).timestamp(), sample[counter])
+            for sample in samples if sample[counter] is not None
+        ]
+        if len(points) < 2 or points[-1][0] - points[0][0] < TREND_MIN_SECONDS:
+            return None
+        mean_t = sum(t for t, _ in points) / len(points)
+        mean_v = sum(v for _, v in points) / len(points)
+        spread = sum((t - mean_t) ** 2 for t, _ in points)
+        if not spread:
+            return None
+        return round(sum((t - mean_t) * (v - mean_v) for t, v in points) / spread * 3600, 1)
+
+    def status(self) -> Dict:
+        """Current counters, the first sample, peaks and growth per hour over the kept samples"""
+        current = self.sample()
+        with self._lock:
+            samples = list(self._samples) + [current]
+            return {
+                "pid": os.getpid(),
+                "current": current,
+                "baseline": self._baseline,
+                "peak": dict(self._peak),
+                "trend_per_hour": {counter: self._trend(samples, counter) for counter in COUNTERS},
+                "reaped_children": self._reaped,
+                "samples": list(self._samples)
+            }
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Sample (and reap) in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="self-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+
+    def _run(self):
+        while True:
+            try:
+                current = self.sample()
+                with self._lock:
+                    self._samples.append(current)
+            except Exception as e:
+                print(f"Error sampling server resources: {e}")
+            if self._stop_event.wait(SELF_MONITOR_SECONDS):
+                return
+
+
+self_monitor = SelfMonitor()
@@ -0,0 +1,143 @@
+"""
+Server entry point
+Runs the app under uvicorn like `python -m uvicorn backend.main:app`, plus
+upgrades without downtime: with --handoff the new process takes the running
+server's sockets, relayed connections and tunnels over (see handoff.py), and
+--reload does that on every code change instead of restarting the server.
+
+Usage:
+    python -m backend.server [--host 0.0.0.0] [--port 5678] [--handoff] [--reload]
+"""
+
+import argparse
+import logging
+import signal
+import socket
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import uvicorn
+
+from .config import SERVER_HOST, SERVER_PORT, HANDOFF_SOCKET_PATH
+from . import handoff
+
+logger = logging.getLogger("backend.server")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Seconds between two scans of the sources with --reload
+RELOAD_POLL_SECONDS = 0.5
+
+
+def serve(host: str, port: int, take_over: bool):
+    """Run the app, taking over from the running server first when take_over is set"""
+    # Imported before asking for the handoff, so broken code fails without disturbing the running server
+    from .main import app
+
+    package = None
+    if take_over and HANDOFF_SOCKET_PATH:
+        try:
+            package = handoff.receive(Path(HANDOFF_SOCKET_PATH))
+        except (handoff.HandoffError, OSError) as e:
+            logger.error(f"The running server did not hand over: {e}")
+            sys.exit(1)
+        if package is None:
+            logger.info("No server running, starting a new one")
+
+    if package:
+        sockets = [package[index] for index in package.manifest["http"]]
+        if not sockets:
+            # Binding the port would fail while the old server has it
+            handoff.abort("no HTTP listening socket to take over")
+            logger.error(f"Server process {package.manifest['pid']} sent no HTTP listening socket")
+            sys.exit(1)
+    else:
+        sockets = [socket.create_server((host, port), family=socket.AF_INET6 if ":" in host else socket.AF_INET)]
+
+    config = uvicorn.Config(app, host=host, port=port)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def _mtimes() -> Dict[Path, float]:
+    """Modification time of every backend source file"""
+    mtimes = {}
+    for path in (PROJECT_ROOT / "backend").rglob("*.py"):
+        try:
+            mtimes[path] = path.stat().st_mtime
+        except OSError:
+            continue
+    return mtimes
+
+
+def supervise(host: str, port: int):
+    """
+    Keep a worker server running and replace it by handoff whenever a source
+    file changes. A new worker that fails to start leaves the old one serving
+    """
+    command = [sys.executable, "-m", "backend.server", "--host", host, "--port", str(port), "--handoff"]
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    logger.info(f"Watching {PROJECT_ROOT / 'backend'} for changes")
+    mtimes = _mtimes()
+    worker = subprocess.Popen(command, cwd=PROJECT_ROOT)
+    successor: Optional[subprocess.Popen] = None
+    while not stopping.wait(RELOAD_POLL_SECONDS):
+        if successor is not None:
+            if successor.poll() is not None:
+                logger.error(f"New server exited with code {successor.returncode}, the old one carries on")
+                successor = None
+            elif worker.poll() is not None:
+                logger.info(f"Server process {successor.pid} took over from {worker.pid}")
+                worker, successor = successor, None
+            continue
+
+        current = _mtimes()
+        if current == mtimes:
+            continue
+        changed = sorted(
+            str(path.relative_to(PROJECT_ROOT)) for path in set(current) | set(mtimes)
+            if current.get(path) != mtimes.get(path)
+        )
+        mtimes = current
+        logger.info(f"{', '.join(changed)} changed, reloading")
+        if worker.poll() is None:
+            successor = subprocess.Popen(command, cwd=PROJECT_ROOT)
+        else:
+            # The last worker died (broken code): start afresh
+            worker = subprocess.Popen(command, cwd=PROJECT_ROOT)
+
+    for process in (successor, worker):
+        if process is not None and process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+    for process in (successor, worker):
+        if process is not None:
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunnel Manager Web server")
+    parser.add_argument("--host", default=SERVER_HOST, help=f"Address to listen on (default: {SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"Port to listen on (default: {SERVER_PORT})")
+    parser.add_argument("--handoff", action="store_true",
+                        help="Take over from the server already running (sockets, connections, tunnels)")
+    parser.add_argument("--reload", action="store_true",
+                        help="Hand over to a new server process whenever a backend source file changes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.reload:
+        supervise(args.host, args.port)
+    else:
+        serve(args.host, args.port, args.handoff)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Single-flight call coalescing
+Concurrent identical calls share one in-flight computation and its result
+"""
+
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from . import cancellation
+from .cancellation import CancelToken, Cancelled
+
+
+class _Call:
+    """An in-flight computation that followers wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        # Cancelled once every caller waiting for the result was cancelled
+        self.token = CancelToken()
+        self.waiting = 0
+        # A caller without a cancel token keeps the computation going
+        self.pinned = False
+        self.lock = threading.Lock()
+
+    def join(self) -> Callable[[], None]:
+        """Count the calling thread as waiting for the result; returns the function to call when done"""
+        caller = cancellation.current()
+        if not caller:
+            self.pinned = True
+            return lambda: None
+
+        def abandon():
+            with self.lock:
+                self.waiting -= 1
+                abandoned = not self.waiting and not self.pinned
+            if abandoned:
+                self.token.cancel()
+
+        with self.lock:
+            self.waiting += 1
+        caller.on_cancel(abandon)
+        return lambda: caller.remove_callback(abandon)
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time. Callers arriving while a
+    computation for their key is running wait for it and receive the same
+    result (or exception) instead of starting their own.
+
+    A cancelled caller stops waiting (raising Cancelled); the computation
+    itself is only cancelled when every caller waiting for it was.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs), or join the identical call already running"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        done = call.join()
+        if not leader:
+            try:
+                cancellation.wait(call.event)
+            finally:
+                done()
+            if isinstance(call.error, Cancelled):
+                # Every other caller gave up on it while this one joined; run it again
+                return self.do(key, fn, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = cancellation.run(call.token, fn, *args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            if isinstance(e, Cancelled):
+                # Report why this caller was cancelled rather than the shared computation
+                cancellation.check()
+            raise
+        finally:
+            done()
+            call.token.finish()
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Number of computations run and of calls that joined one"""
+        return {"executions": self.executions, "coalesced": self.coalesced}
+
+
+# Shared by every @single_flight method; keys include the instance and method
+method_flights = SingleFlight()
+
+
+def single_flight(method: Callable) -> Callable:
+    """
+    Coalesce concurrent calls of a method with identical arguments on the
+    same instance. The shared result must be treated as read-only by callers.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (id(self), method.__qualname__, args, tuple(sorted(kwargs.items())))
+        return method_flights.do(key, method, self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,127 @@
+"""
+SSH-over-SSM Multiplexing
+One SSH ControlMaster per env, connected through an AWS-StartSSHSession SSM
+session, carries the port forwards of every service of the env. Forwards are
+added to and removed from the running master with `ssh -O forward/cancel`,
+which takes milliseconds instead of a new SSM session per service
+"""
+
+import os
+import signal
+import subprocess
+import tempfile
+import time
+import uuid
+from typing import Optional, Tuple
+
+from . import cancellation
+from .catalog import TunnelEnv
+from .config import SSH_CONTROL_DIR, SSH_CONNECT_TIMEOUT
+
+# Seconds a control command (-O check/forward/cancel) may take
+CONTROL_TIMEOUT = 10
+
+
+def control_path(env: str) -> str:
+    """
+    Control socket for a new master of env. Unique per master: a master that is
+    still exiting removes its socket, which must not be the new master's
+    """
+    return str(SSH_CONTROL_DIR / f"{env}-{uuid.uuid4().hex[:8]}.sock")
+
+
+def forward_spec(bind_port: str, host: str, remote_port: str, bind_host: str = "127.0.0.1") -> str:
+    """-L argument forwarding bind_host:bind_port to host:remote_port"""
+    return f"{bind_host}:{bind_port}:{host}:{remote_port}"
+
+
+def _control(path: str, operation: str, spec: Optional[str] = None) -> Tuple[bool, str]:
+    """Send one control command to a master; returns (success, error)"""
+    command = ["ssh", "-S", path, "-O", operation]
+    if spec:
+        command += ["-L", spec]
+    # The destination is required by the command line but unused with -O
+    command.append("tunnel-manager")
+    try:
+        result = cancellation.run_command(command, timeout=CONTROL_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return False, f"ssh -O {operation} timed out"
+    except OSError as e:
+        return False, str(e)
+    return result.returncode == 0, result.stderr.strip()
+
+
+def check(path: str) -> bool:
+    """Whether the master behind the control socket is running"""
+    return _control(path, "check")[0]
+
+
+def forward(path: str, spec: str) -> Tuple[bool, str]:
+    """Add a local forward to a running master"""
+    return _control(path, "forward", spec)
+
+
+def cancel(path: str, spec: str) -> Tuple[bool, str]:
+    """Remove a local forward (connections already open on it are kept)"""
+    return _control(path, "cancel", spec)
+
+
+def start_master(env_config: TunnelEnv, instance_id: str, path: str) -> Tuple[Optional[subprocess.Popen], str]:
+    """
+    Start the env's master through instance_id and wait until it answers on its control socket
+    Returns: (process, error) - process is None if the master did not come up
+    """
+    SSH_CONTROL_DIR.mkdir(parents=True, exist_ok=True)
+
+    proxy = (
+        f"aws ssm start-session --target %h --document-name AWS-StartSSHSession "
+        f"--parameters portNumber=%p --profile {env_config.profile} --region {env_config.region}"
+    )
+    command = [
+        "ssh", "-M", "-N", "-S", path,
+        "-o", f"ProxyCommand={proxy}",
+        "-o", "ControlPersist=no",
+        "-o", "ExitOnForwardFailure=no",
+        "-o", "BatchMode=yes",
+        "-o", f"ConnectTimeout={SSH_CONNECT_TIMEOUT}",
+        "-o", "ServerAliveInterval=30",
+        "-o", "ServerAliveCountMax=3",
+        "-o", "StrictHostKeyChecking=accept-new",
+        "-o", f"UserKnownHostsFile={SSH_CONTROL_DIR / 'known_hosts'}",
+        "-l", env_config.ssh_user
+    ]
+    if env_config.ssh_key:
+        command += ["-i", os.path.expanduser(env_config.ssh_key)]
+    command.append(instance_id)
+
+    with tempfile.TemporaryFile(mode='w+') as err_file:
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=err_file,
+                start_new_session=True
+            )
+        except OSError as e:
+            return None, f"Could not run ssh: {e}"
+
+        deadline = time.monotonic() + SSH_CONNECT_TIMEOUT + CONTROL_TIMEOUT
+        with cancellation.adopted(process):
+            while process.poll() is None and time.monotonic() < deadline:
+                if os.path.exists(path) and check(path):
+                    return process, ""
+                cancellation.sleep(0.05)
+
+        if process.poll() is None:
+            # The ProxyCommand (aws CLI + session-manager-plugin) is in the same process group
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+            return None, f"SSH session via {instance_id} did not come up within {SSH_CONNECT_TIMEOUT}s"
+
+        err_file.seek(0)
+        error = err_file.read().strip()
+        message = f"SSH session via {instance_id} exited (exit code: {process.returncode})"
+        if error:
+            message += f"\nError: {error[:500]}"
+        return None, message
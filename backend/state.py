@@ -0,0 +1,95 @@
+"""
+Versioned Dashboard State
+Keeps the last dashboard snapshot with a version per entry so clients can ask
+for only what changed since the version they already have
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+# Fields that change on every poll without anything happening (clocks, samplers,
+# counters). They are left out of /api/state so an idle dashboard produces empty
+# deltas; the per-resource endpoints still report them.
+VOLATILE_FIELDS = {
+    "uptime_seconds",
+    "idle_seconds",
+    "last_active_at",
+    "resources",
+    "gateway",
+    "relay"
+}
+
+# Sections of /api/state, each versioned on its own; keys are "<section>/..."
+STATE_SECTIONS = ("tunnels", "orphaned", "pods", "forwards")
+
+# Removed keys remembered for delta requests; older `since` values get a full snapshot
+TOMBSTONE_LIMIT = 1000
+
+
+def strip_volatile(entry: Dict) -> Dict:
+    """Entry without its volatile fields"""
+    return {field: value for field, value in entry.items() if field not in VOLATILE_FIELDS}
+
+
+class StateTracker:
+    """
+    Diffs successive snapshots of flat {key: entry} dashboard state.
+
+    The version increases by one whenever a snapshot differs from the previous
+    one; each entry remembers the version it last changed in and each removed
+    key the version it disappeared in.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._entries: Dict[str, Dict] = {}
+        self._changed_in: Dict[str, int] = {}
+        self._removed_in: Dict[str, int] = {}
+        # Deltas from versions below this are incomplete (tombstones were dropped)
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def update(self, snapshot: Dict[str, Dict]) -> int:
+        """Record a new snapshot; returns the current version"""
+        with self._lock:
+            changed = [key for key, entry in snapshot.items() if self._entries.get(key) != entry]
+            removed = [key for key in self._entries if key not in snapshot]
+            if not changed and not removed:
+                return self.version
+
+            self.version += 1
+            for key in changed:
+                self._entries[key] = snapshot[key]
+                self._changed_in[key] = self.version
+                self._removed_in.pop(key, None)
+            for key in removed:
+                del self._entries[key]
+                del self._changed_in[key]
+                self._removed_in[key] = self.version
+
+            if len(self._removed_in) > TOMBSTONE_LIMIT:
+                oldest = sorted(self._removed_in.items(), key=lambda item: item[1])
+                for key, version in oldest[:len(self._removed_in) - TOMBSTONE_LIMIT]:
+                    del self._removed_in[key]
+                    self._floor = max(self._floor, version)
+            return self.version
+
+    def delta(self, since: Optional[int] = None) -> Dict:
+        """
+        Entries changed and keys removed after version `since`
+        Returns the full state (full=True) when since is missing, too old or
+        from another server process (ahead of the current version)
+        """
+        with self._lock:
+            full = since is None or since < self._floor or since > self.version
+            if full:
+                changed = dict(self._entries)
+                removed: List[str] = []
+            else:
+                changed = {
+                    key: self._entries[key]
+                    for key, version in self._changed_in.items()
+                    if version > since
+                }
+                removed = [key for key, version in self._removed_in.items() if version > since]
+            return {"version": self.version, "full": full, "changed": changed, "removed": removed}
@@ -0,0 +1,226 @@
+"""
+Teardown Engine
+Stops many process groups at once: SIGTERM to every target, wait for exit
+notifications until a shared grace deadline, then SIGKILL the stragglers
+"""
+
+import os
+import select
+import signal
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .config import TEARDOWN_GRACE_SECONDS
+
+# How long to wait for SIGKILLed processes to disappear
+KILL_WAIT_SECONDS = 2
+# Poll interval when pidfds are not available (macOS, old kernels)
+POLL_INTERVAL = 0.02
+
+# pidfds handed over by the previous server process, by PID (see handoff.py).
+# They were opened while that server still owned the processes, so they keep
+# pointing at the right process even if its PID is reused after it exits
+_inherited_pidfds: Dict[int, int] = {}
+_inherited_lock = threading.Lock()
+
+
+def adopt_pidfd(pid: int, pidfd: int):
+    """Use an inherited pidfd for pid from now on"""
+    with _inherited_lock:
+        previous = _inherited_pidfds.pop(pid, None)
+        _inherited_pidfds[pid] = pidfd
+    if previous is not None:
+        os.close(previous)
+
+
+def _open_pidfd(pid: int) -> Optional[int]:
+    """pidfd for a process (Linux 5.3+), readable once the process exits"""
+    with _inherited_lock:
+        inherited = _inherited_pidfds.get(pid)
+        if inherited is not None:
+            try:
+                return os.dup(inherited)
+            except OSError:
+                pass
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None
+
+
+def has_exited(pid: int) -> bool:
+    """Whether a process (our child or not) is gone; an inherited pidfd is trusted over the PID"""
+    with _inherited_lock:
+        inherited = _inherited_pidfds.get(pid)
+    if inherited is not None:
+        try:
+            return bool(select.select([inherited], [], [], 0)[0])
+        except (OSError, ValueError):
+            pass
+    return _exited(pid)
+
+
+def _exited(pid: int) -> bool:
+    """Whether a process is gone, reaping it if it is our child"""
+    try:
+        reaped, _ = os.waitpid(pid, os.WNOHANG)
+        if reaped == pid:
+            return True
+    except ChildProcessError:
+        pass
+    except OSError:
+        return True
+    try:
+        os.kill(pid, 0)
+        return False
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+
+
+def wait_for_exit(pid: int, stop_event: threading.Event, poll: float = 0.5) -> bool:
+    """
+    Block until a process exits (True) or stop_event is set (False). With a
+    pidfd the wake-up is immediate and an exited child is not reaped, so it
+    still looks alive to os.kill(pid, 0) until the caller calls reap()
+    """
+    pidfd = _open_pidfd(pid)
+    try:
+        while not stop_event.is_set():
+            if pidfd is not None:
+                if select.select([pidfd], [], [], poll)[0]:
+                    return True
+            elif _exited(pid):
+                return True
+            else:
+                stop_event.wait(POLL_INTERVAL)
+        return False
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def _forget_pidfd(pid: int):
+    with _inherited_lock:
+        inherited = _inherited_pidfds.pop(pid, None)
+    if inherited is not None:
+        os.close(inherited)
+
+
+def reap(pid: int):
+    """Collect the exit status of a child that has exited (no-op for other processes)"""
+    _exited(pid)
+    _forget_pidfd(pid)
+
+
+def _signal(target: Dict, sig: int) -> bool:
+    """Signal a target's process group (or just the pid); False if it no longer exists"""
+    pid = target["pid"]
+    try:
+        if target.get("group", True):
+            try:
+                os.killpg(os.getpgid(pid), sig)
+                return True
+            except (ProcessLookupError, PermissionError):
+                pass
+        os.kill(pid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+def _wait(pending: Dict[str, Dict], deadline: float, started: float, outcome: str):
+    """Wait until every pending target exited or the deadline passed; exited targets leave `pending`"""
+    ready = set()
+    while pending:
+        # A readable pidfd means the process exited, even if it is an unreaped child of someone else
+        for key in [key for key, target in pending.items()
+                    if _exited(target["pid"]) or target["pidfd"] in ready]:
+            target = pending.pop(key)
+            target["outcome"] = outcome
+            target["seconds"] = round(time.monotonic() - started, 3)
+
+        remaining = deadline - time.monotonic()
+        if not pending or remaining <= 0:
+            return
+
+        fds = [target["pidfd"] for target in pending.values() if target["pidfd"] is not None]
+        if len(fds) == len(pending):
+            # Sleep until any process exits (or the deadline)
+            ready = set(select.select(fds, [], [], remaining)[0])
+        else:
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+
+def teardown(targets: List[Dict], grace: float = TEARDOWN_GRACE_SECONDS) -> List[Dict]:
+    """
+    Stop every target in parallel.
+
+    targets: dicts with "key", "pid" and optionally "group" (signal the whole
+             process group, default True)
+    Returns one outcome per target:
+        {"key", "pid", "outcome", "seconds", "error"}
+        outcome is "terminated" (exited after SIGTERM), "killed" (needed SIGKILL),
+        "already_exited", or "failed" (still running or could not be signalled)
+    """
+    started = time.monotonic()
+    results = []
+    pending: Dict[str, Dict] = {}
+
+    for target in targets:
+        result = {"key": target["key"], "pid": target.get("pid"), "outcome": None, "seconds": 0.0, "error": None}
+        results.append(result)
+        if not target.get("pid"):
+            result["outcome"] = "already_exited"
+            continue
+
+        # Open the pidfd before signalling so a recycled PID can't be mistaken for ours
+        state = dict(result, group=target.get("group", True), pidfd=_open_pidfd(target["pid"]))
+        try:
+            if not _signal(state, signal.SIGTERM):
+                result["outcome"] = "already_exited"
+                continue
+        except OSError as e:
+            result["outcome"] = "failed"
+            result["error"] = str(e)
+            continue
+        pending[target["key"]] = state
+
+    states = dict(pending)
+    _wait(pending, started + grace, started, "terminated")
+
+    # Escalate only for the stragglers
+    for state in pending.values():
+        try:
+            _signal(state, signal.SIGKILL)
+        except OSError as e:
+            state["error"] = str(e)
+    _wait(pending, time.monotonic() + KILL_WAIT_SECONDS, started, "killed")
+    for state in pending.values():
+        state["outcome"] = "failed"
+        state["error"] = state["error"] or "still running after SIGKILL"
+
+    for state in states.values():
+        if state["pidfd"] is not None:
+            os.close(state["pidfd"])
+        if state["outcome"] != "failed":
+            _forget_pidfd(state["pid"])
+
+    for result in results:
+        state = states.get(result["key"])
+        if state:
+            result.update(outcome=state["outcome"], seconds=state.get("seconds", round(time.monotonic() - started, 3)),
+                          error=state["error"])
+    return results
+
+
+def summarize(outcomes: List[Dict]) -> str:
+    """Human-readable counts, e.g. "3 terminated, 1 killed" """
+    counts: Dict[str, int] = {}
+    for outcome in outcomes:
+        counts[outcome["outcome"]] = counts.get(outcome["outcome"], 0) + 1
+    return ", ".join(f"{count} {outcome.replace('_', ' ')}" for outcome, count in sorted(counts.items()))
@@ -11,18 +11,56 @@ import re
 import time
 import socket
 import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-
-from .config import STATE_FILE, TUNNEL_CONFIGS
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import (
+    STATE_FILE,
+    GATEWAY_MODE,
+    GATEWAY_HOST,
+    GATEWAY_MAX_CONNECTIONS,
+    GATEWAY_SERVICE_LIMITS,
+    IDLE_TIMEOUT_DEFAULT_MINUTES,
+    IDLE_TIMEOUT_MINUTES,
+    INSTANCE_CACHE_SECONDS,
+    INSTANCE_FAILOVER_ATTEMPTS,
+    QOS_LIMITS,
+    SSM_ESTABLISH_TIMEOUT,
+    STANDBY_RETRY_SECONDS,
+    STANDBY_FAILOVER_HISTORY,
+    TEARDOWN_GRACE_SECONDS
+)
+from . import cancellation
+from .cancellation import Cancelled
+from .catalog import catalog_store, Service, TunnelEnv
+from . import handoff
+from .connections import connection_accountant
+from .credentials import credential_cache
+from .history import history, PhaseTimer
+from .instances import instance_selector
+from .pgpool import PgPoolListener
+from .qos import QosShaper
+from .procstats import process_sampler, group_id, combine_usage
+from .selfmon import self_monitor
+from .relay import RelayListener, find_free_port, wait_for_port
+from .singleflight import single_flight
+from . import ssh_mux
+from .teardown import teardown, summarize, wait_for_exit, reap
 
 
 class TunnelState:
     """Manages tunnel state persistence"""
 
     def __init__(self):
+        # Guards state against concurrent updates from job threads
+        self._lock = threading.RLock()
         self.state = self.load_state()
+        # Set once a new server took over: the state file is its to write
+        self.detached = False
 
     def load_state(self) -> Dict:
         """Load tunnel state from file"""
@@ -36,27 +74,41 @@ class TunnelState:
 
     def save_state(self):
         """Save tunnel state to file"""
-        with open(STATE_FILE, 'w') as f:
-            json.dump(self.state, f, indent=2)
+        with self._lock:
+            if self.detached:
+                return
+            with open(STATE_FILE, 'w') as f:
+                json.dump(self.state, f, indent=2)
 
-    def add_tunnel(self, env: str, service: str, pid: int, local_port: str):
+    def add_tunnel(self, env: str, service: str, pid: int, local_port: str, **extra):
         """Add a tunnel to state"""
         key = f"{env}_{service}"
-        self.state[key] = {
-            "env": env,
-            "service": service,
-            "pid": pid,
-            "local_port": local_port,
-            "started_at": datetime.now().isoformat()
-        }
-        self.save_state()
+        with self._lock:
+            self.state[key] = {
+                "env": env,
+                "service": service,
+                "pid": pid,
+                "local_port": local_port,
+                "started_at": datetime.now().isoformat(),
+                **extra
+            }
+            self.save_state()
+
+    def update_tunnel(self, env: str, service: str, **fields):
+        """Update fields of a tracked tunnel"""
+        key = f"{env}_{service}"
+        with self._lock:
+            if key in self.state:
+                self.state[key] = {**self.state[key], **fields}
+                self.save_state()
 
     def remove_tunnel(self, env: str, service: str):
         """Remove a tunnel from state"""
         key = f"{env}_{service}"
-        if key in self.state:
-            del self.state[key]
-            self.save_state()
+        with self._lock:
+            if key in self.state:
+                del self.state[key]
+                self.save_state()
 
     def get_tunnel(self, env: str, service: str) -> Optional[Dict]:
         """Get tunnel info"""
@@ -64,8 +116,9 @@ class TunnelState:
         return self.state.get(key)
 
     def get_all_tunnels(self) -> Dict:
-        """Get all tunnels"""
-        return self.state
+        """Get all tunnels (a snapshot, safe to iterate while others update state)"""
+        with self._lock:
+            return dict(self.state)
 
     def is_tunnel_active(self, env: str, service: str) -> bool:
         """Check if tunnel is active and PID exists"""
@@ -84,6 +137,7 @@ class TunnelState:
         except (OSError, ProcessLookupError):
             # Process doesn't exist, remove from state
             self.remove_tunnel(env, service)
+            history.record_event("tunnel", env, service, "death", f"PID {pid} exited")
             return False
 
 
@@ -92,9 +146,188 @@ class TunnelManager:
 
     def __init__(self):
         self.state = TunnelState()
+        # Relay listeners in front of sessions that use a private port: key -> listener
+        self._fronts: Dict[str, RelayListener] = {}
+        # Hot standby bookkeeping per standby tunnel: key -> entry (see _standby_begin)
+        self._standby: Dict[str, Dict] = {}
+        # One lock per multiplexed env, held while its SSH master is found or started
+        self._mux_locks: Dict[str, threading.Lock] = {}
+        # PIDs of SSH masters whose last forward was stopped (being torn down)
+        self._retiring_masters = set()
+        # (profile, region, instance_tag) -> (instance_ids, looked up at)
+        self._instance_cache: Dict[Tuple[str, str, str], Tuple[List[str], float]] = {}
+        self._restore_fronts()
+
+    def _start_front(self, env: str, service: str, public_port: str, session_port: str,
+                     standby: bool = False, pool: bool = False, listen: bool = True) -> RelayListener:
+        """
+        Expose a session listening on a private port through a relay on its public port
+        standby: route new connections to the "primary" backend and only fall back to "standby"
+        pool: relay through a transaction-mode PostgreSQL pool instead of byte for byte
+        listen: False to adopt() an inherited listener instead of binding the port
+        """
+        key = f"{env}_{service}"
+        limits = self._qos_limits(env, service)
+        listener = (PgPoolListener if pool else RelayListener)(
+            key,
+            int(public_port),
+            bind_host=GATEWAY_HOST if GATEWAY_MODE else "127.0.0.1",
+            max_connections=GATEWAY_SERVICE_LIMITS.get(service, GATEWAY_MAX_CONNECTIONS) if GATEWAY_MODE else None,
+            ordered=standby,
+            qos=QosShaper(limits.get("rate"), limits.get("client_rate")) if limits is not None else None
+        )
+        listener.set_backends([("primary" if standby else "ssm", "127.0.0.1", int(session_port))])
+        if listen:
+            listener.start()
+        self._fronts[key] = listener
+        return listener
+
+    @staticmethod
+    def _qos_limits(env: str, service: str) -> Optional[Dict]:
+        """QoS settings of a service (None if it is not shaped)"""
+        return QOS_LIMITS.get(f"{env}_{service}", QOS_LIMITS.get(service))
+
+    def _stop_front(self, env: str, service: str):
+        """Close the relay in front of a session, if any"""
+        listener = self._fronts.pop(f"{env}_{service}", None)
+        if listener:
+            try:
+                listener.stop()
+            except Exception as e:
+                print(f"Error closing relay for {env}/{service}: {e}")
+
+    def _restore_fronts(self):
+        """
+        Re-create the relays of fronted sessions that outlived a previous server
+        process. After a handoff the relays (listening sockets and open
+        connections), standby counters and instance lookups are taken over as well
+        """
+        inherited = handoff.take("tunnels") or {}
+        now = time.monotonic()
+        for profile, region, instance_tag, instance_ids, age in inherited.get("instance_cache", []):
+            self._instance_cache[(profile, region, instance_tag)] = (instance_ids, now - age)
+
+        for key, tunnel in self.state.get_all_tunnels().items():
+            if not tunnel.get("session_port"):
+                continue
+            env, service = tunnel["env"], tunnel["service"]
+            if not self.state.is_tunnel_active(env, service):
+                continue
+            standby = "standby" in tunnel
+            relay = inherited.get("fronts", {}).get(key)
+            try:
+                front = self._start_front(env, service, tunnel["local_port"], tunnel["session_port"],
+                                          standby=standby, pool=tunnel.get("pool", False), listen=relay is None)
+                if standby:
+                    spare = tunnel["standby"]
+                    if spare and self._alive(spare["pid"]):
+                        front.add_backend("standby", "127.0.0.1", int(spare["session_port"]))
+                    else:
+                        self.state.update_tunnel(env, service, standby=None)
+                if relay is not None:
+                    front.adopt(relay, handoff.inherited)
+            except Exception as e:
+                self._fronts.pop(key, None)
+                print(f"Error restoring relay for {env}/{service}: {e}")
+                continue
+            if standby:
+                self._standby_begin(env, service)
+                counters = inherited.get("standby", {}).get(key)
+                if counters:
+                    entry = self._standby[key]
+                    entry["failover_count"] = counters["failover_count"]
+                    entry["failovers"].extend(counters["failovers"])
+                    entry["last_error"] = counters["last_error"]
+
+    def export_handoff(self, package: "handoff.Package") -> Dict:
+        """Relays, standby counters and instance lookups for the next server (see _restore_fronts)"""
+        now = time.monotonic()
+        for tunnel in self.state.get_all_tunnels().values():
+            package.add_pid(tunnel.get("pid"))
+            package.add_pid((tunnel.get("standby") or {}).get("pid"))
+        return {
+            "fronts": {key: listener.export(package.add_socket) for key, listener in self._fronts.items()},
+            "standby": {
+                key: {
+                    "failover_count": entry["failover_count"],
+                    "failovers": list(entry["failovers"]),
+                    "last_error": entry["last_error"]
+                }
+                for key, entry in self._standby.items()
+            },
+            "instance_cache": [
+                [*cache_key, instance_ids, now - looked_up]
+                for cache_key, (instance_ids, looked_up) in self._instance_cache.items()
+            ]
+        }
+
+    def release_handoff(self):
+        """The next server took over: stop watching sessions and relaying, and leave the state file alone"""
+        for entry in self._standby.values():
+            entry["stop"].set()
+        for listener in self._fronts.values():
+            try:
+                listener.release()
+            except Exception as e:
+                print(f"Error releasing relay {listener.name}: {e}")
+        self.state.detached = True
+
+    def connection_targets(self) -> List[Dict]:
+        """Tracked tunnels in the form expected by the connection accountant"""
+        targets = []
+        for key, tunnel in self.state.get_all_tunnels().items():
+            env, service = tunnel["env"], tunnel["service"]
+            targets.append({
+                "key": f"tunnel:{key}",
+                "kind": "tunnel",
+                "env": env,
+                "name": service,
+                "port": tunnel["local_port"],
+                "started_at": tunnel.get("started_at"),
+                "idle_timeout_minutes": IDLE_TIMEOUT_MINUTES.get(
+                    key, IDLE_TIMEOUT_MINUTES.get(service, IDLE_TIMEOUT_DEFAULT_MINUTES)
+                ),
+                "stop": lambda env=env, service=service: self.stop_tunnel(env, service),
+                "alive": lambda env=env, service=service: self.state.is_tunnel_active(env, service)
+            })
+        return targets
+
+    @staticmethod
+    def _alive(pid: Optional[int]) -> bool:
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+            return True
+        except (OSError, ProcessLookupError):
+            return False
+
+    def get_gateway_stats(self) -> List[Dict]:
+        """Relay statistics (connections per client) for every gateway service"""
+        return [listener.stats() for _, listener in sorted(self._fronts.items())]
+
+    def get_pool_stats(self) -> List[Dict]:
+        """Client and server connections, hit rate and wait times of every pooled db tunnel"""
+        return [
+            listener.stats() for _, listener in sorted(self._fronts.items())
+            if isinstance(listener, PgPoolListener)
+        ]
+
+    def get_qos_stats(self) -> List[Dict]:
+        """Limits and per-class connections, throughput and latency of every shaped tunnel"""
+        return [
+            {"name": key, **listener.qos.stats()} for key, listener in sorted(self._fronts.items())
+            if listener.qos
+        ]
+
+    def get_running_instances(self, profile: str, region: str, instance_tag: str,
+                              refresh: bool = False) -> List[str]:
+        """Running EC2 instance IDs with the tag (cached for INSTANCE_CACHE_SECONDS unless refresh)"""
+        cache_key = (profile, region, instance_tag)
+        cached = self._instance_cache.get(cache_key)
+        if cached and not refresh and time.monotonic() - cached[1] < INSTANCE_CACHE_SECONDS:
+            return cached[0]
 
-    def get_running_instance(self, profile: str, region: str, instance_tag: str) -> Optional[str]:
-        """Get running EC2 instance ID"""
         command = [
             "aws", "ec2", "describe-instances",
             "--filters", f"Name=instance-state-name,Values=running", f"Name=tag:Name,Values={instance_tag}",
@@ -105,53 +338,297 @@ class TunnelManager:
         ]
 
         try:
-            output = subprocess.check_output(command, text=True)
-            instance_ids = json.loads(output)
+            result = cancellation.run_command(command)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, command, result.stdout, result.stderr)
+            instance_ids = json.loads(result.stdout)
 
             # Flatten nested lists
             if instance_ids and isinstance(instance_ids[0], list):
                 flattened = [i for sublist in instance_ids for i in sublist]
             else:
                 flattened = instance_ids
-
-            return flattened[0] if flattened else None
         except Exception as e:
             print(f"Error getting instance: {e}")
-            return None
+            return []
+
+        if flattened:
+            self._instance_cache[cache_key] = (flattened, time.monotonic())
+        else:
+            self._instance_cache.pop(cache_key, None)
+        return flattened
+
+    def _tunnels_per_instance(self) -> Dict[str, int]:
+        """Tracked tunnels on each instance"""
+        counts: Dict[str, int] = {}
+        for tunnel in self.state.get_all_tunnels().values():
+            for session in (tunnel, tunnel.get("standby") or {}):
+                if session.get("instance_id"):
+                    counts[session["instance_id"]] = counts.get(session["instance_id"], 0) + 1
+        return counts
+
+    def get_instance_stats(self) -> Dict[str, Dict]:
+        """Set-up latency, failures and tunnel count per instance"""
+        return instance_selector.stats(self._tunnels_per_instance())
+
+    def prewarm(self) -> Dict[str, List[str]]:
+        """
+        Look up the instance of every env in parallel, which also refreshes
+        AWS credentials (SSO tokens) for each profile
+        Returns: {env: [instance_id, ...]}
+        """
+        def lookup(env_config: TunnelEnv) -> List[str]:
+            if not credential_cache.check_profile(env_config.profile, refresh=True)["valid"]:
+                return []
+            return self.get_running_instances(
+                env_config.profile, env_config.region, env_config.instance_tag, refresh=True
+            )
 
-    def start_tunnel(self, env: str, service: str) -> Tuple[bool, str, Optional[int]]:
+        tunnel_envs = catalog_store.current.tunnels
+        with ThreadPoolExecutor(max_workers=max(1, len(tunnel_envs))) as pool:
+            results = pool.map(lookup, tunnel_envs.values())
+            return dict(zip(tunnel_envs.keys(), results))
+
+    def start_tunnel(self, env: str, service: str, progress: Optional[Callable[[str], None]] = None) -> Tuple[bool, str, Optional[int]]:
         """
         Start an SSM tunnel
+        progress: optional callback receiving a message as each phase begins
         Returns: (success, message, pid)
         """
+        timer = PhaseTimer()
+        try:
+            success, message, pid = self._start_tunnel(env, service, progress or (lambda message: None), timer)
+        except Cancelled as e:
+            history.record_start("tunnel", env, service, False, str(e), timer)
+            raise
+        history.record_start("tunnel", env, service, success, message, timer)
+        return success, message, pid
+
+    def start_env(self, env: str, services: Optional[List[str]] = None) -> Tuple[bool, str, List[Dict]]:
+        """
+        Start every service of an env (or the given ones) that is not running yet,
+        in parallel. A multiplexed env opens its SSH session once and adds a
+        forward per service
+        Returns: (all started, message, [{"service", "success", "message", "pid"}])
+        """
+        env_config = catalog_store.current.tunnel_env(env)
+        if not env_config:
+            return False, f"Invalid environment: {env}", []
+
+        pending = [
+            service for service in (services or list(env_config.services))
+            if not self.state.is_tunnel_active(env, service)
+        ]
+        if not pending:
+            return True, f"All {env.upper()} tunnels are already running", []
+
+        def start(service: str) -> Dict:
+            success, message, pid = self.start_tunnel(env, service)
+            return {"service": service, "success": success, "message": message, "pid": pid}
+
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            results = list(pool.map(cancellation.bind(start), pending))
+        started = sum(1 for result in results if result["success"])
+        return started == len(results), f"Started {started} of {len(results)} {env.upper()} tunnel(s)", results
+
+    def _start_tunnel(self, env: str, service: str, report: Callable[[str], None],
+                      timer: PhaseTimer) -> Tuple[bool, str, Optional[int]]:
+        """Start an SSM tunnel, marking the end of each phase on timer"""
         # Check if already running
         if self.state.is_tunnel_active(env, service):
             return False, f"Tunnel already active for {env.upper()} {service}", None
 
-        # Get configuration
-        env_config = TUNNEL_CONFIGS.get(env)
+        # Get configuration (one catalog snapshot for the whole start)
+        catalog = catalog_store.current
+        env_config = catalog.tunnel_env(env)
         if not env_config:
             return False, f"Invalid environment: {env}", None
 
-        service_config = env_config["services"].get(service)
+        service_config = catalog.service(env, service)
         if not service_config:
             return False, f"Invalid service: {service}", None
 
-        # Get EC2 instance
-        instance_id = self.get_running_instance(
-            env_config["profile"],
-            env_config["region"],
-            env_config["instance_tag"]
+        # Fail fast when the profile's credentials are known to be expired
+        problem = credential_cache.known_problem(profile=env_config.profile)
+        if problem:
+            return False, problem, None
+
+        # A port held by another process would look like an instantly established session
+        if not GATEWAY_MODE and wait_for_port(int(service_config.local_port), 0):
+            return False, f"Port {service_config.local_port} is already in use", None
+
+        if env_config.transport == "ssh":
+            return self._start_forward(env, service, env_config, service_config, report, timer)
+
+        instance_ids, error = self._lookup_instances(env, env_config, report, timer)
+        if error:
+            return False, error, None
+
+        # Fastest / least loaded instance first, the next ones if a start fails
+        candidates = instance_selector.rank(instance_ids, self._tunnels_per_instance())
+        errors = []
+        for attempt, instance_id in enumerate(candidates[:INSTANCE_FAILOVER_ATTEMPTS]):
+            if attempt:
+                report(f"Failing over to {instance_id}")
+            instance_selector.begin(instance_id)
+            try:
+                success, message, pid, failover = self._start_session(
+                    env, service, env_config, service_config, instance_id, report, timer
+                )
+            finally:
+                instance_selector.end(instance_id)
+            if success or not failover:
+                return success, message, pid
+            errors.append(message if len(candidates) == 1 else f"{instance_id}: {message}")
+            timer.mark("failover")
+
+        # Every candidate failed; the instances may be gone, look them up again next time
+        self._instance_cache.pop((env_config.profile, env_config.region, env_config.instance_tag), None)
+        return False, "\n".join(errors), None
+
+    def _lookup_instances(self, env: str, env_config: TunnelEnv, report: Callable[[str], None],
+                          timer: PhaseTimer) -> Tuple[List[str], Optional[str]]:
+        """
+        Running instances of an env
+        Returns: (instance_ids, error message if there are none)
+        """
+        report(f"Looking up running instances {env_config.instance_tag}")
+        instance_ids = self.get_running_instances(
+            env_config.profile,
+            env_config.region,
+            env_config.instance_tag
         )
+        timer.mark("instance_lookup")
+
+        if not instance_ids:
+            # Tell expired credentials apart from a missing instance
+            credentials = credential_cache.check_profile(env_config.profile, refresh=True)
+            if not credentials["valid"]:
+                return [], credentials["message"]
+            return [], f"No running instance found for {env.upper()}"
+        return instance_ids, None
+
+    # ------------------------------------------------------------------
+    # Multiplexed envs (one SSH-over-SSM session per env)
+    # ------------------------------------------------------------------
+
+    def _running_master(self, env: str) -> Optional[Dict]:
+        """The env's SSH master if a tracked tunnel uses one that is still running"""
+        for tunnel in self.state.get_all_tunnels().values():
+            if (tunnel["env"] == env and tunnel.get("transport") == "ssh"
+                    and tunnel["pid"] not in self._retiring_masters and self._alive(tunnel["pid"])):
+                return {
+                    "pid": tunnel["pid"],
+                    "control_path": tunnel["control_path"],
+                    "instance_id": tunnel.get("instance_id")
+                }
+        return None
 
-        if not instance_id:
-            return False, f"No running instance found for {env.upper()}", None
-
+    def _start_master(self, env: str, env_config: TunnelEnv, instance_ids: List[str],
+                      report: Callable[[str], None], timer: PhaseTimer) -> Tuple[Optional[Dict], str]:
+        """
+        Start an env's SSH master on the best instance, failing over like SSM sessions
+        Returns: (master, error message)
+        """
+        candidates = instance_selector.rank(instance_ids, self._tunnels_per_instance())
+        errors = []
+        for attempt, instance_id in enumerate(candidates[:INSTANCE_FAILOVER_ATTEMPTS]):
+            if attempt:
+                report(f"Failing over to {instance_id}")
+            report(f"Starting SSH session via {instance_id}")
+            path = ssh_mux.control_path(env)
+            instance_selector.begin(instance_id)
+            spawned = time.monotonic()
+            try:
+                process, error = ssh_mux.start_master(env_config, instance_id, path)
+            finally:
+                instance_selector.end(instance_id)
+            if process:
+                instance_selector.record_success(instance_id, (time.monotonic() - spawned) * 1000)
+                self._retiring_masters.discard(process.pid)
+                self_monitor.track(process)
+                timer.mark("establish")
+                return {"pid": process.pid, "control_path": path, "instance_id": instance_id}, ""
+            instance_selector.record_failure(instance_id, error)
+            errors.append(error)
+            timer.mark("failover")
+
+        self._instance_cache.pop((env_config.profile, env_config.region, env_config.instance_tag), None)
+        return None, "\n".join(errors)
+
+    def _start_forward(self, env: str, service: str, env_config: TunnelEnv, service_config: Service,
+                       report: Callable[[str], None], timer: PhaseTimer) -> Tuple[bool, str, Optional[int]]:
+        """Start a tunnel of a multiplexed env: a forward on the env's SSH master, started if needed"""
+        with self._mux_locks.setdefault(env, threading.Lock()):
+            master = self._running_master(env)
+            started = master is None
+            if started:
+                instance_ids, error = self._lookup_instances(env, env_config, report, timer)
+                if error:
+                    return False, error, None
+                master, error = self._start_master(env, env_config, instance_ids, report, timer)
+                if not master:
+                    return False, error, None
+
+            # In gateway mode (or when pooled or shaped) the forward listens on a private port behind a relay
+            fronted = GATEWAY_MODE or service_config.pool or self._qos_limits(env, service) is not None
+            session_port = str(find_free_port()) if fronted else service_config.local_port
+            spec = ssh_mux.forward_spec(session_port, service_config.host, service_config.remote_port)
+
+            # Until the tunnel is saved, a cancelled start closes what it opened
+            with cancellation.rollback() as undo:
+                if started:
+                    undo.add(lambda: teardown([{"key": f"{env}_ssh", "pid": master["pid"]}]))
+                report(f"Adding forward {spec} to the {env.upper()} SSH session")
+                success, error = ssh_mux.forward(master["control_path"], spec)
+                if success and not started:
+                    undo.add(lambda: ssh_mux.cancel(master["control_path"], spec))
+                if success and fronted:
+                    try:
+                        self._start_front(env, service, service_config.local_port, session_port,
+                                          pool=service_config.pool)
+                        undo.add(lambda: self._stop_front(env, service))
+                    except Exception as e:
+                        ssh_mux.cancel(master["control_path"], spec)
+                        host = GATEWAY_HOST if GATEWAY_MODE else "127.0.0.1"
+                        success, error = False, f"could not bind {host}:{service_config.local_port}: {e}"
+                if not success:
+                    if started:
+                        teardown([{"key": f"{env}_ssh", "pid": master["pid"]}])
+                    return False, f"Error starting tunnel: {error}", None
+                cancellation.check()
+            timer.mark("forward")
+
+            extra = {
+                "instance_id": master["instance_id"],
+                "transport": "ssh",
+                "control_path": master["control_path"],
+                "forward": spec
+            }
+            if fronted:
+                extra.update(mode="gateway" if GATEWAY_MODE else "pool" if service_config.pool else "qos",
+                             session_port=session_port)
+            if service_config.pool:
+                extra["pool"] = True
+            self.state.add_tunnel(env, service, master["pid"], service_config.local_port, **extra)
+
+        return True, (
+            f"Tunnel started successfully! PID: {master['pid']}, Port: {service_config.local_port}, "
+            f"Instance: {master['instance_id']} ({'new' if started else 'shared'} {env.upper()} SSH session)"
+        ), master["pid"]
+
+    def _spawn_session(self, env_config: TunnelEnv, service_config: Service, instance_id: str,
+                       session_port: str, report: Callable[[str], None],
+                       timer: Optional[PhaseTimer] = None) -> Tuple[Optional[subprocess.Popen], bool, str]:
+        """
+        Run an SSM session through one instance, listening on session_port
+        Returns: (process or None if it died, whether the port is listening, error message)
+        """
         # Build SSM command
         parameters = json.dumps({
-            "portNumber": [service_config["remote_port"]],
-            "localPortNumber": [service_config["local_port"]],
-            "host": [service_config["host"]]
+            "portNumber": [service_config.remote_port],
+            "localPortNumber": [session_port],
+            "host": [service_config.host]
         })
 
         command = [
@@ -159,109 +636,413 @@ class TunnelManager:
             "--target", instance_id,
             "--document-name", "AWS-StartPortForwardingSessionToRemoteHost",
             "--parameters", parameters,
-            "--profile", env_config["profile"],
-            "--region", env_config["region"]
+            "--profile", env_config.profile,
+            "--region", env_config.region
         ]
 
-        # Start tunnel in background
-        log_file = tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.log')
-        err_file = tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.log')
-
-        try:
+        # Start tunnel in background. The session keeps writing to the files, so they
+        # are anonymous: closing our handles leaves the child's, and nothing on disk
+        with tempfile.TemporaryFile(mode='w+') as log_file, tempfile.TemporaryFile(mode='w+') as err_file:
+            report(f"Starting SSM session via {instance_id}")
+            spawned = time.monotonic()
             process = subprocess.Popen(
                 command,
                 stdout=log_file,
                 stderr=err_file,
                 start_new_session=True
             )
-
-            # Wait for tunnel to establish
-            time.sleep(3)
+            if timer:
+                timer.mark("spawn")
+
+            # Wait for the session to listen (that time is the instance's set-up latency);
+            # a start cancelled meanwhile kills the session
+            report("Waiting for tunnel to establish")
+            deadline = spawned + SSM_ESTABLISH_TIMEOUT
+            port_open = False
+            with cancellation.adopted(process):
+                while process.poll() is None and time.monotonic() < deadline:
+                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                        port_open = sock.connect_ex(('127.0.0.1', int(session_port))) == 0
+                    if port_open:
+                        break
+                    cancellation.sleep(0.05)
+            setup_ms = (time.monotonic() - spawned) * 1000
 
             # Check if process is still alive
             poll_result = process.poll()
             if poll_result is not None:
-                # Process died
                 err_file.seek(0)
                 error_output = err_file.read()
                 log_file.seek(0)
                 log_output = log_file.read()
 
-                # Cleanup temp files
-                try:
-                    os.unlink(log_file.name)
-                    os.unlink(err_file.name)
-                except:
-                    pass
-
                 error_msg = f"Tunnel process died immediately (exit code: {poll_result})"
                 if error_output:
                     error_msg += f"\nError: {error_output[:500]}"
                 if log_output:
                     error_msg += f"\nLog: {log_output[:500]}"
 
-                return False, error_msg, None
+                instance_selector.record_failure(instance_id, error_msg)
+                return None, False, error_msg
 
-            # Check if port is listening
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            port_open = sock.connect_ex(('127.0.0.1', int(service_config["local_port"]))) == 0
-            sock.close()
+            # A session that is not listening yet still counts with the whole wait
+            instance_selector.record_success(instance_id, setup_ms)
+            return process, port_open, ""
 
-            # Save tunnel state
-            self.state.add_tunnel(env, service, process.pid, service_config["local_port"])
+    def _start_session(self, env: str, service: str, env_config: TunnelEnv, service_config: Service,
+                       instance_id: str, report: Callable[[str], None],
+                       timer: PhaseTimer) -> Tuple[bool, str, Optional[int], bool]:
+        """
+        Start the SSM session for a tunnel through one instance
+        Returns: (success, message, pid, whether another instance may work)
+        """
+        # Gateway, standby, pooled and shaped sessions listen on a private port behind a relay on the service port
+        fronted = (GATEWAY_MODE or service_config.standby or service_config.pool
+                   or self._qos_limits(env, service) is not None)
+        session_port = str(find_free_port()) if fronted else service_config.local_port
 
-            # Cleanup temp files
-            try:
-                os.unlink(log_file.name)
-                os.unlink(err_file.name)
-            except:
-                pass
+        try:
+            process, port_open, error_msg = self._spawn_session(
+                env_config, service_config, instance_id, session_port, report, timer
+            )
+            if process is None:
+                return False, error_msg, None, True
+            if not service_config.standby:
+                # Standby sessions are reaped by their watcher
+                self_monitor.track(process)
+            timer.mark("establish")
+
+            extra = {"instance_id": instance_id}
+            if fronted:
+                try:
+                    self._start_front(env, service, service_config.local_port, session_port,
+                                      standby=service_config.standby, pool=service_config.pool)
+                except Exception as e:
+                    os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+                    self_monitor.track(process)
+                    host = GATEWAY_HOST if GATEWAY_MODE else "127.0.0.1"
+                    raise RuntimeError(f"could not bind {host}:{service_config.local_port}: {e}")
+                mode = (
+                    "gateway" if GATEWAY_MODE else "standby" if service_config.standby
+                    else "pool" if service_config.pool else "qos"
+                )
+                extra.update(mode=mode, session_port=session_port)
+                timer.mark("gateway" if GATEWAY_MODE else "front")
+            if service_config.standby:
+                extra["standby"] = None
+            if service_config.pool:
+                extra["pool"] = True
+
+            # A start cancelled while the session came up is rolled back instead of saved
+            with cancellation.rollback() as undo:
+                undo.add(lambda: teardown([{"key": f"{env}_{service}", "pid": process.pid}]))
+                if fronted:
+                    undo.add(lambda: self._stop_front(env, service))
+                cancellation.check()
+
+            # Save tunnel state
+            self.state.add_tunnel(env, service, process.pid, service_config.local_port, **extra)
+            if service_config.standby:
+                self._standby_begin(env, service)
 
-            success_msg = f"Tunnel started successfully! PID: {process.pid}, Port: {service_config['local_port']}"
+            success_msg = (
+                f"Tunnel started successfully! PID: {process.pid}, Port: {service_config.local_port}, "
+                f"Instance: {instance_id}"
+            )
             if not port_open:
                 success_msg += " (Port not yet listening, may take a moment)"
+            if service_config.standby:
+                success_msg += " (standby session starting in the background)"
 
-            return True, success_msg, process.pid
+            return True, success_msg, process.pid, False
 
         except Exception as e:
-            # Cleanup temp files
+            return False, f"Error starting tunnel: {e}", None, False
+
+    # ------------------------------------------------------------------
+    # Hot standby
+    # ------------------------------------------------------------------
+
+    def _standby_begin(self, env: str, service: str):
+        """Watch the sessions of a standby tunnel and build its standby if it has none"""
+        key = f"{env}_{service}"
+        entry = {
+            "env": env,
+            "service": service,
+            # Set when the tunnel is stopped, so exits after that are not failovers
+            "stop": threading.Event(),
+            "lock": threading.Lock(),
+            "building": False,
+            "failover_count": 0,
+            "failovers": deque(maxlen=STANDBY_FAILOVER_HISTORY),
+            "last_error": None
+        }
+        self._standby[key] = entry
+
+        tunnel = self.state.get_tunnel(env, service)
+        self._watch_session(entry, tunnel["pid"])
+        if tunnel.get("standby"):
+            self._watch_session(entry, tunnel["standby"]["pid"])
+        else:
+            self._build_standby(entry)
+
+    def _standby_end(self, env: str, service: str):
+        """Stop watching a standby tunnel (before its sessions are stopped)"""
+        entry = self._standby.pop(f"{env}_{service}", None)
+        if entry:
+            entry["stop"].set()
+
+    def _watch_session(self, entry: Dict, pid: int):
+        """Call _session_exited as soon as pid exits"""
+        def watch():
+            if not wait_for_exit(pid, entry["stop"]):
+                return
             try:
-                os.unlink(log_file.name)
-                os.unlink(err_file.name)
-            except:
-                pass
+                self._session_exited(entry, pid)
+            except Exception as e:
+                print(f"Error handling exit of PID {pid} for {entry['env']}/{entry['service']}: {e}")
+            finally:
+                reap(pid)
+
+        threading.Thread(
+            target=watch, name=f"standby-watch-{entry['env']}_{entry['service']}", daemon=True
+        ).start()
+
+    def _session_exited(self, entry: Dict, pid: int):
+        """Promote the standby when the primary exits, or replace a standby that exited"""
+        detected = time.perf_counter()
+        env, service = entry["env"], entry["service"]
+        key = f"{env}_{service}"
+
+        with entry["lock"]:
+            if entry["stop"].is_set():
+                return
+            tunnel = self.state.get_tunnel(env, service)
+            spare = tunnel.get("standby") if tunnel else None
+            front = self._fronts.get(key)
+
+            if tunnel and tunnel["pid"] == pid and spare and front and self._alive(spare["pid"]):
+                # New connections go to the standby from here on; open ones die with the primary
+                front.set_backends([("primary", "127.0.0.1", int(spare["session_port"]))])
+                failover_ms = (time.perf_counter() - detected) * 1000
+                self.state.update_tunnel(
+                    env, service,
+                    pid=spare["pid"],
+                    session_port=spare["session_port"],
+                    instance_id=spare["instance_id"],
+                    standby=None
+                )
+                entry["failover_count"] += 1
+                entry["failovers"].append({
+                    "at": datetime.now().isoformat(),
+                    "failover_ms": round(failover_ms, 3),
+                    "from_pid": pid,
+                    "to_pid": spare["pid"],
+                    "instance_id": spare["instance_id"]
+                })
+                history.record_event(
+                    "tunnel", env, service, "failover",
+                    f"PID {pid} exited, standby PID {spare['pid']} took over in {failover_ms:.3f} ms"
+                )
+            elif tunnel and spare and spare["pid"] == pid:
+                if front:
+                    front.remove_backend("standby")
+                self.state.update_tunnel(env, service, standby=None)
+                history.record_event("tunnel", env, service, "standby_lost", f"Standby PID {pid} exited")
+            elif not tunnel or tunnel["pid"] == pid:
+                # The primary is gone with no standby to take over: the tunnel is down
+                entry["stop"].set()
+                self._standby.pop(key, None)
+                self._stop_front(env, service)
+                if tunnel:
+                    self.state.remove_tunnel(env, service)
+                    history.record_event("tunnel", env, service, "death", f"PID {pid} exited, no standby ready")
+                return
+            else:
+                return
 
-            return False, f"Error starting tunnel: {e}", None
+        self._build_standby(entry)
 
-    def stop_tunnel(self, env: str, service: str) -> Tuple[bool, str]:
+    def _build_standby(self, entry: Dict):
+        """Start a standby session in the background, retrying until it works or the tunnel stops"""
+        with entry["lock"]:
+            if entry["building"] or entry["stop"].is_set():
+                return
+            entry["building"] = True
+
+        def build():
+            while True:
+                try:
+                    error = self._start_standby(entry)
+                except Exception as e:
+                    error = str(e)
+                if error is None:
+                    return
+                entry["last_error"] = error
+                print(f"Error starting standby for {entry['env']}/{entry['service']}: {error}")
+                if entry["stop"].wait(STANDBY_RETRY_SECONDS):
+                    break
+            entry["building"] = False
+
+        threading.Thread(
+            target=build, name=f"standby-build-{entry['env']}_{entry['service']}", daemon=True
+        ).start()
+
+    def _start_standby(self, entry: Dict) -> Optional[str]:
         """
-        Stop an SSM tunnel
-        Returns: (success, message)
+        Start one standby session and add it behind the tunnel's front
+        Returns: None when done (installed, or the tunnel is gone), else an error message
         """
+        env, service = entry["env"], entry["service"]
+        key = f"{env}_{service}"
+        catalog = catalog_store.current
+        env_config = catalog.tunnel_env(env)
+        service_config = catalog.service(env, service)
         tunnel = self.state.get_tunnel(env, service)
+        if not env_config or not service_config or not tunnel or entry["stop"].is_set():
+            entry["building"] = False
+            return None
 
-        if not tunnel:
-            return False, f"No tunnel found for {env.upper()} {service}"
+        instance_ids = self.get_running_instances(env_config.profile, env_config.region, env_config.instance_tag)
+        if not instance_ids:
+            return f"No running instance found for {env.upper()}"
 
-        pid = tunnel.get("pid")
+        # Another instance than the primary's, when there is one, so losing a bastion can't take both
+        candidates = instance_selector.rank(instance_ids, self._tunnels_per_instance())
+        candidates.sort(key=lambda instance_id: instance_id == tunnel.get("instance_id"))
 
-        try:
-            # Kill the process group (parent + children)
+        errors = []
+        for instance_id in candidates[:INSTANCE_FAILOVER_ATTEMPTS]:
+            session_port = str(find_free_port())
+            instance_selector.begin(instance_id)
             try:
-                os.killpg(os.getpgid(pid), signal.SIGTERM)
-                msg = f"Tunnel stopped (PID: {pid} + children)"
-            except (OSError, ProcessLookupError):
-                # Fallback: try killing just the PID
-                os.kill(pid, signal.SIGTERM)
-                msg = f"Tunnel stopped (PID: {pid})"
+                process, port_open, error_msg = self._spawn_session(
+                    env_config, service_config, instance_id, session_port, lambda message: None
+                )
+            finally:
+                instance_selector.end(instance_id)
+            if process is None:
+                errors.append(f"{instance_id}: {error_msg}")
+                continue
+            # A standby is only useful once it accepts connections
+            if not port_open and not wait_for_port(int(session_port), SSM_ESTABLISH_TIMEOUT):
+                teardown([{"key": f"{key}_standby", "pid": process.pid}])
+                errors.append(f"{instance_id}: session did not listen on port {session_port}")
+                continue
+
+            with entry["lock"]:
+                tunnel = self.state.get_tunnel(env, service)
+                front = self._fronts.get(key)
+                installed = not entry["stop"].is_set() and tunnel is not None and front is not None
+                if installed:
+                    self.state.update_tunnel(env, service, standby={
+                        "pid": process.pid,
+                        "session_port": session_port,
+                        "instance_id": instance_id,
+                        "started_at": datetime.now().isoformat()
+                    })
+                    front.set_backends([
+                        ("primary", "127.0.0.1", int(tunnel["session_port"])),
+                        ("standby", "127.0.0.1", int(session_port))
+                    ])
+                    entry["last_error"] = None
+                    self._watch_session(entry, process.pid)
+                entry["building"] = False
+
+            if installed:
+                history.record_event("tunnel", env, service, "standby", f"PID {process.pid} via {instance_id}")
+            else:
+                teardown([{"key": f"{key}_standby", "pid": process.pid}])
+            return None
 
-            # Remove from state
-            self.state.remove_tunnel(env, service)
-            return True, msg
+        return "\n".join(errors)
+
+    def _standby_stats(self, key: str, tunnel: Dict) -> Dict:
+        """Standby session and failover times of one standby tunnel"""
+        entry = self._standby.get(key) or {}
+        spare = tunnel.get("standby")
+        failovers = list(entry.get("failovers", []))
+        times = [failover["failover_ms"] for failover in failovers]
+        return {
+            "state": "ready" if spare else ("building" if entry.get("building") else "none"),
+            "pid": spare["pid"] if spare else None,
+            "instance_id": spare["instance_id"] if spare else None,
+            "failovers": entry.get("failover_count", 0),
+            "last_failover_at": failovers[-1]["at"] if failovers else None,
+            "last_failover_ms": times[-1] if times else None,
+            "avg_failover_ms": round(sum(times) / len(times), 3) if times else None,
+            "max_failover_ms": max(times) if times else None,
+            "last_error": entry.get("last_error")
+        }
 
-        except (OSError, ProcessLookupError):
-            self.state.remove_tunnel(env, service)
+    def get_standby_stats(self) -> List[Dict]:
+        """Standby state and recent failovers of every standby tunnel"""
+        stats = []
+        for key, tunnel in sorted(self.state.get_all_tunnels().items()):
+            if "standby" not in tunnel:
+                continue
+            entry = self._standby.get(key) or {}
+            stats.append({
+                "id": key,
+                "env": tunnel["env"],
+                "service": tunnel["service"],
+                "primary_pid": tunnel["pid"],
+                "primary_instance_id": tunnel.get("instance_id"),
+                **self._standby_stats(key, tunnel),
+                "recent_failovers": list(entry.get("failovers", []))
+            })
+        return stats
+
+    def _release_tunnel(self, env: str, service: str, tunnel: Dict) -> List[Dict]:
+        """
+        Stop the front, forget the tunnel and return its teardown targets (the
+        primary first). A multiplexed env's SSH master is only returned with its
+        last forward; before that the forward is just cancelled
+        """
+        self._standby_end(env, service)
+        self._stop_front(env, service)
+        history.record_event("tunnel", env, service, "stop")
+        if tunnel.get("transport") == "ssh":
+            with self._mux_locks.setdefault(env, threading.Lock()):
+                self.state.remove_tunnel(env, service)
+                pid = tunnel["pid"]
+                if any(other["pid"] == pid for other in self.state.get_all_tunnels().values()):
+                    ssh_mux.cancel(tunnel["control_path"], tunnel["forward"])
+                    return []
+                self._retiring_masters.add(pid)
+            return [{"key": f"{env}_ssh", "pid": pid}]
+
+        self.state.remove_tunnel(env, service)
+        targets = [{"key": f"{env}_{service}", "pid": tunnel.get("pid")}]
+        if tunnel.get("standby"):
+            targets.append({"key": f"{env}_{service}_standby", "pid": tunnel["standby"]["pid"]})
+        return targets
+
+    def stop_tunnel(self, env: str, service: str) -> Tuple[bool, str]:
+        """
+        Stop an SSM tunnel and wait for its process group to exit
+        Returns: (success, message)
+        """
+        tunnel = self.state.get_tunnel(env, service)
+
+        if not tunnel:
+            return False, f"No tunnel found for {env.upper()} {service}"
+
+        targets = self._release_tunnel(env, service, tunnel)
+        if not targets:
+            return True, (
+                f"Tunnel stopped (forward removed; the {env.upper()} SSH session, "
+                f"PID {tunnel['pid']}, still carries other services)"
+            )
+        outcome = teardown(targets)[0]
+        pid = outcome["pid"]
+        if outcome["outcome"] == "terminated":
+            return True, f"Tunnel stopped (PID: {pid} + children)"
+        if outcome["outcome"] == "killed":
+            return True, f"Tunnel killed after {TEARDOWN_GRACE_SECONDS}s grace period (PID: {pid} + children)"
+        if outcome["outcome"] == "already_exited":
             return False, f"Process {pid} not found (already stopped?)"
+        return False, f"Could not stop PID {pid}: {outcome['error']}"
 
     def find_orphaned_tunnels(self) -> List[int]:
         """Find orphaned session-manager-plugin processes not tracked in state"""
@@ -270,7 +1051,7 @@ class TunnelManager:
         try:
             # Find all session-manager-plugin processes with their parent PIDs
             result = subprocess.run(
-                ["ps", "-eo", "pid,ppid,command"],
+                ["ps", "-eo", "pid,ppid,pgid,command"],
                 capture_output=True,
                 text=True,
                 check=True
@@ -278,21 +1059,24 @@ class TunnelManager:
 
             # Get all tracked parent PIDs
             tracked_pids = set(
-                tunnel.get("pid")
+                session.get("pid")
                 for tunnel in self.state.get_all_tunnels().values()
-                if tunnel.get("pid")
+                for session in (tunnel, tunnel.get("standby") or {})
+                if session.get("pid")
             )
 
             for line in result.stdout.split('\n'):
                 if 'session-manager-plugin' in line and 'grep' not in line:
-                    parts = line.split(None, 2)
-                    if len(parts) >= 2:
+                    parts = line.split(None, 3)
+                    if len(parts) >= 3:
                         try:
                             pid = int(parts[0])
                             ppid = int(parts[1])
+                            pgid = int(parts[2])
 
-                            # If parent is NOT tracked, this IS orphaned
-                            if ppid not in tracked_pids:
+                            # If neither the parent nor the process group (an SSH master's
+                            # ProxyCommand) is tracked, this IS orphaned
+                            if ppid not in tracked_pids and pgid not in tracked_pids:
                                 orphaned_pids.append(pid)
                         except (ValueError, IndexError):
                             continue
@@ -322,9 +1106,21 @@ class TunnelManager:
                     port = port_match.group(1)
                     host = host_match.group(1) if host_match else "unknown"
 
-                    # Identify environment from host
+                    # Identify the service from its local port and host (configured ones first).
+                    # Envs reuse local ports and may share hosts, so either alone can be ambiguous
                     env = "UNKNOWN"
-                    if "dev" in host.lower():
+                    service = None
+                    catalog = catalog_store.current
+                    on_port = catalog.by_local_port.get(port, ())
+                    matches = [s for s in on_port if s.host == host]
+                    if not matches and host_match is None and len(on_port) == 1:
+                        matches = list(on_port)
+                    known = matches or catalog.by_host.get(host)
+                    if known and len(known) == 1:
+                        service = known[0].key
+                    if known:
+                        env = known[0].env.upper()
+                    elif "dev" in host.lower():
                         env = "DEV"
                     elif "pre" in host.lower():
                         env = "PRE"
@@ -335,27 +1131,36 @@ class TunnelManager:
                         "pid": pid,
                         "port": port,
                         "host": host,
-                        "env": env
+                        "env": env,
+                        "service": service
                     }
         except Exception:
             pass
 
         return None
 
+    @single_flight
     def get_all_tunnels(self) -> Dict:
         """
         Get all tunnels (tracked + orphaned)
+        Concurrent callers share one scan and receive the same result
         Returns: {"tracked": [...], "orphaned": [...]}
         """
         tracked = []
         tracked_tunnels = self.state.get_all_tunnels()
+        catalog = catalog_store.current
+
+        # One batched /proc pass for every tracked process group (aws CLI + session-manager-plugin)
+        groups = {key: group_id(tunnel.get("pid")) for key, tunnel in tracked_tunnels.items()}
+        usage = process_sampler.sample(groups.values())
 
         # Process tracked tunnels
         for key, tunnel in tracked_tunnels.items():
             if self.state.is_tunnel_active(tunnel["env"], tunnel["service"]):
                 env = tunnel["env"]
                 service = tunnel["service"]
-                service_config = TUNNEL_CONFIGS[env]["services"][service]
+                # May be gone from the config until the reload restarts or stops the tunnel
+                service_config = catalog.service(env, service)
 
                 # Calculate uptime
                 uptime_seconds = None
@@ -370,14 +1175,18 @@ class TunnelManager:
                     "id": key,
                     "env": env,
                     "service": service,
-                    "name": service_config["name"],
+                    "name": service_config.name if service_config else service,
                     "status": "running",
                     "pid": tunnel["pid"],
-                    "local_port": service_config["local_port"],
-                    "remote_port": service_config["remote_port"],
-                    "host": service_config["host"],
+                    "local_port": tunnel["local_port"],
+                    "remote_port": service_config.remote_port if service_config else "",
+                    "host": service_config.host if service_config else "",
                     "started_at": tunnel.get("started_at"),
-                    "uptime_seconds": uptime_seconds
+                    "uptime_seconds": uptime_seconds,
+                    "gateway": self._fronts[key].stats() if key in self._fronts else None,
+                    "standby": self._standby_stats(key, tunnel) if "standby" in tunnel else None,
+                    "resources": usage.get(groups[key]),
+                    **connection_accountant.usage(f"tunnel:{key}")
                 })
 
         # Process orphaned tunnels
@@ -390,40 +1199,59 @@ class TunnelManager:
             else:
                 orphaned.append({"pid": pid, "port": None, "env": None, "host": None})
 
-        return {"tracked": tracked, "orphaned": orphaned}
+        # Tunnels of a multiplexed env share one process group; count it once
+        totals = combine_usage(usage.get(group) for group in {groups[t["id"]] for t in tracked})
+        return {"tracked": tracked, "orphaned": orphaned, "totals": totals}
 
-    def stop_all_tunnels(self) -> Tuple[int, str]:
+    def stop_all_tunnels(self) -> Tuple[int, str, List[Dict]]:
         """
-        Stop all active tunnels (including orphaned processes)
-        Returns: (stopped_count, message)
+        Stop all active tunnels (including orphaned processes) in parallel
+        Returns: (stopped_count, message, per-process teardown outcomes)
         """
-        stopped = 0
-        messages = []
+        # Look for orphans while the tracked sessions are still in state
+        orphaned_pids = self.find_orphaned_tunnels()
+        targets = [
+            target
+            for tunnel in list(self.state.get_all_tunnels().values())
+            for target in self._release_tunnel(tunnel["env"], tunnel["service"], tunnel)
+        ]
+        targets.extend({"key": f"orphaned_{pid}", "pid": pid} for pid in orphaned_pids)
 
-        # Stop tracked tunnels
-        tunnels = self.state.get_all_tunnels()
-        for key, tunnel in list(tunnels.items()):
-            success, msg = self.stop_tunnel(tunnel["env"], tunnel["service"])
-            if success:
-                stopped += 1
-                messages.append(msg)
+        outcomes = teardown(targets)
+        stopped = sum(1 for outcome in outcomes if outcome["outcome"] in ("terminated", "killed"))
 
-        # Stop orphaned tunnels
-        orphaned_pids = self.find_orphaned_tunnels()
+        messages = []
         if orphaned_pids:
             messages.append(f"Found {len(orphaned_pids)} orphaned tunnel(s)")
-            for pid in orphaned_pids:
-                try:
-                    # Try to kill process group first
-                    try:
-                        os.killpg(os.getpgid(pid), signal.SIGTERM)
-                        messages.append(f"Stopped orphaned tunnel (PID: {pid} + children)")
-                    except (OSError, ProcessLookupError):
-                        # Fallback to single process
-                        os.kill(pid, signal.SIGTERM)
-                        messages.append(f"Stopped orphaned tunnel (PID: {pid})")
-                    stopped += 1
-                except (OSError, ProcessLookupError):
-                    messages.append(f"Could not stop PID {pid} (already stopped?)")
-
-        return stopped, "; ".join(messages)
+        if outcomes:
+            messages.append(f"Stopped {stopped} of {len(outcomes)} process group(s): {summarize(outcomes)}")
+        for outcome in outcomes:
+            if outcome["outcome"] == "failed":
+                messages.append(f"Could not stop PID {outcome['pid']}: {outcome['error']}")
+
+        return stopped, "; ".join(messages), outcomes
+
+    def apply_catalog_changes(self, changes: Dict) -> List[Dict]:
+        """
+        Restart running tunnels whose definition changed in the config file and
+        stop those that were removed from it; every other session is left alone
+        Returns: [{"env", "service", "action", "success", "message"}]
+        """
+        def apply(target: Tuple[str, str, str]) -> Dict:
+            env, service, action = target
+            success, message = self.stop_tunnel(env, service)
+            if action == "restart":
+                success, message, _ = self.start_tunnel(env, service)
+            return {"env": env, "service": service, "action": action, "success": success, "message": message}
+
+        targets = [(env, service, "restart") for env, service in changes["tunnels"]["changed"]]
+        targets += [(env, service, "stop") for env, service in changes["tunnels"]["removed"]]
+        targets = [target for target in targets if self.state.is_tunnel_active(target[0], target[1])]
+        if not targets:
+            return []
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            results = list(pool.map(apply, targets))
+        for result in results:
+            print(f"Config reload: {result['action']} {result['env']}/{result['service']}: {result['message']}")
+        return results
@@ -0,0 +1,90 @@
+"""
+Unix Domain Socket Listener
+Serves the same FastAPI app on a local socket file, next to the TCP listener,
+for the `tm` CLI and scripts
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+class _EmbeddedServer(uvicorn.Server):
+    """uvicorn server running inside another server's event loop"""
+
+    def install_signal_handlers(self) -> None:
+        # The main server handles SIGINT/SIGTERM and stops us from its lifespan
+        pass
+
+
+def claim_socket_path(path: Path) -> bool:
+    """
+    Remove a stale socket file left by a crashed server
+    Returns False if another live server is listening on it
+    """
+    if not path.exists():
+        return True
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+        return False
+    except OSError:
+        path.unlink()
+        return True
+    finally:
+        probe.close()
+
+
+class UnixSocketServer:
+    """Second uvicorn server for `app` bound to a Unix socket (owner-only permissions)"""
+
+    def __init__(self, app, path: Path):
+        self.app = app
+        self.path = path
+        self._server: Optional[_EmbeddedServer] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sock: Optional[socket.socket] = None
+        # Set once a new server took the socket over: stop() leaves the file
+        self.handed_off = False
+
+    async def start(self, sock: Optional[socket.socket] = None) -> bool:
+        """Bind the socket (or serve an inherited one) and start serving on the running event loop"""
+        if sock is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not claim_socket_path(self.path):
+                logger.warning(f"{self.path} is served by another running instance, not listening on it")
+                return False
+
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(str(self.path))
+            os.chmod(self.path, 0o600)
+        self.sock = sock
+
+        # lifespan="off": background services are owned by the main server
+        config = uvicorn.Config(self.app, lifespan="off", log_level="warning")
+        self._server = _EmbeddedServer(config)
+        self._task = asyncio.create_task(self._server.serve(sockets=[sock]))
+        logger.info(f"Serving API on unix socket {self.path}")
+        return True
+
+    async def stop(self):
+        """Stop serving and remove the socket file"""
+        if self._server is None:
+            return
+        self._server.should_exit = True
+        try:
+            await self._task
+        finally:
+            self._server = None
+            if not self.handed_off:
+                try:
+                    self.path.unlink()
+                except FileNotFoundError:
+                    pass
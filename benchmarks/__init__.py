@@ -0,0 +1,4 @@
+"""
+Tunnel Manager Web - Benchmarks
+Hermetic benchmark suite using fake aws / kubectl / session-manager-plugin
+"""
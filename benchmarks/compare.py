@@ -0,0 +1,66 @@
+"""
+Compare two benchmark result files
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json [--metric p50] [--threshold 10]
+
+Prints the change of the chosen statistic for every scenario present in both
+files and exits with status 1 if any scenario got slower by more than the
+threshold (percent).
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+
+def load(path: str) -> Dict[Tuple[str, int, int], Dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return {
+        (r["name"], r["tunnels"], r["clients"]): r
+        for r in report["results"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p50", help="Statistic to compare (min, mean, p50, p90, p99, max)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+
+    regressions = 0
+    print(f"{'scenario':<40} {'tunnels':>7} {'clients':>7} {'baseline':>11} {'candidate':>11} {'change':>8}")
+    for key in sorted(set(baseline) & set(candidate)):
+        name, tunnels, clients = key
+        before = baseline[key]["stats"].get(args.metric)
+        after = candidate[key]["stats"].get(args.metric)
+        if not before:
+            continue
+        if after is None:
+            # The candidate has no samples for this scenario
+            regressions += 1
+            print(f"{name:<40} {tunnels:>7} {clients:>7} {before:>9.2f}ms {'n/a':>11} {'':>8}  NO SAMPLES")
+            continue
+        change = (after - before) / before * 100
+        flag = ""
+        if change > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<40} {tunnels:>7} {clients:>7} {before:>9.2f}ms {after:>9.2f}ms {change:>+7.1f}%{flag}")
+
+    for key in sorted(set(baseline) ^ set(candidate)):
+        source = "baseline" if key in baseline else "candidate"
+        print(f"{key[0]:<40} {key[1]:>7} {key[2]:>7}   only in {source}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
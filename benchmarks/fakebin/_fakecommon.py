@@ -0,0 +1,118 @@
+"""
+Shared behaviour of the fake aws / kubectl / session-manager-plugin binaries
+
+Behaviour is driven by environment variables so one harness can script
+every scenario:
+
+    FAKE_STARTUP_DELAY   seconds to sleep before doing anything (CLI start cost)
+    FAKE_READY_DELAY     seconds before a forwarding listener is bound
+    FAKE_FAILURE_RATE    probability (0-1) that a command fails immediately
+    FAKE_CALL_LOG        file that receives one line per invocation
+    FAKE_FORWARD_TO      host:port that forwarding listeners connect to instead
+                         of echoing (e.g. a local PostgreSQL stand-in)
+"""
+
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+
+def env_float(name: str, default: float = 0.0) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def startup(tool: str):
+    """Log the call, simulate CLI start-up cost and the configured failure rate"""
+    log_path = os.environ.get("FAKE_CALL_LOG")
+    if log_path:
+        with open(log_path, "a") as f:
+            f.write(f"{time.time():.6f} {tool} {' '.join(sys.argv[1:3])}\n")
+
+    time.sleep(env_float("FAKE_STARTUP_DELAY"))
+
+    if random.random() < env_float("FAKE_FAILURE_RATE"):
+        sys.stderr.write(f"{tool}: simulated failure\n")
+        sys.exit(255)
+
+
+def _echo(conn: socket.socket):
+    with conn:
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            conn.sendall(data)
+
+
+def _copy(source: socket.socket, destination: socket.socket):
+    try:
+        while True:
+            data = source.recv(65536)
+            if not data:
+                break
+            destination.sendall(data)
+    except OSError:
+        pass
+    finally:
+        try:
+            destination.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+def _forward(conn: socket.socket, address: str):
+    host, port = address.rsplit(":", 1)
+    try:
+        upstream = socket.create_connection((host, int(port)))
+    except OSError:
+        conn.close()
+        return
+    with conn, upstream:
+        reverse = threading.Thread(target=_copy, args=(upstream, conn), daemon=True)
+        reverse.start()
+        _copy(conn, upstream)
+        reverse.join()
+
+
+def _accept_loop(server: socket.socket):
+    forward_to = os.environ.get("FAKE_FORWARD_TO")
+    while True:
+        conn, _ = server.accept()
+        if forward_to:
+            threading.Thread(target=_forward, args=(conn, forward_to), daemon=True).start()
+        else:
+            threading.Thread(target=_echo, args=(conn,), daemon=True).start()
+
+
+def serve_forever(ports, host: str = "127.0.0.1"):
+    """After the ready delay, run an echo listener on every port until terminated"""
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    time.sleep(env_float("FAKE_READY_DELAY"))
+
+    servers = []
+    for port in ports:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            server.bind((host, int(port)))
+        except OSError as e:
+            sys.stderr.write(f"Unable to listen on port {port}: {e}\n")
+            sys.exit(1)
+        server.listen(128)
+        servers.append(server)
+
+    for server in servers:
+        threading.Thread(target=_accept_loop, args=(server,), daemon=True).start()
+
+    while True:
+        time.sleep(3600)
@@ -0,0 +1,249 @@
+"""
+Benchmark harness
+Hermetic environment (temp HOME, fake CLIs on PATH, synthetic configs),
+server launcher, HTTP client and latency statistics
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+FAKEBIN_DIR = BENCH_DIR / "fakebin"
+
+# Synthetic services use consecutive local ports starting here
+BASE_PORT = 41000
+SERVICES_PER_ENV = 4
+K8S_ENVS = ["dev", "pre", "pro"]
+
+
+class FakeOptions:
+    """Behaviour of the fake aws / kubectl / session-manager-plugin binaries"""
+
+    def __init__(self, startup_delay: float = 0.0, ready_delay: float = 0.0, failure_rate: float = 0.0, pods: int = 3):
+        self.startup_delay = startup_delay
+        self.ready_delay = ready_delay
+        self.failure_rate = failure_rate
+        self.pods = pods
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+def synthetic_tunnel_configs(count: int) -> Dict:
+    """TUNNEL_CONFIGS-shaped dict with `count` services spread over several envs"""
+    configs = {}
+    for i in range(count):
+        env = f"bench{i // SERVICES_PER_ENV}"
+        env_config = configs.setdefault(env, {
+            "profile": f"bench-profile-{env}",
+            "region": "eu-central-1",
+            "instance_tag": f"bench-nodes-{env}",
+            "services": {}
+        })
+        env_config["services"][f"svc{i}"] = {
+            "name": f"Service {i}",
+            "remote_port": "5432",
+            "local_port": str(BASE_PORT + i),
+            "host": f"svc{i}.{env}.bench.internal"
+        }
+    return configs
+
+
+def synthetic_k8s_configs() -> Dict:
+    """K8S_CONFIGS-shaped dict with one pod resource per dashboard env"""
+    return {
+        env: {
+            "context": f"bench-context-{env}",
+            "account": "000000000000",
+            "region": "eu-central-1",
+            "resources": {
+                "bench-app": {
+                    "type": "pod",
+                    "namespace": "bench",
+                    "name": "Bench App",
+                    "prefix": "bench-app",
+                    "default_port": "8080",
+                    "suggested_local_port": str(BASE_PORT - 100 - i)
+                }
+            }
+        }
+        for i, env in enumerate(K8S_ENVS)
+    }
+
+
+def tunnel_services(configs: Dict) -> List[Tuple[str, str]]:
+    """(env, service) pairs in port order"""
+    pairs = [
+        (env, service)
+        for env, env_config in configs.items()
+        for service in env_config["services"]
+    ]
+    return sorted(pairs, key=lambda p: int(configs[p[0]]["services"][p[1]]["local_port"]))
+
+
+class BenchEnvironment:
+    """Temporary HOME and PATH with the fake CLIs, plus a call log"""
+
+    def __init__(self, options: FakeOptions, tunnel_count: int):
+        self.options = options
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="tunnel-bench-"))
+        self.home = self.tmpdir / "home"
+        self.home.mkdir()
+        self.call_log = self.tmpdir / "calls.log"
+        self.call_log.touch()
+        self.tunnel_configs = synthetic_tunnel_configs(tunnel_count)
+        self.k8s_configs = synthetic_k8s_configs()
+        self.config_file = self.tmpdir / "bench-config.json"
+        with open(self.config_file, "w") as f:
+            json.dump({"tunnels": self.tunnel_configs, "k8s": self.k8s_configs}, f)
+
+    def env(self) -> Dict[str, str]:
+        """Environment for the server and for in-process manager calls"""
+        env = dict(os.environ)
+        env.update({
+            "HOME": str(self.home),
+            "PATH": os.pathsep.join([str(FAKEBIN_DIR), str(Path(sys.executable).parent), "/usr/bin", "/bin"]),
+            "FAKE_STARTUP_DELAY": str(self.options.startup_delay),
+            "FAKE_READY_DELAY": str(self.options.ready_delay),
+            "FAKE_FAILURE_RATE": str(self.options.failure_rate),
+            "FAKE_PODS": ",".join(f"bench-app-{i}" for i in range(self.options.pods)),
+            "FAKE_CONTEXTS": ",".join(c["context"] for c in self.k8s_configs.values()),
+            "FAKE_CALL_LOG": str(self.call_log),
+            # The synthetic configs are loaded like a user's config file
+            "TUNNEL_MANAGER_CONFIG": str(self.config_file),
+            "PYTHONPATH": str(PROJECT_ROOT)
+        })
+        return env
+
+    def apply(self):
+        """Point this process at the fake environment (before importing backend)"""
+        os.environ.update(self.env())
+
+    def count_calls(self, tool: str, since: float) -> int:
+        """Fake CLI invocations of `tool` logged after `since`"""
+        count = 0
+        with open(self.call_log) as f:
+            for line in f:
+                stamp, name = line.split()[:2]
+                if name == tool and float(stamp) >= since:
+                    count += 1
+        return count
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BenchServer:
+    """Runs the FastAPI app with the synthetic configs in a subprocess"""
+
+    def __init__(self, environment: BenchEnvironment):
+        self.environment = environment
+        self.port = free_port()
+        self.process: Optional[subprocess.Popen] = None
+        self.log_path = environment.tmpdir / "server.log"
+        # Time from spawning the server until /health answered
+        self.startup_ms: Optional[float] = None
+
+    def start(self, timeout: float = 30):
+        log = open(self.log_path, "w")
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, str(BENCH_DIR / "server.py"), str(self.port)],
+            env=self.environment.env(),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                status, _, _ = HttpClient(self.port).request("GET", "/health")
+                if status == 200:
+                    self.startup_ms = (time.perf_counter() - started) * 1000
+                    return
+            except OSError:
+                pass
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.05)
+        raise RuntimeError(f"Benchmark server failed to start, see {self.log_path}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+class HttpClient:
+    """Keep-alive JSON client for one benchmark thread"""
+
+    def __init__(self, port: int, timeout: float = 120):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Optional[Dict], float]:
+        """Returns: (status, decoded JSON, latency in ms)"""
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+        except (http.client.HTTPException, ConnectionError):
+            # Reconnect once if the server closed the keep-alive connection
+            self.conn.close()
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        data = json.loads(raw) if raw else None
+        return response.status, data, elapsed_ms
+
+    def close(self):
+        self.conn.close()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """min / mean / percentiles / max of latency samples (ms)"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+        return round(ordered[index], 3)
+
+    return {
+        "min": round(ordered[0], 3),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "max": round(ordered[-1], 3)
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Commit of the code under test, if available"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
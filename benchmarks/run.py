@@ -0,0 +1,332 @@
+"""
+Tunnel Manager benchmark suite
+
+Measures server cold start (spawn until /health answers) and end-to-end
+latency of the start, stop, stop-all and list endpoints, and of the manager
+methods behind them, with 1/10/50 tunnels running and under N concurrent
+polling clients. Everything runs against fake aws,
+session-manager-plugin and kubectl binaries, so no AWS or cluster access is
+needed.
+
+Usage:
+    python benchmarks/run.py [--sizes 1,10,50] [--clients 1,10,50] [--output results.json]
+
+Compare two result files with benchmarks/compare.py.
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import (  # noqa: E402
+    BenchEnvironment,
+    BenchServer,
+    FakeOptions,
+    HttpClient,
+    K8S_ENVS,
+    git_revision,
+    summarize,
+    tunnel_services
+)
+
+
+class Recorder:
+    """Collects results in the machine-readable output format"""
+
+    def __init__(self):
+        self.results: List[Dict] = []
+
+    @property
+    def empty(self) -> List[Dict]:
+        """Results without a single sample"""
+        return [r for r in self.results if not r["samples"]]
+
+    def add(self, name: str, size: int, samples: List[float], clients: int = 1,
+            errors: Optional[List[str]] = None, **extra):
+        entry = {
+            "name": name,
+            "tunnels": size,
+            "clients": clients,
+            "samples": len(samples),
+            "unit": "ms",
+            "stats": summarize(samples),
+            **extra
+        }
+        if errors:
+            entry["errors"] = errors
+        self.results.append(entry)
+        stats = entry["stats"]
+        print(f"  {name:<32} tunnels={size:<3} clients={clients:<3} "
+              f"p50={format_ms(stats.get('p50'))} p90={format_ms(stats.get('p90'))}", flush=True)
+        if errors:
+            print(f"    {len(errors)} failed: {errors[0]}", flush=True)
+        if not samples:
+            print(f"    WARNING: {name} has no samples", flush=True)
+
+
+def format_ms(value: Optional[float]) -> str:
+    """Latency for the console; "n/a" when there were no samples"""
+    return f"{value:>9.2f}ms" if value is not None else f"{'n/a':>11}"
+
+
+def wait_for_jobs(client: HttpClient, job_ids: List[str], timeout: float = 600) -> List[Dict]:
+    """Poll the job API until every job has finished"""
+    deadline = time.monotonic() + timeout
+    pending = set(job_ids)
+    jobs = {}
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            _, job, _ = client.request("GET", f"/api/jobs/{job_id}")
+            if job["status"] in ("succeeded", "failed"):
+                jobs[job_id] = job
+                pending.discard(job_id)
+        if pending:
+            time.sleep(0.2)
+    return list(jobs.values())
+
+
+def populate(client: HttpClient, services, recorder: Recorder, size: int):
+    """Start `size` tunnels in parallel through the job API"""
+    started = time.perf_counter()
+    job_ids = []
+    for env, service in services:
+        _, job, _ = client.request("POST", "/api/jobs", {"kind": "tunnel_start", "env": env, "service": service})
+        job_ids.append(job["id"])
+    jobs = wait_for_jobs(client, job_ids)
+    elapsed = (time.perf_counter() - started) * 1000
+    failed = [j for j in jobs if not j["success"]]
+    recorder.add("jobs.start_batch", size, [elapsed], failed=len(failed))
+
+
+def poll_concurrently(port: int, path: str, clients: int, requests_per_client: int) -> List[float]:
+    """Run `clients` threads each issuing back-to-back GETs; return all latencies"""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    def worker():
+        client = HttpClient(port)
+        local = []
+        barrier.wait()
+        for _ in range(requests_per_client):
+            _, _, elapsed = client.request("GET", path)
+            local.append(elapsed)
+        client.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def bench_http_lists(server: BenchServer, environment: BenchEnvironment, recorder: Recorder,
+                     size: int, client_counts: List[int], repeats: int):
+    """List endpoints, single client and under concurrent polling"""
+    for path in ("/api/tunnels", "/api/k8s/pods", "/api/k8s/port-forwards"):
+        for clients in client_counts:
+            since = time.time()
+            latencies = poll_concurrently(server.port, path, clients, repeats)
+            recorder.add(
+                f"http GET {path}", size, latencies, clients=clients,
+                kubectl_calls=environment.count_calls("kubectl", since)
+            )
+
+
+def bench_manager_lists(recorder: Recorder, size: int, repeats: int):
+    """Manager list methods called in-process against the running tunnels"""
+    from backend.tunnel_manager import TunnelManager
+    from backend.k8s_manager import K8sPortForwardManager
+
+    tunnel_manager = TunnelManager()
+    k8s_manager = K8sPortForwardManager()
+
+    def timed(fn, *args) -> List[float]:
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            fn(*args)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    recorder.add("manager.get_all_tunnels", size, timed(tunnel_manager.get_all_tunnels))
+    recorder.add("manager.list_pods", size, timed(k8s_manager.list_pods, K8S_ENVS[0]))
+    recorder.add("manager.get_all_forwards", size, timed(k8s_manager.get_all_forwards))
+
+
+def bench_start_stop(server: BenchServer, recorder: Recorder, size: int, http_services, manager_services):
+    """
+    Single start/stop latency through HTTP and through the manager
+
+    The server and the in-process manager are separate TunnelManagers, so
+    each gets its own services (and local ports): a tunnel one of them
+    still holds cannot make the other's start fail.
+    """
+    from backend.tunnel_manager import TunnelManager
+
+    def http_call(path: str, env: str, service: str):
+        status, data, elapsed = client.request("POST", path, {"env": env, "service": service})
+        if data and data.get("success"):
+            return elapsed, None
+        message = (data or {}).get("message") or (data or {}).get("detail") or f"HTTP {status}"
+        return elapsed, f"{env}/{service}: {message}"
+
+    def manager_call(fn, env: str, service: str):
+        began = time.perf_counter()
+        success, message, *_ = fn(env, service)
+        elapsed = (time.perf_counter() - began) * 1000
+        return elapsed, None if success else f"{env}/{service}: {message}"
+
+    def run(calls):
+        samples, errors = [], []
+        for elapsed, error in calls:
+            if error:
+                errors.append(error)
+            else:
+                samples.append(elapsed)
+        return samples, errors
+
+    client = HttpClient(server.port)
+    samples, errors = run(http_call("/api/tunnels/start", env, service) for env, service in http_services)
+    recorder.add("http POST /api/tunnels/start", size, samples, errors=errors)
+    samples, errors = run(http_call("/api/tunnels/stop", env, service) for env, service in http_services)
+    recorder.add("http POST /api/tunnels/stop", size, samples, errors=errors)
+    client.close()
+
+    manager = TunnelManager()
+    samples, errors = run(manager_call(manager.start_tunnel, env, service) for env, service in manager_services)
+    recorder.add("manager.start_tunnel", size, samples, errors=errors)
+    samples, errors = run(manager_call(manager.stop_tunnel, env, service) for env, service in manager_services)
+    recorder.add("manager.stop_tunnel", size, samples, errors=errors)
+
+
+def bench_stop_all(server: BenchServer, recorder: Recorder, size: int):
+    """Stop-all latency with every tunnel of this size running"""
+    client = HttpClient(server.port)
+    _, data, elapsed = client.request("POST", "/api/tunnels/stop-all")
+    client.close()
+    recorder.add("http POST /api/tunnels/stop-all", size, [elapsed], stopped=data.get("stopped_count") if data else None)
+
+
+def running_session_plugins() -> List[str]:
+    """session-manager-plugin processes already running on this machine"""
+    result = subprocess.run(["ps", "-eo", "pid,command"], capture_output=True, text=True)
+    return [
+        line.strip() for line in result.stdout.splitlines()
+        if "session-manager-plugin" in line and "grep" not in line
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunnel Manager benchmark suite")
+    parser.add_argument("--sizes", default="1,10,50", help="Comma-separated tunnel counts")
+    parser.add_argument("--clients", default="1,10,50", help="Comma-separated concurrent polling client counts")
+    parser.add_argument("--repeats", type=int, default=20, help="Requests per client per list scenario")
+    parser.add_argument("--samples", type=int, default=3, help="Tunnels used for single start/stop latency")
+    parser.add_argument("--startup-delay", type=float, default=0.05, help="Fake CLI start-up delay (s)")
+    parser.add_argument("--ready-delay", type=float, default=0.2, help="Fake listener readiness delay (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fake CLI failure probability")
+    parser.add_argument("--pods", type=int, default=3, help="Fake pods per resource")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary environment (logs, state files)")
+    parser.add_argument("--force", action="store_true",
+                        help="Run even if session-manager-plugin processes are already running")
+    args = parser.parse_args()
+
+    # Stop-all also kills orphaned session-manager-plugin processes, which
+    # would include real tunnels running on this machine
+    existing = running_session_plugins()
+    if existing and not args.force:
+        print("Refusing to run: stop-all would kill these running session-manager-plugin processes:")
+        for line in existing:
+            print(f"  {line}")
+        print("Stop them first or pass --force.")
+        sys.exit(2)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    client_counts = [int(c) for c in args.clients.split(",")]
+    options = FakeOptions(args.startup_delay, args.ready_delay, args.failure_rate, args.pods)
+
+    # Extra services beyond the largest size are used for single start/stop
+    # samples, one set for the server and one for the in-process manager
+    environment = BenchEnvironment(options, max(sizes) + 2 * args.samples)
+    environment.apply()
+    services = tunnel_services(environment.tunnel_configs)
+    http_services = services[max(sizes):max(sizes) + args.samples]
+    manager_services = services[max(sizes) + args.samples:]
+
+    # environment.apply() also points TUNNEL_MANAGER_CONFIG at the synthetic
+    # configs, so manager-level calls in this process use them too
+
+    server = BenchServer(environment)
+    recorder = Recorder()
+    started_at = datetime.now().isoformat()
+    print(f"Benchmark environment: {environment.tmpdir}")
+    server.start()
+    recorder.add("server.cold_start", 0, [server.startup_ms])
+    try:
+        for size in sizes:
+            print(f"\n== {size} tunnel(s) ==", flush=True)
+            client = HttpClient(server.port)
+            populate(client, services[:size], recorder, size)
+            client.close()
+
+            bench_http_lists(server, environment, recorder, size, client_counts, args.repeats)
+            bench_manager_lists(recorder, size, args.repeats)
+            bench_start_stop(server, recorder, size, http_services, manager_services)
+            bench_stop_all(server, recorder, size)
+    finally:
+        server.stop()
+        if not args.keep:
+            shutil.rmtree(environment.tmpdir, ignore_errors=True)
+
+    from backend import __version__
+
+    report = {
+        "meta": {
+            "version": __version__,
+            "revision": git_revision(),
+            "started_at": started_at,
+            "finished_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fake": options.to_dict(),
+            "sizes": sizes,
+            "clients": client_counts,
+            "repeats": args.repeats
+        },
+        "results": recorder.results
+    }
+
+    output = Path(args.output) if args.output else (
+        Path(__file__).resolve().parent / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if recorder.empty:
+        print(f"\nFAILED: {len(recorder.empty)} scenario(s) have no samples:")
+        for result in recorder.empty:
+            print(f"  {result['name']} (tunnels={result['tunnels']}, clients={result['clients']})")
+            for error in result.get("errors", [])[:3]:
+                print(f"    {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
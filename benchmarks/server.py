@@ -0,0 +1,14 @@
+"""
+Benchmark server bootstrap
+Serves the FastAPI app on 127.0.0.1:<port>; the synthetic configs are read
+from the file named by TUNNEL_MANAGER_CONFIG (set by the harness)
+"""
+
+import sys
+
+import uvicorn
+
+from backend.main import app
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
@@ -0,0 +1,200 @@
+"""
+Tunnel Manager soak test
+
+Starts and stops fake tunnels and K8s port-forwards in a loop for a long
+time (hours, for a real run) and samples the server's own open fds, zombie
+children, threads and RSS from /api/self after every cycle. Fails (exit
+code 1) if any of them keeps growing: the counters of the last quarter of
+the run are compared with those of the first quarter after the warm-up.
+
+Usage:
+    python benchmarks/soak.py [--duration 3600] [--tunnels 4] [--output soak.json]
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import (  # noqa: E402
+    BenchEnvironment,
+    BenchServer,
+    FakeOptions,
+    HttpClient,
+    K8S_ENVS,
+    git_revision,
+    tunnel_services
+)
+from benchmarks.run import running_session_plugins  # noqa: E402
+
+# Growth allowed between the first and the last quarter, per counter:
+# absolute slack and (for RSS) a fraction of the early value on top
+LIMITS = {
+    "open_fds": (8, 0.0),
+    "zombies": (0, 0.0),
+    "threads": (4, 0.0),
+    "rss_bytes": (16 * 1024 * 1024, 0.10),
+    "children": (2, 0.0)
+}
+
+
+def cycle(client: HttpClient, services, forwards: Dict[str, str]) -> List[str]:
+    """
+    Start every tunnel and forward (env -> local port), then stop them again
+    Returns the errors
+    """
+    errors = []
+    for env, service in services:
+        _, data, _ = client.request("POST", "/api/tunnels/start", {"env": env, "service": service})
+        if not data or not data.get("success"):
+            errors.append(f"start {env}/{service}: {data}")
+    for env, local_port in forwards.items():
+        status, data, _ = client.request("POST", "/api/k8s/port-forward/start", {
+            "env": env, "pod_type": "bench-app", "pod_name": "bench-app-0",
+            "local_port": local_port, "remote_port": "8080"
+        })
+        if status != 200:
+            errors.append(f"forward {env}: {data}")
+
+    for env, service in services:
+        _, data, _ = client.request("POST", "/api/tunnels/stop", {"env": env, "service": service})
+        if not data or not data.get("success"):
+            errors.append(f"stop {env}/{service}: {data}")
+    for env in forwards:
+        _, data, _ = client.request("POST", "/api/k8s/port-forward/stop", {"env": env, "pod_type": "bench-app"})
+        if not data or not data.get("success"):
+            errors.append(f"stop forward {env}: {data}")
+    return errors
+
+
+def verdict(samples: List[Dict]) -> Dict[str, Dict]:
+    """Early and late value of every counter and whether it grew beyond its limit"""
+    quarter = max(1, len(samples) // 4)
+    early, late = samples[:quarter], samples[-quarter:]
+    results = {}
+    for counter, (slack, fraction) in LIMITS.items():
+        before = [s[counter] for s in early if s[counter] is not None]
+        after = [s[counter] for s in late if s[counter] is not None]
+        if not before or not after:
+            continue
+        # Medians, so one sample taken mid-teardown does not decide the run
+        before_value = sorted(before)[len(before) // 2]
+        after_value = sorted(after)[len(after) // 2]
+        limit = before_value + slack + before_value * fraction
+        results[counter] = {
+            "early": before_value,
+            "late": after_value,
+            "limit": round(limit),
+            "leaking": after_value > limit
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunnel Manager soak test")
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds to run the start/stop loop")
+    parser.add_argument("--warmup", type=float, default=None,
+                        help="Seconds of samples ignored at the start (default: a tenth of the duration)")
+    parser.add_argument("--tunnels", type=int, default=4, help="Tunnels started and stopped per cycle")
+    parser.add_argument("--forwards", type=int, default=1, choices=range(0, len(K8S_ENVS) + 1),
+                        help="K8s port-forwards started and stopped per cycle")
+    parser.add_argument("--pause", type=float, default=0.5, help="Seconds between cycles")
+    parser.add_argument("--ready-delay", type=float, default=0.05, help="Fake listener readiness delay (s)")
+    parser.add_argument("--output", help="Write the samples and the verdict to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary environment (logs, state files)")
+    parser.add_argument("--force", action="store_true",
+                        help="Run even if session-manager-plugin processes are already running")
+    args = parser.parse_args()
+
+    existing = running_session_plugins()
+    if existing and not args.force:
+        print("Refusing to run: these session-manager-plugin processes are already running:")
+        for line in existing:
+            print(f"  {line}")
+        print("Stop them first or pass --force.")
+        sys.exit(2)
+
+    warmup = args.duration / 10 if args.warmup is None else args.warmup
+    environment = BenchEnvironment(FakeOptions(ready_delay=args.ready_delay), args.tunnels)
+    services = tunnel_services(environment.tunnel_configs)
+    forwards = {
+        env: environment.k8s_configs[env]["resources"]["bench-app"]["suggested_local_port"]
+        for env in K8S_ENVS[:args.forwards]
+    }
+    server = BenchServer(environment)
+    print(f"Soak environment: {environment.tmpdir}")
+    server.start()
+
+    client = HttpClient(server.port)
+    started = time.monotonic()
+    samples: List[Dict] = []
+    cycles = 0
+    errors = 0
+    try:
+        while time.monotonic() - started < args.duration:
+            failures = cycle(client, services, forwards)
+            cycles += 1
+            errors += len(failures)
+            for failure in failures:
+                print(f"  cycle {cycles}: {failure}", flush=True)
+
+            _, status, _ = client.request("GET", "/api/self")
+            elapsed = time.monotonic() - started
+            if elapsed >= warmup:
+                samples.append(dict(status["current"], cycle=cycles, elapsed=round(elapsed, 1)))
+            current = status["current"]
+            print(f"  {elapsed:>7.0f}s cycle={cycles:<5} fds={current['open_fds']} zombies={current['zombies']} "
+                  f"threads={current['threads']} rss={current['rss_bytes'] / 1024 / 1024:.1f}MiB "
+                  f"children={current['children']}", flush=True)
+            time.sleep(args.pause)
+        _, final, _ = client.request("GET", "/api/self")
+    finally:
+        client.close()
+        server.stop()
+        if not args.keep:
+            shutil.rmtree(environment.tmpdir, ignore_errors=True)
+
+    if len(samples) < 4:
+        print("Not enough samples after the warm-up; run longer")
+        sys.exit(2)
+
+    results = verdict(samples)
+    leaking = [counter for counter, result in results.items() if result["leaking"]]
+    print(f"\n{cycles} cycles, {errors} error(s)")
+    for counter, result in results.items():
+        print(f"  {counter:<10} early={result['early']:<12} late={result['late']:<12} "
+              f"limit={result['limit']:<12} {'GROWING' if result['leaking'] else 'ok'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "meta": {
+                    "revision": git_revision(),
+                    "finished_at": datetime.now().isoformat(),
+                    "duration": args.duration,
+                    "warmup": warmup,
+                    "tunnels": args.tunnels,
+                    "forwards": args.forwards,
+                    "cycles": cycles,
+                    "errors": errors
+                },
+                "verdict": results,
+                "trend_per_hour": final["trend_per_hour"],
+                "samples": samples
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if leaking:
+        print(f"FAILED: {', '.join(leaking)} kept growing")
+        sys.exit(1)
+    print("PASSED")
+
+
+if __name__ == "__main__":
+    main()
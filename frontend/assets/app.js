@@ -125,6 +125,54 @@ const K8S_CONFIGS = {
     }
 };
 
+// Adaptive polling: the chosen interval is the fastest idle rate. Each poll that
+// finds nothing changed doubles the delay (up to POLL_MAX_BACKOFF times the
+// interval); after a start/stop the dashboard polls every POLL_BOOST_MS until
+// POLL_BOOST_SETTLE polls in a row found nothing new (or POLL_BOOST_MAX_MS passed).
+// Polling stops while the page is hidden.
+const POLL_BACKOFF_FACTOR = 2;
+const POLL_MAX_BACKOFF = 8;
+const POLL_BOOST_MS = 2000;
+const POLL_BOOST_SETTLE = 3;
+const POLL_BOOST_MAX_MS = 60000;
+
+// Ask the dashboard to poll fast until the state settles (after a user action)
+function boostPolling() {
+    window.dispatchEvent(new CustomEvent('poll-boost'));
+}
+
+// Seconds since a server timestamp (naive ISO local time, as the backend writes it)
+function secondsSince(isoTime) {
+    if (!isoTime) return null;
+    const started = new Date(isoTime.slice(0, 23));
+    if (isNaN(started)) return null;
+    return Math.max(0, Math.floor((Date.now() - started.getTime()) / 1000));
+}
+
+// Queue a start/stop job and poll until it finishes
+// Returns the finished job ({ success, message, result, ... })
+async function runJob(body, pollMs = 500) {
+    const response = await fetch('/api/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    });
+
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || 'Failed to queue job');
+    }
+
+    let job = await response.json();
+    while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, pollMs));
+        const statusResponse = await fetch(`/api/jobs/${job.id}`);
+        if (!statusResponse.ok) throw new Error('Failed to fetch job status');
+        job = await statusResponse.json();
+    }
+    return job;
+}
+
 // Global modal instance (will be set when modal component initializes)
 window.showModal = null;
 window.showInfoModal = null;
@@ -281,7 +329,15 @@ function tunnelManager() {
         orphaned: [],
         loading: false,
         lastUpdate: '',
-        refreshInterval: null,
+        pollTimer: null,
+        // Current delay between polls (ms), grows while nothing changes
+        pollDelay: 60000,
+        // { until, unchanged } while polling fast after an action
+        pollBoost: null,
+        // Dashboard state from /api/state: flat {key: entry} and the version of each
+        // section fetched so far. Polls ask for changes since those versions and apply them
+        stateEntries: {},
+        stateVersions: {},
         autoRefreshSeconds: 60,
         refreshOptions: [
             { value: 5, label: '5 seconds' },
@@ -298,22 +354,68 @@ function tunnelManager() {
         k8sLoading: false,
 
         async init() {
+            document.addEventListener('visibilitychange', () => this.visibilityChanged());
+            window.addEventListener('poll-boost', () => this.startBoost());
             await this.refresh(true);
             this.startAutoRefresh();
         },
 
-        setActiveTab(tab) {
+        async setActiveTab(tab) {
             this.activeTab = tab;
+            // Only the active tab is polled, so the other one may be stale
             if (tab === 'k8s') {
-                this.refreshK8s();
+                await this.refreshK8s();
+            } else {
+                await this.refresh(true);
             }
+            this.startAutoRefresh();
         },
 
+        // (Re)start polling at the chosen interval
         startAutoRefresh() {
-            if (this.refreshInterval) {
-                clearInterval(this.refreshInterval);
+            this.pollDelay = this.autoRefreshSeconds * 1000;
+            this.schedulePoll();
+        },
+
+        schedulePoll() {
+            clearTimeout(this.pollTimer);
+            this.pollTimer = null;
+            if (document.hidden) return;
+            this.pollTimer = setTimeout(() => this.poll(), this.pollBoost ? POLL_BOOST_MS : this.pollDelay);
+        },
+
+        async poll() {
+            this.pollTimer = null;
+            const changed = this.activeTab === 'k8s' ? await this.refreshK8s(true) : await this.refresh(true);
+
+            const interval = this.autoRefreshSeconds * 1000;
+            if (this.pollBoost) {
+                this.pollBoost.unchanged = changed ? 0 : this.pollBoost.unchanged + 1;
+                if (this.pollBoost.unchanged >= POLL_BOOST_SETTLE || Date.now() > this.pollBoost.until) {
+                    this.pollBoost = null;
+                }
             }
-            this.refreshInterval = setInterval(() => this.refresh(true), this.autoRefreshSeconds * 1000);
+            this.pollDelay = changed
+                ? interval
+                : Math.min(this.pollDelay * POLL_BACKOFF_FACTOR, interval * POLL_MAX_BACKOFF);
+            this.schedulePoll();
+        },
+
+        startBoost() {
+            this.pollBoost = { until: Date.now() + POLL_BOOST_MAX_MS, unchanged: 0 };
+            this.pollDelay = this.autoRefreshSeconds * 1000;
+            this.schedulePoll();
+        },
+
+        visibilityChanged() {
+            if (document.hidden) {
+                clearTimeout(this.pollTimer);
+                this.pollTimer = null;
+                return;
+            }
+            // Back in view: show fresh data right away
+            this.pollDelay = this.autoRefreshSeconds * 1000;
+            this.poll();
         },
 
         changeRefreshInterval(seconds) {
@@ -329,20 +431,70 @@ function tunnelManager() {
             return option ? option.label : `${this.autoRefreshSeconds} seconds`;
         },
 
+        // Fetch what changed in the given sections since the last poll (everything the
+        // first time) into stateEntries. Each tab asks only for its own sections
+        // Returns whether anything changed
+        async syncState(sections) {
+            const since = sections
+                .filter(section => section in this.stateVersions)
+                .map(section => `${section}:${this.stateVersions[section]}`)
+                .join(',');
+            const query = `?sections=${sections.join(',')}` + (since ? `&since=${since}` : '');
+            const response = await fetch(`/api/state${query}`);
+            if (!response.ok) throw new Error('Failed to fetch dashboard state');
+
+            const data = await response.json();
+            const entries = this.stateEntries;
+            for (const section of data.full || []) {
+                for (const key of Object.keys(entries)) {
+                    if (key.startsWith(`${section}/`)) delete entries[key];
+                }
+            }
+            for (const key of data.removed || []) {
+                delete entries[key];
+            }
+            Object.assign(entries, data.changed || {});
+            const changed = sections.some(section => data.versions[section] !== this.stateVersions[section]);
+            Object.assign(this.stateVersions, data.versions);
+            return changed;
+        },
+
+        // Entries whose key starts with prefix (e.g. 'tunnels/')
+        stateEntriesUnder(prefix) {
+            return Object.entries(this.stateEntries)
+                .filter(([key]) => key.startsWith(prefix))
+                .sort(([a], [b]) => a.localeCompare(b))
+                .map(([, entry]) => entry);
+        },
+
+        // Entries under prefix grouped by environment (keys look like 'pods/<env>/...')
+        stateEntriesByEnv(prefix) {
+            const byEnv = { dev: [], pre: [], pro: [] };
+            for (const [key, entry] of Object.entries(this.stateEntries)) {
+                if (!key.startsWith(prefix)) continue;
+                const env = key.slice(prefix.length).split('/')[0];
+                (byEnv[env] = byEnv[env] || []).push(entry);
+            }
+            return byEnv;
+        },
+
+        // Returns whether the dashboard changed since the previous refresh
         async refresh(silent = false) {
             if (!silent) {
                 this.loading = true;
             }
+            let changed = false;
             try {
-                const response = await fetch('/api/tunnels');
-                if (!response.ok) throw new Error('Failed to fetch tunnels');
-
-                const data = await response.json();
+                changed = await this.syncState(['tunnels', 'orphaned']);
+                const data = {
+                    tracked: this.stateEntriesUnder('tunnels/'),
+                    orphaned: this.stateEntriesUnder('orphaned/')
+                };
                 this.tunnels = data;
-                this.orphaned = data.orphaned || [];
+                this.orphaned = data.orphaned;
                 this.lastUpdate = new Date().toLocaleTimeString();
 
-                // Dispatch event to notify all cards
+                // Dispatch event to notify all cards (every poll: uptimes move on)
                 window.dispatchEvent(new CustomEvent('tunnels-updated', { detail: data }));
             } catch (error) {
                 window.dispatchEvent(new CustomEvent('show-toast', {
@@ -353,6 +505,7 @@ function tunnelManager() {
                     this.loading = false;
                 }
             }
+            return changed;
         },
 
         async stopAll() {
@@ -379,6 +532,7 @@ function tunnelManager() {
                     detail: { message: `Stopped ${data.stopped_count} tunnel(s)`, type: 'success' }
                 }));
                 await this.refresh(true);
+                boostPolling();
             } catch (error) {
                 window.dispatchEvent(new CustomEvent('show-toast', {
                     detail: { message: 'Error stopping tunnels: ' + error.message, type: 'error' }
@@ -421,20 +575,16 @@ function tunnelManager() {
         },
 
         // K8s Methods
-        async refreshK8s() {
-            this.k8sLoading = true;
+        // Returns whether the dashboard changed since the previous refresh
+        async refreshK8s(silent = false) {
+            if (!silent) {
+                this.k8sLoading = true;
+            }
+            let changed = false;
             try {
-                // Fetch pods
-                const podsResponse = await fetch('/api/k8s/pods');
-                if (!podsResponse.ok) throw new Error('Failed to fetch K8s pods');
-                const podsData = await podsResponse.json();
-                this.k8sPods = podsData.pods;
-
-                // Fetch active forwards
-                const forwardsResponse = await fetch('/api/k8s/port-forwards');
-                if (!forwardsResponse.ok) throw new Error('Failed to fetch K8s port-forwards');
-                const forwardsData = await forwardsResponse.json();
-                this.k8sForwards = forwardsData.forwards;
+                changed = await this.syncState(['pods', 'forwards']);
+                this.k8sPods = this.stateEntriesByEnv('pods/');
+                this.k8sForwards = this.stateEntriesByEnv('forwards/');
 
                 // Dispatch event to notify all K8s pod cards
                 window.dispatchEvent(new CustomEvent('k8s-pods-updated', {
@@ -449,8 +599,11 @@ function tunnelManager() {
                     detail: { message: 'Error fetching K8s data: ' + error.message, type: 'error' }
                 }));
             } finally {
-                this.k8sLoading = false;
+                if (!silent) {
+                    this.k8sLoading = false;
+                }
             }
+            return changed;
         },
 
         async startK8sForward(env, podType, podName, localPort, remotePort) {
@@ -531,6 +684,7 @@ function tunnelManager() {
                         detail: { message: `Stopped ${data.stopped_count} port-forward(s)`, type: 'success' }
                     }));
                     await this.refreshK8s();
+                    boostPolling();
                 }
             } catch (error) {
                 window.dispatchEvent(new CustomEvent('show-toast', {
@@ -571,7 +725,8 @@ function tunnelCard(env, service) {
                 if (foundTunnel) {
                     this.status = foundTunnel.status;
                     this.pid = foundTunnel.pid;
-                    this.uptime_seconds = foundTunnel.uptime_seconds;
+                    // /api/state leaves uptimes out (they change on every poll)
+                    this.uptime_seconds = secondsSince(foundTunnel.started_at);
                 } else {
                     this.status = 'stopped';
                     this.pid = null;
@@ -591,23 +746,16 @@ function tunnelCard(env, service) {
         async startTunnel() {
             this.loading = true;
             try {
-                const response = await fetch('/api/tunnels/start', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        env: this.env,
-                        service: this.service
-                    })
+                const data = await runJob({
+                    kind: 'tunnel_start',
+                    env: this.env,
+                    service: this.service
                 });
 
-                if (!response.ok) throw new Error('Failed to start tunnel');
-
-                const data = await response.json();
-
                 if (data.success) {
                     // Update local state immediately
                     this.status = 'running';
-                    this.pid = data.pid;
+                    this.pid = data.result?.pid;
 
                     window.dispatchEvent(new CustomEvent('show-toast', {
                         detail: { message: `${this.name} tunnel started successfully`, type: 'success' }
@@ -623,25 +771,19 @@ function tunnelCard(env, service) {
                 }));
             } finally {
                 this.loading = false;
+                boostPolling();
             }
         },
 
         async stopTunnel() {
             this.loading = true;
             try {
-                const response = await fetch('/api/tunnels/stop', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        env: this.env,
-                        service: this.service
-                    })
+                const data = await runJob({
+                    kind: 'tunnel_stop',
+                    env: this.env,
+                    service: this.service
                 });
 
-                if (!response.ok) throw new Error('Failed to stop tunnel');
-
-                const data = await response.json();
-
                 if (data.success) {
                     // Update local state immediately
                     this.status = 'stopped';
@@ -662,6 +804,7 @@ function tunnelCard(env, service) {
                 }));
             } finally {
                 this.loading = false;
+                boostPolling();
             }
         },
 
@@ -812,6 +955,7 @@ function k8sPodCard(env, podType, podConfig) {
                 }));
             } finally {
                 this.loading = false;
+                boostPolling();
             }
         },
 
@@ -849,6 +993,7 @@ function k8sPodCard(env, podType, podConfig) {
                 }));
             } finally {
                 this.loading = false;
+                boostPolling();
             }
         },
 
@@ -24,4 +24,4 @@ pip install -q -r requirements.txt
 # Start server
 echo "🚀 Starting server on http://localhost:5678"
 echo ""
-python -m uvicorn backend.main:app --host 0.0.0.0 --port 5678 --reload
+TUNNEL_MANAGER_DEV=1 python -m backend.server --host 0.0.0.0 --port 5678 --reload
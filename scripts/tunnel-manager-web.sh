@@ -30,11 +30,14 @@ if ! lsof -i :5678 > /dev/null 2>&1; then
     fi
 
     # Start backend in background
-    nohup python -m uvicorn backend.main:app --host 0.0.0.0 --port 5678 \
+    nohup python -m backend.server --host 0.0.0.0 --port 5678 \
         > logs/backend.log 2>&1 &
 
-    # Wait for server to start
-    sleep 2
+    # Wait until the server answers (up to 15s); caches warm up in the background
+    for _ in $(seq 150); do
+        curl -fs http://localhost:5678/health > /dev/null 2>&1 && break
+        sleep 0.1
+    done
 fi
 
 # Open browser
@@ -0,0 +1,16 @@
+"""
+Shared test setup: the backend is imported with a temporary HOME, so nothing
+touches the real ~/.tunnel-manager or tunnel state
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ["HOME"] = tempfile.mkdtemp(prefix="tunnel-manager-tests-")
+os.environ["TUNNEL_MANAGER_SOCKET"] = ""
+os.environ["TUNNEL_MANAGER_HANDOFF_SOCKET"] = ""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
@@ -0,0 +1,346 @@
+"""
+Fake PostgreSQL server and client for the pool tests
+The server speaks enough of protocol 3.0 for the pooler: SSL refusal,
+cleartext / MD5 / SCRAM-SHA-256 authentication, simple queries, the extended
+protocol and cancel requests. Queries are not parsed beyond a few forms:
+
+    BEGIN / COMMIT / ROLLBACK   transaction status
+    SELECT pg_backend_pid()     the server connection's process ID
+    SELECT pg_sleep(<s>)        sleeps until done or cancelled (SQLSTATE 57014)
+    anything else               one row echoing the query text
+"""
+
+import base64
+import hashlib
+import hmac
+import itertools
+import secrets
+import socket
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+PROTOCOL_VERSION = 196608
+SSL_REQUEST = 80877103
+CANCEL_REQUEST = 80877102
+SCRAM_ITERATIONS = 4096
+
+
+def message(kind: bytes, payload: bytes = b"") -> bytes:
+    return kind + struct.pack("!I", len(payload) + 4) + payload
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("connection closed")
+        data += chunk
+    return data
+
+
+def read_message(sock: socket.socket) -> Tuple[bytes, bytes]:
+    header = recv_exactly(sock, 5)
+    return header[:1], recv_exactly(sock, struct.unpack("!I", header[1:])[0] - 4)
+
+
+def error_fields(payload: bytes) -> Dict[str, str]:
+    return {field[:1].decode(): field[1:].decode() for field in payload.split(b"\0") if field}
+
+
+def _error(code: str, text: str, severity: str = "ERROR") -> bytes:
+    return message(b"E", f"S{severity}\0C{code}\0M{text}\0\0".encode())
+
+
+def _row(value: str) -> bytes:
+    data = value.encode()
+    return message(b"D", struct.pack("!HI", 1, len(data)) + data)
+
+
+def _row_description() -> bytes:
+    return message(b"T", struct.pack("!H", 1) + b"result\0" + struct.pack("!IhIhih", 0, 0, 25, -1, -1, 0))
+
+
+class FakePostgres:
+    """A threaded server on a free localhost port; every connection gets a process ID"""
+
+    def __init__(self, auth: str = "scram", user: str = "app", password: str = "secret"):
+        self.auth = auth
+        self.user = user
+        self.password = password
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.connections = 0
+        self.auth_failures = 0
+        self.cancels = 0
+        # Running connections by BackendKeyData: set to cancel their query
+        self._cancel_events: Dict[bytes, threading.Event] = {}
+        self._pids = itertools.count(1000)
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        with conn:
+            try:
+                self._session(conn)
+            except (EOFError, OSError):
+                pass
+
+    def _session(self, conn: socket.socket):
+        while True:
+            length = struct.unpack("!I", recv_exactly(conn, 4))[0]
+            body = recv_exactly(conn, length - 4)
+            code = struct.unpack("!I", body[:4])[0]
+            if code == SSL_REQUEST:
+                conn.sendall(b"N")
+                continue
+            if code == CANCEL_REQUEST:
+                with self._lock:
+                    event = self._cancel_events.get(body[4:12])
+                if event:
+                    self.cancels += 1
+                    event.set()
+                return
+            break
+
+        parts = [part.decode() for part in body[4:].split(b"\0")]
+        params = dict(zip(parts[0::2], parts[1::2]))
+        if not self._authenticate(conn, params.get("user", "")):
+            with self._lock:
+                self.auth_failures += 1
+            conn.sendall(_error("28P01", f'password authentication failed for user "{params.get("user")}"',
+                                "FATAL"))
+            return
+
+        pid = next(self._pids)
+        key = struct.pack("!II", pid, secrets.randbits(32))
+        cancelled = threading.Event()
+        with self._lock:
+            self.connections += 1
+            self._cancel_events[key] = cancelled
+        try:
+            conn.sendall(
+                message(b"R", struct.pack("!I", 0))
+                + message(b"S", b"server_version\x0016.0\0")
+                + message(b"S", b"client_encoding\0UTF8\0")
+                + message(b"K", key)
+                + message(b"Z", b"I")
+            )
+            self._queries(conn, pid, cancelled)
+        finally:
+            with self._lock:
+                self._cancel_events.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # Authentication
+    # ------------------------------------------------------------------
+
+    def _authenticate(self, conn: socket.socket, user: str) -> bool:
+        if self.auth == "trust":
+            return True
+        if self.auth == "cleartext":
+            conn.sendall(message(b"R", struct.pack("!I", 3)))
+            _, body = read_message(conn)
+            return user == self.user and body.rstrip(b"\0") == self.password.encode()
+        if self.auth == "md5":
+            salt = secrets.token_bytes(4)
+            conn.sendall(message(b"R", struct.pack("!I", 5) + salt))
+            _, body = read_message(conn)
+            inner = hashlib.md5((self.password + self.user).encode()).hexdigest()
+            expected = "md5" + hashlib.md5(inner.encode() + salt).hexdigest()
+            return user == self.user and body.rstrip(b"\0").decode() == expected
+        return self._scram(conn) and user == self.user
+
+    def _scram(self, conn: socket.socket) -> bool:
+        conn.sendall(message(b"R", struct.pack("!I", 10) + b"SCRAM-SHA-256\0\0"))
+        _, body = read_message(conn)
+        mechanism, rest = body.split(b"\0", 1)
+        if mechanism != b"SCRAM-SHA-256":
+            return False
+        client_first = rest[4:].decode().split(",", 2)[2]
+        client_nonce = dict(part.split("=", 1) for part in client_first.split(","))["r"]
+
+        salt = secrets.token_bytes(16)
+        nonce = client_nonce + base64.b64encode(secrets.token_bytes(18)).decode()
+        server_first = f"r={nonce},s={base64.b64encode(salt).decode()},i={SCRAM_ITERATIONS}"
+        conn.sendall(message(b"R", struct.pack("!I", 11) + server_first.encode()))
+
+        _, body = read_message(conn)
+        client_final = body.decode()
+        without_proof, proof = client_final.rsplit(",p=", 1)
+        if dict(part.split("=", 1) for part in without_proof.split(",")).get("r") != nonce:
+            return False
+        salted = hashlib.pbkdf2_hmac("sha256", self.password.encode(), salt, SCRAM_ITERATIONS)
+        stored_key = hashlib.sha256(hmac.digest(salted, b"Client Key", "sha256")).digest()
+        auth_message = f"{client_first},{server_first},{without_proof}".encode()
+        signature = hmac.digest(stored_key, auth_message, "sha256")
+        client_key = bytes(a ^ b for a, b in zip(base64.b64decode(proof), signature))
+        if hashlib.sha256(client_key).digest() != stored_key:
+            return False
+
+        server_key = hmac.digest(salted, b"Server Key", "sha256")
+        verifier = base64.b64encode(hmac.digest(server_key, auth_message, "sha256")).decode()
+        conn.sendall(message(b"R", struct.pack("!I", 12) + f"v={verifier}".encode()))
+        return True
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _queries(self, conn: socket.socket, pid: int, cancelled: threading.Event):
+        status = b"I"
+        statements: Dict[bytes, str] = {}
+        portals: Dict[bytes, str] = {}
+        failed = False
+        while True:
+            kind, body = read_message(conn)
+            if kind == b"X":
+                return
+            if kind == b"Q":
+                sql = body.rstrip(b"\0").decode()
+                reply, status = self._execute(sql, pid, status, cancelled, describe=True)
+                conn.sendall(reply + message(b"Z", status))
+            elif kind == b"P":
+                name, sql = body.split(b"\0")[:2]
+                statements[name] = sql.decode()
+                if not failed:
+                    conn.sendall(message(b"1"))
+            elif kind == b"B":
+                portal, statement = body.split(b"\0")[:2]
+                portals[portal] = statements.get(statement, "")
+                if not failed:
+                    conn.sendall(message(b"2"))
+            elif kind == b"D":
+                if not failed:
+                    conn.sendall(_row_description())
+            elif kind == b"E":
+                if not failed:
+                    reply, status = self._execute(portals.get(body.split(b"\0")[0], ""), pid, status, cancelled)
+                    failed = reply.startswith(b"E")
+                    conn.sendall(reply)
+            elif kind == b"S":
+                failed = False
+                conn.sendall(message(b"Z", status))
+
+    def _execute(self, sql: str, pid: int, status: bytes, cancelled: threading.Event,
+                 describe: bool = False) -> Tuple[bytes, bytes]:
+        """Reply to one statement, and the transaction status after it"""
+        command = sql.strip().rstrip(";").strip()
+        upper = command.upper()
+        if upper == "BEGIN":
+            return message(b"C", b"BEGIN\0"), b"T"
+        if upper in ("COMMIT", "ROLLBACK"):
+            return message(b"C", f"{upper}\0".encode()), b"I"
+        if upper.startswith("SELECT PG_SLEEP("):
+            # A cancel that arrived before the statement started still cancels it
+            if cancelled.wait(float(command[len("SELECT pg_sleep("):-1])):
+                cancelled.clear()
+                return _error("57014", "canceling statement due to user request"), b"I" if status == b"I" else b"E"
+            value = ""
+        elif upper == "SELECT PG_BACKEND_PID()":
+            value = str(pid)
+        else:
+            value = command
+        reply = (_row_description() if describe else b"") + _row(value) + message(b"C", b"SELECT 1\0")
+        return reply, status
+
+
+class Client:
+    """A blocking PostgreSQL client, logging in with a cleartext password as the pool asks"""
+
+    def __init__(self, port: int, user: str = "app", password: str = "secret", database: str = "app"):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=10)
+        self.key = b""
+        self.params: Dict[str, str] = {}
+        payload = struct.pack("!I", PROTOCOL_VERSION) + f"user\0{user}\0database\0{database}\0\0".encode()
+        self.sock.sendall(struct.pack("!I", len(payload) + 4) + payload)
+        while True:
+            kind, body = read_message(self.sock)
+            if kind == b"R" and struct.unpack("!I", body[:4])[0] == 3:
+                self.sock.sendall(message(b"p", password.encode() + b"\0"))
+            elif kind == b"E":
+                self.sock.close()
+                raise LoginError(error_fields(body))
+            elif kind == b"S":
+                name, value = body.split(b"\0")[:2]
+                self.params[name.decode()] = value.decode()
+            elif kind == b"K":
+                self.key = body
+            elif kind == b"Z":
+                return
+
+    def query(self, sql: str) -> "Result":
+        self.sock.sendall(message(b"Q", sql.encode() + b"\0"))
+        return self.results()
+
+    def send(self, data: bytes):
+        self.sock.sendall(data)
+
+    def results(self) -> "Result":
+        """Messages up to the next ReadyForQuery"""
+        result = Result()
+        while True:
+            kind, body = read_message(self.sock)
+            result.kinds.append(kind)
+            if kind == b"D":
+                size = struct.unpack("!I", body[2:6])[0]
+                result.rows.append(body[6:6 + size].decode())
+            elif kind == b"E":
+                result.errors.append(error_fields(body))
+            elif kind == b"Z":
+                result.status = body
+                return result
+
+    def close(self):
+        try:
+            self.sock.sendall(message(b"X"))
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class Result:
+    def __init__(self):
+        self.kinds: List[bytes] = []
+        self.rows: List[str] = []
+        self.errors: List[Dict[str, str]] = []
+        self.status: Optional[bytes] = None
+
+
+class LoginError(Exception):
+    def __init__(self, fields: Dict[str, str]):
+        super().__init__(fields.get("M"))
+        self.fields = fields
+
+
+def extended(sql: str, name: str = "") -> bytes:
+    """Parse / Bind / Describe / Execute of one unnamed statement (no Sync)"""
+    statement = name.encode() + b"\0"
+    return (
+        message(b"P", statement + sql.encode() + b"\0" + struct.pack("!H", 0))
+        + message(b"B", b"\0" + statement + struct.pack("!HHH", 0, 0, 0))
+        + message(b"D", b"P\0")
+        + message(b"E", b"\0" + struct.pack("!I", 0))
+    )
+
+
+def sync() -> bytes:
+    return message(b"S")
+
+
+def cancel(port: int, key: bytes):
+    """Send a cancel request for the session given BackendKeyData `key`"""
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        sock.sendall(struct.pack("!II", 16, CANCEL_REQUEST) + key)
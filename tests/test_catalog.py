@@ -0,0 +1,60 @@
+"""
+Environments come from the loaded catalog: one added in the config file shows
+up in pods, forwards and /api/state
+"""
+
+import os
+import stat
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.catalog import build_catalog, catalog_store
+from backend.config import TUNNEL_CONFIGS
+from backend.k8s_config import K8S_CONFIGS
+from backend.k8s_manager import K8sPortForwardManager
+from backend.main import app
+
+QA_K8S = {
+    "context": "qa-cluster",
+    "resources": {
+        "grafana": {"type": "service", "namespace": "monitoring", "service_name": "grafana",
+                    "default_port": "3000", "suggested_local_port": "3300"}
+    }
+}
+
+
+@pytest.fixture
+def qa_catalog(monkeypatch, tmp_path):
+    monkeypatch.setattr(catalog_store, "_catalog", build_catalog(TUNNEL_CONFIGS, {**K8S_CONFIGS, "qa": QA_K8S}))
+    # kubectl fails fast: only the env keys matter here
+    kubectl = tmp_path / "kubectl"
+    kubectl.write_text("#!/bin/sh\nexit 1\n")
+    kubectl.chmod(kubectl.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_catalog_envs_include_both_sections(qa_catalog):
+    envs = catalog_store.current.envs
+    assert envs[:3] == ("dev", "pre", "pro")
+    assert set(envs) == {*TUNNEL_CONFIGS, *K8S_CONFIGS, "qa"}
+
+
+def test_pods_and_state_cover_config_envs(qa_catalog):
+    client = TestClient(app)
+    assert "qa" in client.get("/api/k8s/pods").json()["pods"]
+    assert "qa" in client.get("/api/k8s/port-forwards").json()["forwards"]
+
+
+def test_forwards_of_any_env_are_listed(qa_catalog):
+    manager = K8sPortForwardManager()
+    manager.state.add_forward("qa", "grafana", "grafana", os.getpid(), "3300", "3000")
+    manager.state.add_forward("staging", "grafana", "grafana", os.getpid(), "3400", "3000")
+    try:
+        forwards = manager.get_all_forwards()
+        assert [f["pod_type"] for f in forwards["qa"]] == ["grafana"]
+        # No longer configured, but still running: listed rather than dropped
+        assert [f["local_port"] for f in forwards["staging"]] == ["3400"]
+    finally:
+        manager.state.remove_forward("qa", "grafana")
+        manager.state.remove_forward("staging", "grafana")
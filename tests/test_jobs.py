@@ -0,0 +1,100 @@
+"""
+Job scheduler: limit slots, per-target ordering and cancellation of queued jobs
+"""
+
+import threading
+import time
+
+from backend.jobs import JobScheduler
+
+
+def sleeper(seconds: float, started: dict, name: str):
+    def run(report):
+        started[name] = time.monotonic()
+        time.sleep(seconds)
+        return True, "done", None
+    return run
+
+
+def wait_done(jobs, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not all(job.done for job in jobs):
+        assert time.monotonic() < deadline, "jobs did not finish in time"
+        time.sleep(0.01)
+
+
+def test_burst_on_one_profile_does_not_delay_another():
+    scheduler = JobScheduler(max_workers=4)
+    started = {}
+    submitted = time.monotonic()
+    burst = [
+        scheduler.submit("tunnel_stop", {"service": f"a{i}"}, "profile-a", 1, f"a{i}",
+                         sleeper(0.3, started, f"a{i}"))[0]
+        for i in range(6)
+    ]
+    other, _ = scheduler.submit("tunnel_stop", {"service": "b"}, "profile-b", 1, "b", sleeper(0.1, started, "b"))
+
+    wait_done([other])
+    assert started["b"] - submitted < 0.2
+    # Profile A still runs one job at a time
+    assert sum(1 for job in burst if job.done) <= 1
+    wait_done(burst)
+    starts = sorted(started[f"a{i}"] for i in range(6))
+    assert all(later - earlier >= 0.29 for earlier, later in zip(starts, starts[1:]))
+    scheduler.shutdown()
+
+
+def test_limit_slots_run_concurrently():
+    scheduler = JobScheduler(max_workers=8)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def job(report):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.pop()
+        return True, "done", None
+
+    jobs = [scheduler.submit("tunnel_stop", {"service": str(i)}, "profile", 2, str(i), job)[0] for i in range(6)]
+    wait_done(jobs)
+    assert max(peak) == 2
+    scheduler.shutdown()
+
+
+def test_jobs_on_one_target_run_in_order():
+    scheduler = JobScheduler(max_workers=4)
+    order = []
+
+    def step(name):
+        def run(report):
+            order.append(name)
+            time.sleep(0.05)
+            return True, name, None
+        return run
+
+    jobs = [scheduler.submit("tunnel_stop", {"step": i}, "profile", 4, "dev_db", step(i))[0] for i in range(4)]
+    wait_done(jobs)
+    assert order == [0, 1, 2, 3]
+    scheduler.shutdown()
+
+
+def test_cancel_queued_job():
+    scheduler = JobScheduler(max_workers=2)
+    started = {}
+    running, _ = scheduler.submit("tunnel_start", {"service": "db"}, "profile", 1, "dev_db",
+                                  sleeper(0.3, started, "running"))
+    queued, _ = scheduler.submit("tunnel_start", {"service": "mongo"}, "profile", 1, "dev_mongo",
+                                 sleeper(0.1, started, "queued"))
+
+    assert scheduler.cancel(queued.id) is queued
+    assert queued.done and queued.cancelled == "requested"
+    assert scheduler.in_flight() == 1
+    wait_done([running])
+    time.sleep(0.1)
+    assert "queued" not in started
+    assert running.success
+    scheduler.shutdown()
@@ -0,0 +1,59 @@
+"""
+Orphaned tunnel identification from the session-manager-plugin command line
+"""
+
+import json
+import subprocess
+
+import pytest
+
+from backend import tunnel_manager as tunnel_manager_module
+from backend.tunnel_manager import TunnelManager
+
+DEV_DB = "aws-psql-off-inb-dev.cj2msqo02uut.eu-central-1.rds.amazonaws.com"
+PRO_DB = "aws-psql-off-inb-pro.c522iagi0n4g.eu-central-1.rds.amazonaws.com"
+
+
+@pytest.fixture
+def ps_command(monkeypatch):
+    """Make `ps -o command=` report the given parameters for any PID"""
+    def use(parameters):
+        def run(args, **kwargs):
+            command = f"session-manager-plugin '{json.dumps(parameters)}' eu-central-1 StartSession"
+            return subprocess.CompletedProcess(args, 0, stdout=command + "\n", stderr="")
+        monkeypatch.setattr(tunnel_manager_module.subprocess, "run", run)
+    return use
+
+
+@pytest.fixture
+def manager():
+    return TunnelManager()
+
+
+def test_port_and_host_name_the_service(manager, ps_command):
+    # dev and pro db both use local port 8432: the host tells them apart
+    ps_command({"host": [PRO_DB], "portNumber": ["5432"], "localPortNumber": ["8432"]})
+    info = manager.get_orphaned_tunnel_info(4242)
+    assert info == {"pid": 4242, "port": "8432", "host": PRO_DB, "env": "PRO", "service": "db"}
+
+    ps_command({"host": [DEV_DB], "portNumber": ["5432"], "localPortNumber": ["8432"]})
+    assert manager.get_orphaned_tunnel_info(4242)["service"] == "db"
+    assert manager.get_orphaned_tunnel_info(4242)["env"] == "DEV"
+
+
+def test_port_alone_names_the_service_when_unique(manager, ps_command):
+    ps_command({"portNumber": ["5432"], "localPortNumber": ["8532"]})
+    info = manager.get_orphaned_tunnel_info(4242)
+    assert (info["env"], info["service"]) == ("PRE", "db")
+
+    # Shared by dev and pro: ambiguous without the host
+    ps_command({"portNumber": ["5432"], "localPortNumber": ["8432"]})
+    info = manager.get_orphaned_tunnel_info(4242)
+    assert (info["env"], info["service"]) == ("UNKNOWN", None)
+
+
+def test_private_session_port_falls_back_to_the_host(manager, ps_command):
+    # Sessions behind a front relay listen on a free port, not the configured one
+    ps_command({"host": [PRO_DB], "portNumber": ["5432"], "localPortNumber": ["41234"]})
+    info = manager.get_orphaned_tunnel_info(4242)
+    assert (info["env"], info["service"]) == ("PRO", "db")
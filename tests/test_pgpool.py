@@ -0,0 +1,220 @@
+"""
+PostgreSQL pool tests against the fake server in fakepg.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from backend import pgpool
+from backend.pgpool import PgPoolListener
+from backend.relay import find_free_port
+
+from fakepg import Client, FakePostgres, LoginError, cancel, error_fields, extended, message, read_message, sync
+
+
+@pytest.fixture(autouse=True)
+def pool_settings(monkeypatch):
+    # No background fill, so the server connections opened are only the ones a test asks for
+    monkeypatch.setattr(pgpool, "PG_POOL_MIN_SIZE", 0)
+    monkeypatch.setattr(pgpool, "PG_POOL_MAX_SIZE", 20)
+    monkeypatch.setattr(pgpool, "PG_POOL_WAIT_TIMEOUT_SECONDS", 5)
+    return monkeypatch
+
+
+@pytest.fixture
+def server(request):
+    fake = FakePostgres(auth=getattr(request, "param", "scram"))
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def listener(server):
+    pool_listener = PgPoolListener("test-db", find_free_port())
+    pool_listener.set_backends([("fake", "127.0.0.1", server.port)])
+    pool_listener.start()
+    yield pool_listener
+    pool_listener.stop()
+
+
+def pool_stats(listener: PgPoolListener) -> dict:
+    pools = listener.stats()["pools"]
+    assert len(pools) == 1
+    return pools[0]
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def idle(listener: PgPoolListener, count: int):
+    """Wait until `count` server connections are back in the pool"""
+    wait_for(lambda: pool_stats(listener)["idle"] == count)
+
+
+@pytest.mark.parametrize("server", ["cleartext", "md5", "scram"], indirect=True)
+def test_login_with_each_auth_method(server, listener):
+    client = Client(listener.port)
+    assert client.params["server_version"] == "16.0"
+    assert client.query("SELECT 1").rows == ["SELECT 1"]
+    client.close()
+
+    # The connection that checked the password is kept and reused
+    assert server.connections == 1
+    stats = pool_stats(listener)
+    assert stats["connects"] == 1
+    assert stats["hits"] == 1
+
+
+@pytest.mark.parametrize("server", ["cleartext", "md5", "scram"], indirect=True)
+def test_wrong_password_is_rejected(server, listener):
+    with pytest.raises(LoginError) as error:
+        Client(listener.port, password="wrong")
+    assert error.value.fields["C"] == "28P01"
+    assert server.auth_failures == 1
+    assert listener.stats()["rejected_connections"] == 1
+    assert listener.stats()["pools"] == []
+
+    # A wrong password does not spoil the pool for the right one
+    client = Client(listener.port)
+    assert client.query("SELECT 1").status == b"I"
+    client.close()
+
+
+def test_transaction_holds_its_server_connection(listener):
+    first = Client(listener.port)
+    second = Client(listener.port)
+
+    assert first.query("BEGIN").status == b"T"
+    pid = first.query("SELECT pg_backend_pid()").rows
+    # Other clients' statements run on another server connection meanwhile
+    other = second.query("SELECT pg_backend_pid()").rows
+    assert other != pid
+    assert first.query("SELECT pg_backend_pid()").rows == pid
+    assert first.query("COMMIT").status == b"I"
+
+    idle(listener, 2)
+    stats = pool_stats(listener)
+    assert stats["server_connections"] == 2
+    # BEGIN..COMMIT is one transaction, plus the second client's statement
+    assert stats["transactions"] == 2
+    first.close()
+    second.close()
+
+
+def test_connection_returns_to_the_pool_between_statements(listener):
+    client = Client(listener.port)
+    pids = {client.query("SELECT pg_backend_pid()").rows[0] for _ in range(5)}
+    assert len(pids) == 1
+    idle(listener, 1)
+    assert pool_stats(listener)["connects"] == 1
+    client.close()
+
+
+def test_pipelined_extended_batch(listener):
+    client = Client(listener.port)
+    client.send(extended("SELECT 1") + extended("SELECT pg_backend_pid()") + extended("SELECT 3") + sync())
+    result = client.results()
+
+    assert result.kinds == [b"1", b"2", b"T", b"D", b"C"] * 3 + [b"Z"]
+    assert result.rows[0] == "SELECT 1" and result.rows[2] == "SELECT 3"
+    assert result.status == b"I"
+    idle(listener, 1)
+    client.close()
+
+
+def test_unsynced_batch_keeps_its_connection_until_sync(listener):
+    first = Client(listener.port)
+    second = Client(listener.port)
+
+    first.send(extended("SELECT pg_backend_pid()"))
+    # Without a Sync the batch is unanswered as a whole: another client gets another connection
+    assert second.query("SELECT pg_backend_pid()").rows
+    assert pool_stats(listener)["server_connections"] == 2
+
+    first.send(sync())
+    result = first.results()
+    assert result.status == b"I"
+    assert result.kinds == [b"1", b"2", b"T", b"D", b"C", b"Z"]
+    idle(listener, 2)
+    first.close()
+    second.close()
+
+
+def test_clients_share_one_server_connection(listener, pool_settings):
+    pool_settings.setattr(pgpool, "PG_POOL_MAX_SIZE", 1)
+    first = Client(listener.port)
+    second = Client(listener.port)
+
+    assert first.query("BEGIN").status == b"T"
+    first_pid = first.query("SELECT pg_backend_pid()").rows
+
+    result = {}
+    waiting = threading.Thread(target=lambda: result.update(rows=second.query("SELECT pg_backend_pid()").rows))
+    waiting.start()
+    wait_for(lambda: pool_stats(listener)["waiting"] == 1)
+    assert waiting.is_alive()
+
+    # The connection is lent to the waiting client as soon as the transaction ends
+    assert first.query("COMMIT").status == b"I"
+    waiting.join(5)
+    assert result["rows"] == first_pid
+
+    stats = pool_stats(listener)
+    assert stats["server_connections"] == 1
+    assert stats["connects"] == 1
+    assert stats["waits"] == 1
+    first.close()
+    second.close()
+
+
+def test_wait_for_a_connection_times_out(listener, pool_settings):
+    pool_settings.setattr(pgpool, "PG_POOL_MAX_SIZE", 1)
+    pool_settings.setattr(pgpool, "PG_POOL_WAIT_TIMEOUT_SECONDS", 0.3)
+    first = Client(listener.port)
+    second = Client(listener.port)
+
+    assert first.query("BEGIN").status == b"T"
+    # The error ends the waiting client's session
+    second.send(message(b"Q", b"SELECT 1\0"))
+    kind, body = read_message(second.sock)
+    assert kind == b"E"
+    assert error_fields(body)["C"] == "53300"
+    assert pool_stats(listener)["timeouts"] == 1
+
+    # The transaction is unaffected
+    assert first.query("COMMIT").status == b"I"
+    first.close()
+
+
+def test_cancel_is_forwarded_to_the_running_server_connection(server, listener):
+    client = Client(listener.port)
+    result = {}
+    running = threading.Thread(target=lambda: result.update(value=client.query("SELECT pg_sleep(10)")))
+    started = time.monotonic()
+    running.start()
+    wait_for(lambda: pool_stats(listener)["idle"] == 0)
+
+    cancel(listener.port, client.key)
+    running.join(5)
+    assert time.monotonic() - started < 5
+    assert result["value"].errors[0]["C"] == "57014"
+    assert result["value"].status == b"I"
+    assert server.cancels == 1
+
+    # The connection is still good afterwards
+    assert client.query("SELECT 1").rows == ["SELECT 1"]
+    client.close()
+
+
+def test_cancel_with_an_unknown_key_is_ignored(server, listener):
+    client = Client(listener.port)
+    cancel(listener.port, b"\0\0\0\x63\0\0\0\x01")
+    assert client.query("SELECT 1").status == b"I"
+    assert server.cancels == 0
+    client.close()
@@ -0,0 +1,180 @@
+"""
+Relay listener tests: many parallel clients through one shared listener to
+local echo backends
+"""
+
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.relay import RelayListener, find_free_port
+
+CLIENTS = 64
+PAYLOAD_SIZE = 256 * 1024
+
+
+class EchoServer:
+    """Threaded TCP server sending back everything it receives"""
+
+    def __init__(self):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._echo, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _echo(conn: socket.socket):
+        with conn:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    return
+                conn.sendall(data)
+
+
+@pytest.fixture
+def echo_servers():
+    servers = [EchoServer(), EchoServer()]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def start_listener(backends, **kwargs) -> RelayListener:
+    listener = RelayListener("test-relay", find_free_port(), **kwargs)
+    listener.set_backends([(f"echo-{i}", "127.0.0.1", server.port) for i, server in enumerate(backends)])
+    listener.start()
+    return listener
+
+
+def exchange(port: int) -> bool:
+    """Send a random payload through the relay and check it comes back intact"""
+    payload = os.urandom(PAYLOAD_SIZE)
+    with socket.create_connection(("127.0.0.1", port), timeout=30) as sock:
+        # Write from another thread: the echo would block a sender that never reads
+        writer = threading.Thread(target=sock.sendall, args=(payload,))
+        writer.start()
+        received = bytearray()
+        while len(received) < len(payload):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            received += chunk
+        writer.join()
+        sock.shutdown(socket.SHUT_WR)
+        return bytes(received) == payload and sock.recv(1) == b""
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_parallel_clients_through_one_listener(echo_servers):
+    listener = start_listener(echo_servers)
+    try:
+        with ThreadPoolExecutor(max_workers=CLIENTS) as executor:
+            results = list(executor.map(lambda _: exchange(listener.port), range(CLIENTS)))
+        assert all(results)
+
+        wait_for(lambda: listener.stats()["active_connections"] == 0)
+        stats = listener.stats()
+        assert stats["total_connections"] == CLIENTS
+        assert stats["rejected_connections"] == 0
+        assert sum(b["total_connections"] for b in stats["backends"]) == CLIENTS
+        # Both backends took a share of the clients
+        assert all(b["total_connections"] > 0 for b in stats["backends"])
+        assert all(b["active_connections"] == 0 and b["failures"] == 0 for b in stats["backends"])
+        assert stats["clients"] == [{"client": "127.0.0.1", "active": 0, "total": CLIENTS, "rejected": 0}]
+    finally:
+        listener.stop()
+
+
+def test_clients_beyond_max_connections_are_rejected(echo_servers):
+    listener = start_listener(echo_servers[:1], max_connections=2)
+    held = [socket.create_connection(("127.0.0.1", listener.port), timeout=10) for _ in range(2)]
+    try:
+        for sock in held:
+            sock.sendall(b"ping")
+            assert sock.recv(4) == b"ping"
+
+        with socket.create_connection(("127.0.0.1", listener.port), timeout=10) as extra:
+            assert extra.recv(1) == b""
+
+        stats = listener.stats()
+        assert stats["active_connections"] == 2
+        assert stats["total_connections"] == 2
+        assert stats["rejected_connections"] == 1
+    finally:
+        for sock in held:
+            sock.close()
+        listener.stop()
+
+
+def test_unreachable_backend_is_skipped(echo_servers):
+    dead = socket.create_server(("127.0.0.1", 0))
+    dead_port = dead.getsockname()[1]
+    dead.close()
+
+    listener = start_listener(echo_servers[:1])
+    listener.set_backends([("dead", "127.0.0.1", dead_port), ("echo-0", "127.0.0.1", echo_servers[0].port)])
+    try:
+        assert all(exchange(listener.port) for _ in range(4))
+        backends = {b["name"]: b for b in listener.stats()["backends"]}
+        assert backends["echo-0"]["total_connections"] == 4
+        assert backends["dead"]["total_connections"] == 0
+        assert backends["dead"]["failures"] > 0
+    finally:
+        listener.stop()
+
+
+def test_stats_while_new_clients_connect(echo_servers):
+    # Every client connects from its own loopback address, adding a client entry each time
+    listener = start_listener(echo_servers[:1])
+    hosts = [f"127.0.0.{i}" for i in range(2, 202)]
+    errors = []
+    done = threading.Event()
+
+    def poll():
+        while not done.is_set():
+            try:
+                listener.stats()
+            except Exception as error:
+                errors.append(error)
+                return
+
+    def connect(host: str):
+        with socket.create_connection(("127.0.0.1", listener.port), timeout=10, source_address=(host, 0)) as sock:
+            sock.sendall(b"ping")
+            assert sock.recv(4) == b"ping"
+
+    pollers = [threading.Thread(target=poll) for _ in range(4)]
+    for thread in pollers:
+        thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(connect, hosts))
+    finally:
+        done.set()
+        for thread in pollers:
+            thread.join()
+        listener.stop()
+
+    assert errors == []
+    assert {c["client"] for c in listener.stats()["clients"]} == set(hosts)
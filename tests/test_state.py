@@ -0,0 +1,58 @@
+"""
+/api/state sections: each tab's poll runs only the listings it needs
+"""
+
+import os
+import stat
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+
+@pytest.fixture
+def kubectl_calls(tmp_path, monkeypatch):
+    """Put a kubectl on PATH that records its arguments and fails"""
+    log = tmp_path / "kubectl.log"
+    kubectl = tmp_path / "kubectl"
+    kubectl.write_text(f'#!/bin/sh\necho "$@" >> {log}\nexit 1\n')
+    kubectl.chmod(kubectl.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return lambda: log.read_text().splitlines() if log.exists() else []
+
+
+@pytest.fixture
+def client():
+    # No lifespan: nothing is prewarmed in the background
+    return TestClient(app)
+
+
+def test_tunnels_poll_never_calls_kubectl(client, kubectl_calls):
+    response = client.get("/api/state", params={"sections": "tunnels,orphaned"})
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(data["versions"]) == ["orphaned", "tunnels"]
+    assert sorted(data["full"]) == ["orphaned", "tunnels"]
+    assert all(key.startswith(("tunnels/", "orphaned/")) for key in data["changed"])
+
+    since = ",".join(f"{section}:{version}" for section, version in data["versions"].items())
+    response = client.get("/api/state", params={"sections": "tunnels,orphaned", "since": since})
+    assert response.json()["full"] == []
+    assert kubectl_calls() == []
+
+
+def test_sections_are_versioned_separately(client, kubectl_calls):
+    tunnels = client.get("/api/state", params={"sections": "tunnels"}).json()
+    client.get("/api/state", params={"sections": "pods"})
+    assert kubectl_calls()
+
+    # Polling pods does not move the tunnels version
+    again = client.get("/api/state", params={"sections": "tunnels", "since": f"tunnels:{tunnels['versions']['tunnels']}"})
+    assert again.json() == {"versions": tunnels["versions"], "full": [], "changed": {}, "removed": []}
+
+
+def test_unknown_section_is_rejected(client):
+    response = client.get("/api/state", params={"sections": "tunnels,nodes"})
+    assert response.status_code == 400
+    assert "nodes" in response.json()["detail"]